@@ -0,0 +1,93 @@
+# HyperCLOVAX vLLM Plugin
+# Copyright (c) 2025-present NAVER Cloud Corp.
+# Apache-2.0
+"""
+Acceptance of self-speculative decoding by early exit, measured on CPU with the reference implementation.
+
+For each sample text, one pass of HyperCLOVAXReferenceForCausalLM gives the logits of the full model and of the early
+exits after K layers (final norm and μP-scaled lm_head applied to the residual stream after layer K). With greedy
+decoding, a drafted token is accepted when the exit's argmax matches the full model's argmax at that position, and
+the drafts after the first mismatch are rejected, so the decoding steps are replayed from these matches
+(teacher-forced on the sample texts). The estimated speedup counts each draft pass as K / num_hidden_layers of a
+full forward pass and ignores the attention and sampling overheads.
+
+    python benchmarks/benchmark_early_exit.py --model <checkpoint> --dataset samples.jsonl --exit-layers 4 8 12 --num-speculative-tokens 1 2 4
+"""
+import argparse
+import os
+import sys
+
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model.hcx_kv_cache_calibration import load_samples, tokenize  # noqa: E402
+from model.hcx_reference import load_reference_model  # noqa: E402
+
+
+def replay(matches, num_speculative_tokens):
+    '''
+    Greedy speculative decoding over one sequence: matches[i] tells whether the draft proposes the target's token
+    after position i. Returns (decoding steps, accepted draft tokens).
+    '''
+    num_steps, num_accepted, position = 0, 0, 0
+    while position < len(matches):
+        accepted = 0
+        while (accepted < num_speculative_tokens and position + accepted < len(matches)
+               and matches[position + accepted]):
+            accepted += 1
+        num_steps += 1
+        num_accepted += accepted
+        position += accepted + 1
+    return num_steps, num_accepted
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Measure the acceptance of early-exit drafts.")
+    arg_parser.add_argument("--model", required=True, help="Unquantized safetensors checkpoint (HF, mistral or fused).")
+    arg_parser.add_argument("--tokenizer", default=None, help="Tokenizer path (default: --model).")
+    arg_parser.add_argument("--dataset", required=True, help="*.jsonl with a text field, or one sample per line.")
+    arg_parser.add_argument("--text-field", default="text")
+    arg_parser.add_argument("--num-samples", type=int, default=16)
+    arg_parser.add_argument("--max-length", type=int, default=512)
+    arg_parser.add_argument("--exit-layers", nargs="+", type=int, required=True)
+    arg_parser.add_argument("--num-speculative-tokens", nargs="+", type=int, default=[1, 2, 4])
+    arg_parser.add_argument("--dtype", default="float32", choices=["float32", "bfloat16", "float16"])
+    args = arg_parser.parse_args()
+
+    from transformers import AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(args.tokenizer or args.model)
+    samples = tokenize(tokenizer, load_samples(args.dataset, args.text_field)[:args.num_samples], args.max_length)
+    if not samples:
+        raise SystemExit(f"No samples in {args.dataset}")
+    model = load_reference_model(args.model, getattr(torch, args.dtype))
+    num_layers = model.config.num_hidden_layers
+    for exit_layer in args.exit_layers:
+        if not 0 < exit_layer < num_layers:
+            arg_parser.error(f"--exit-layers must be in [1, {num_layers - 1}]")
+
+    matches = {exit_layer: [] for exit_layer in args.exit_layers}
+    with torch.inference_mode():
+        for token_ids in samples:
+            logits = model.forward_early_exits(torch.tensor(token_ids), args.exit_layers)
+            target = logits[num_layers].argmax(dim=-1)
+            for exit_layer in args.exit_layers:
+                matches[exit_layer].append((logits[exit_layer].argmax(dim=-1) == target).tolist())
+
+    num_tokens = sum(len(sample) for sample in samples)
+    print(f"{len(samples)} samples, {num_tokens} tokens, {num_layers} layers")
+    for exit_layer in args.exit_layers:
+        match_rate = sum(map(sum, matches[exit_layer])) / num_tokens
+        print(f"K={exit_layer:<3} top-1 match {match_rate:6.1%}")
+        for k in args.num_speculative_tokens:
+            num_steps, num_accepted = map(sum, zip(*(replay(sample_matches, k)
+                                                     for sample_matches in matches[exit_layer])))
+            # one verification pass plus k draft passes of exit_layer / num_layers each
+            cost = num_steps * (1 + k * exit_layer / num_layers)
+            print(f"      k={k:<2} acceptance {num_accepted / (num_steps * k):6.1%} "
+                  f"tokens/step {num_tokens / num_steps:5.2f} estimated speedup {num_tokens / cost:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
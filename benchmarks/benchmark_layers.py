@@ -0,0 +1,254 @@
+# HyperCLOVAX vLLM Plugin
+# Copyright (c) 2025-present NAVER Cloud Corp.
+# Apache-2.0
+"""
+Parity of the vLLM model file against the pure-PyTorch reference (model/hcx_reference.py), and CPU timing of each
+sub-block (attention, MLP, RMSNorm, residual step).
+
+Tiny and medium configs are built in two variants: "peri_ln" (μP multipliers and Peri-LN post-norms) and "plain"
+(no multipliers or post-norms, the fused_add_rms_norm path). The same random weights are copied into
+HyperCLOVAXModel and into the reference, and HyperCLOVAXDecoderLayer and HyperCLOVAXModel outputs are compared.
+vLLM's attention backend is replaced by the reference causal attention, so everything else in the model file
+(projections, RoPE, the fused Peri-LN residual steps, the μP multipliers, the norms carried between layers) is
+checked against the reference. This requires a CPU build of vLLM; --reference-only times the reference without it.
+
+    python benchmarks/benchmark_layers.py --configs tiny medium --num-tokens 16 256
+    python benchmarks/benchmark_layers.py --rope-scaling '{"rope_type": "yarn", "factor": 4.0, "original_max_position_embeddings": 1024}'
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+import torch
+from torch import nn
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model.configuration_hyperclovax import HyperCLOVAXConfig  # noqa: E402
+from model.hcx_reference import HyperCLOVAXReferenceForCausalLM, causal_attention  # noqa: E402
+
+CONFIGS = {
+    "tiny": dict(hidden_size=64, intermediate_size=160, num_hidden_layers=2, num_attention_heads=4,
+                 num_key_value_heads=2, vocab_size=512),
+    "medium": dict(hidden_size=1024, intermediate_size=2816, num_hidden_layers=4, num_attention_heads=16,
+                   num_key_value_heads=4, vocab_size=8192),
+}
+VARIANTS = {
+    "peri_ln": dict(embedding_multiplier=10.0, logits_scaling=0.125, attention_multiplier=0.0625,
+                    residual_multiplier=0.25, use_post_norm=True),
+    "plain": dict(use_post_norm=False),
+}
+SUB_BLOCKS = ["attention", "mlp", "rms_norm", "residual"]
+
+# max abs error allowed relative to the magnitude of the outputs
+TOLERANCE = {torch.float32: 1e-4, torch.bfloat16: 3e-2}
+
+
+def make_config(name, variant, rope_scaling):
+    return HyperCLOVAXConfig(**CONFIGS[name], **VARIANTS[variant], max_position_embeddings=4096, rms_norm_eps=1e-5,
+                             rope_theta=10000.0, rope_scaling=dict(rope_scaling) if rope_scaling else None)
+
+
+def make_reference(config, dtype, seed=0):
+    model = HyperCLOVAXReferenceForCausalLM(config)
+    generator = torch.Generator().manual_seed(seed)
+    with torch.no_grad():
+        for name, param in model.named_parameters():
+            if "norm" in name:
+                param.copy_(1.0 + 0.1 * torch.randn(param.shape, generator=generator))
+            else:
+                param.copy_(0.02 * torch.randn(param.shape, generator=generator))
+    return model.to(dtype).eval()
+
+
+class ReferenceAttentionBackend(nn.Module):
+    '''
+    Stands in for vLLM's Attention in HyperCLOVAXAttention: flat q, k, v of one sequence -> flat output.
+    '''
+    def __init__(self, self_attn):
+        super().__init__()
+        self.num_heads = self_attn.num_heads
+        self.num_kv_heads = self_attn.num_kv_heads
+        self.head_dim = self_attn.head_dim
+        self.scaling = self_attn.scaling
+
+    def forward(self, q, k, v):
+        num_tokens = q.shape[0]
+        output = causal_attention(q.view(num_tokens, self.num_heads, self.head_dim),
+                                  k.view(num_tokens, self.num_kv_heads, self.head_dim),
+                                  v.view(num_tokens, self.num_kv_heads, self.head_dim), self.scaling)
+        return output.reshape(num_tokens, self.num_heads * self.head_dim)
+
+
+def init_vllm_distributed():
+    from vllm.config import VllmConfig, set_current_vllm_config
+    from vllm.distributed import init_distributed_environment, initialize_model_parallel
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    with set_current_vllm_config(VllmConfig()):
+        init_distributed_environment(world_size=1, rank=0, local_rank=0,
+                                     distributed_init_method=f"tcp://127.0.0.1:{port}", backend="gloo")
+        initialize_model_parallel(1, 1)
+
+
+def build_vllm_model(config, reference, dtype, prefix):
+    from vllm.config import VllmConfig, set_current_vllm_config
+
+    from model.vllm_hyperclovax import HyperCLOVAXModel
+
+    vllm_config = VllmConfig()
+    # HyperCLOVAXModel only reads these fields; the attention layers register in the current config
+    model_vllm_config = SimpleNamespace(model_config=SimpleNamespace(hf_config=config), cache_config=None,
+                                        quant_config=None, lora_config=None,
+                                        compilation_config=vllm_config.compilation_config)
+    default_dtype = torch.get_default_dtype()
+    torch.set_default_dtype(dtype)
+    try:
+        with set_current_vllm_config(vllm_config):
+            model = HyperCLOVAXModel(vllm_config=model_vllm_config, prefix=prefix)
+    finally:
+        torch.set_default_dtype(default_dtype)
+
+    for layer in model.layers:
+        layer.self_attn.attn = ReferenceAttentionBackend(layer.self_attn)
+    reference_params = dict(reference.model.named_parameters())
+    with torch.no_grad():
+        for name, param in model.named_parameters():
+            tensor = reference_params[name]
+            # the vocabulary of VocabParallelEmbedding is padded
+            param[:tensor.shape[0]].copy_(tensor)
+    return model.eval()
+
+
+def relative_error(output, expected):
+    return (output.float() - expected.float()).abs().max().item() / max(expected.float().abs().max().item(), 1.0)
+
+
+def check_parity(vllm_model, reference, num_tokens, dtype, seed=1):
+    generator = torch.Generator().manual_seed(seed)
+    config = reference.config
+    positions = torch.arange(num_tokens)
+    x = torch.randn(num_tokens, config.hidden_size, generator=generator).to(dtype)
+    input_ids = torch.randint(0, config.vocab_size, (num_tokens, ), generator=generator)
+
+    layer = vllm_model.layers[0]
+    reference_layer = reference.model.layers[0]
+    next_norm = vllm_model.layers[1].input_layernorm if len(vllm_model.layers) > 1 else vllm_model.norm
+    reference_next_norm = (reference.model.layers[1].input_layernorm if len(reference.model.layers) > 1
+                           else reference.model.norm)
+
+    # the fused residual steps may write into their inputs
+    hidden_states, residual = layer(positions, layer.input_layernorm(x.clone()), x.clone(), next_norm)
+    reference_residual = reference_layer(positions, x.clone(), 0)
+    errors = {
+        "layer": max(relative_error(residual, reference_residual),
+                     relative_error(hidden_states, reference_next_norm(reference_residual))),
+        "model": relative_error(vllm_model(input_ids, positions, None), reference.model(input_ids, positions)),
+    }
+    return errors
+
+
+def reference_residual_step(layer, h, x):
+    # unfused: post-norm, μP-scaled add, then the next pre-norm
+    if layer.use_post_norm:
+        h = layer.post_norm1(h)
+    residual = x + h * layer.residual_multiplier
+    return layer.post_attention_layernorm(residual), residual
+
+
+def get_sub_blocks(layer, positions, x, h, is_reference):
+    if is_reference:
+        return {
+            "attention": lambda: layer.self_attn(positions, h, 0),
+            "mlp": lambda: layer.mlp(h),
+            "rms_norm": lambda: layer.input_layernorm(x),
+            "residual": lambda: reference_residual_step(layer, h.clone(), x.clone()),
+        }
+
+    from model.vllm_hyperclovax import peri_ln_add_rms_norm
+
+    post_norm = layer.post_norm1 if layer.use_post_norm else None
+    return {
+        "attention": lambda: layer.self_attn(positions, h),
+        "mlp": lambda: layer.mlp(h),
+        "rms_norm": lambda: layer.input_layernorm(x),
+        "residual": lambda: peri_ln_add_rms_norm(h.clone(), x.clone(), layer.residual_multiplier, post_norm,
+                                                 layer.post_attention_layernorm),
+    }
+
+
+def measure(fn, repeats):
+    '''
+    Returns the median time of fn() and the bytes it allocates.
+    '''
+    fn()
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    with torch.profiler.profile(activities=[torch.profiler.ProfilerActivity.CPU], profile_memory=True) as profiler:
+        fn()
+    allocated = sum(max(event.self_cpu_memory_usage, 0) for event in profiler.key_averages())
+    return statistics.median(times), allocated
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Check the vLLM model file against the reference and time its sub-blocks.")
+    arg_parser.add_argument("--configs", nargs="+", default=list(CONFIGS), choices=list(CONFIGS))
+    arg_parser.add_argument("--variants", nargs="+", default=list(VARIANTS), choices=list(VARIANTS))
+    arg_parser.add_argument("--num-tokens", nargs="+", type=int, default=[16, 256])
+    arg_parser.add_argument("--dtype", default="float32", choices=["float32", "bfloat16"])
+    arg_parser.add_argument("--rope-scaling", type=json.loads, default=None, help="rope_scaling of the configs (JSON).")
+    arg_parser.add_argument("--repeats", type=int, default=20)
+    arg_parser.add_argument("--reference-only", action="store_true", help="Only time the reference (no vLLM needed).")
+    args = arg_parser.parse_args()
+
+    dtype = getattr(torch, args.dtype)
+    if not args.reference_only:
+        init_vllm_distributed()
+
+    passed = True
+    with torch.inference_mode():
+        for name in args.configs:
+            for variant in args.variants:
+                config = make_config(name, variant, args.rope_scaling)
+                reference = make_reference(config, dtype)
+                vllm_model = None
+                if not args.reference_only:
+                    vllm_model = build_vllm_model(config, reference, dtype, prefix=f"{name}_{variant}.model")
+
+                for num_tokens in args.num_tokens:
+                    line = f"{name:>6} {variant:>7} tokens={num_tokens:<5}"
+                    if vllm_model is not None:
+                        errors = check_parity(vllm_model, reference, num_tokens, dtype)
+                        ok = all(error <= TOLERANCE[dtype] for error in errors.values())
+                        passed &= ok
+                        line += " " + " ".join(f"{key}_err={error:.1e}" for key, error in errors.items())
+                        line += " ok" if ok else " FAIL"
+                    print(line)
+
+                    generator = torch.Generator().manual_seed(2)
+                    positions = torch.arange(num_tokens)
+                    x = torch.randn(num_tokens, config.hidden_size, generator=generator).to(dtype)
+                    h = reference.model.layers[0].input_layernorm(x)
+                    implementations = {"reference": get_sub_blocks(reference.model.layers[0], positions, x, h, True)}
+                    if vllm_model is not None:
+                        implementations["vllm"] = get_sub_blocks(vllm_model.layers[0], positions, x, h, False)
+                    for implementation, sub_blocks in implementations.items():
+                        results = [(sub_block, *measure(sub_blocks[sub_block], args.repeats)) for sub_block in SUB_BLOCKS]
+                        print(f"{'':>14} {implementation:>9}: " + " ".join(
+                            f"{sub_block}={seconds * 1e6:.1f}us/{allocated / 2**20:.2f}MiB"
+                            for sub_block, seconds, allocated in results))
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
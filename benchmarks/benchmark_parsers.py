@@ -0,0 +1,233 @@
+# HyperCLOVAX vLLM Plugin
+# Copyright (c) 2025-present NAVER Cloud Corp.
+# Apache-2.0
+"""
+Micro-benchmark of HcxReasoningParser / HcxToolParser on synthetic HCX outputs.
+
+Runs on CPU with a stand-in tokenizer (no model files needed):
+
+    python benchmarks/benchmark_parsers.py --lengths 100 1000 32000 --chunk-sizes 1 4 16 --output baseline.json
+    python benchmarks/benchmark_parsers.py --compare baseline.json
+
+`--parser-metrics noop` installs a no-op metrics sink, to measure the instrumentation overhead against a run without it.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vllm.entrypoints.openai.protocol import ChatCompletionRequest  # noqa: E402
+
+from parser import hcx_parser_metrics  # noqa: E402
+from parser.hcx_reasoner import HcxReasoningParser  # noqa: E402
+from parser.hcx_tool_parser import HcxToolParser  # noqa: E402
+
+SPECIAL_TOKENS = ["<|im_end|>", "<|im_start|>", "<|endofturn|>", "<|stop|>"]
+THINK_START = "/think\n"
+THINK_END = "<|im_end|>\n<|im_start|>assistant"
+FUNCTION_CALL_ROLE = " -> tool/function_call\n"
+WORDS = ("the model considers each step of the problem carefully and checks the intermediate "
+         "result before writing an answer with { braces } \"quotes\" and <tags> in between").split()
+
+
+class StandInTokenizer:
+    '''
+    Whitespace/punctuation level tokenizer with the HCX special tokens as single ids.
+    '''
+    SPLIT_REGEX = re.compile("(" + "|".join(map(re.escape, SPECIAL_TOKENS)) + r")|(\w+|\s|[^\w\s])")
+
+    def __init__(self):
+        self.vocab = {token: idx for idx, token in enumerate(SPECIAL_TOKENS)}
+        self.id_to_token = list(SPECIAL_TOKENS)
+
+    def token_id(self, token):
+        if token not in self.vocab:
+            self.vocab[token] = len(self.id_to_token)
+            self.id_to_token.append(token)
+        return self.vocab[token]
+
+    def encode(self, text, add_special_tokens=True):
+        return [self.token_id(m.group()) for m in self.SPLIT_REGEX.finditer(text)]
+
+    def decode(self, token_ids):
+        return "".join(self.id_to_token[token_id] for token_id in token_ids)
+
+    def get_vocab(self):
+        return dict(self.vocab)
+
+
+def filler(rng, num_tokens):
+    # each word is followed by a space, so ~2 tokens per word
+    return " ".join(rng.choice(WORDS) for _ in range(max(1, num_tokens // 2)))
+
+
+def tool_calls_text(rng, num_tokens, num_calls):
+    calls = []
+    for idx in range(num_calls):
+        calls.append({"name": f"tool_{idx}",
+                      "arguments": {"query": filler(rng, num_tokens // num_calls), "limit": idx + 1}})
+    return json.dumps(calls, ensure_ascii=False)
+
+
+def make_output(kind, num_tokens, seed=0):
+    rng = random.Random(seed)
+    half = num_tokens // 2
+    if kind == "reasoning":
+        return THINK_START + filler(rng, half) + THINK_END + "\n" + filler(rng, half) + "<|im_end|>"
+    if kind == "no_reasoning":
+        return "\n" + filler(rng, num_tokens) + "<|im_end|>"
+    if kind == "reasoning_tool_call":
+        return THINK_START + filler(rng, half) + THINK_END + FUNCTION_CALL_ROLE + tool_calls_text(rng, half, 1) + "<|im_end|>"
+    if kind == "tool_calls":
+        return FUNCTION_CALL_ROLE + tool_calls_text(rng, num_tokens, 4) + "<|im_end|>"
+    raise ValueError(f"Unknown output kind: {kind}")
+
+
+OUTPUT_KINDS = ["reasoning", "no_reasoning", "reasoning_tool_call", "tool_calls"]
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def replay_streaming(parser_name, tokenizer, token_ids, chunk_size, request):
+    if parser_name == "reasoning":
+        parser = HcxReasoningParser(tokenizer)
+    else:
+        parser = HcxToolParser(tokenizer)
+
+    # decode the deltas up front so only the parser is timed
+    deltas = []
+    for idx in range(0, len(token_ids), chunk_size):
+        delta_token_ids = token_ids[idx:idx + chunk_size]
+        deltas.append((delta_token_ids, tokenizer.decode(delta_token_ids)))
+
+    latencies = []
+    previous_text, previous_token_ids = "", []
+    for delta_token_ids, delta_text in deltas:
+        current_text = previous_text + delta_text
+        current_token_ids = previous_token_ids + delta_token_ids
+        start = time.perf_counter()
+        if parser_name == "reasoning":
+            parser.extract_reasoning_content_streaming(previous_text, current_text, delta_text,
+                                                       previous_token_ids, current_token_ids, delta_token_ids)
+        else:
+            parser.extract_tool_calls_streaming(previous_text, current_text, delta_text,
+                                                previous_token_ids, current_token_ids, delta_token_ids, request)
+        latencies.append(time.perf_counter() - start)
+        previous_text, previous_token_ids = current_text, current_token_ids
+    return latencies
+
+
+def run_non_streaming(parser_name, tokenizer, text, request):
+    start = time.perf_counter()
+    if parser_name == "reasoning":
+        HcxReasoningParser(tokenizer).extract_reasoning_content(text, request)
+    else:
+        HcxToolParser(tokenizer).extract_tool_calls(text, request)
+    return time.perf_counter() - start
+
+
+def measure(fn):
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak
+
+
+def run(args):
+    tokenizer = StandInTokenizer()
+    request = ChatCompletionRequest(messages=[], model="hcx", tool_choice="auto")
+    results = []
+    for parser_name in args.parsers:
+        for kind in args.kinds:
+            for num_tokens in args.lengths:
+                text = make_output(kind, num_tokens)
+                token_ids = tokenizer.encode(text)
+
+                non_streaming, peak = measure(lambda: run_non_streaming(parser_name, tokenizer, text, request))
+                results.append({"parser": parser_name, "kind": kind, "num_tokens": len(token_ids),
+                                "mode": "non_streaming", "chunk_size": None,
+                                "tokens_per_s": len(token_ids) / non_streaming if non_streaming else 0.0,
+                                "total_ms": non_streaming * 1e3, "peak_memory_kb": peak / 1024})
+                print_result(results[-1])
+
+                for chunk_size in args.chunk_sizes:
+                    latencies, peak = measure(
+                        lambda: replay_streaming(parser_name, tokenizer, token_ids, chunk_size, request))
+                    total = sum(latencies)
+                    results.append({"parser": parser_name, "kind": kind, "num_tokens": len(token_ids),
+                                    "mode": "streaming", "chunk_size": chunk_size,
+                                    "tokens_per_s": len(token_ids) / total if total else 0.0,
+                                    "total_ms": total * 1e3,
+                                    "p50_delta_us": percentile(latencies, 50) * 1e6,
+                                    "p99_delta_us": percentile(latencies, 99) * 1e6,
+                                    "mean_delta_us": statistics.fmean(latencies) * 1e6,
+                                    "peak_memory_kb": peak / 1024})
+                    print_result(results[-1])
+    return results
+
+
+def print_result(result):
+    line = (f"{result['parser']:>9} {result['kind']:>19} {result['num_tokens']:>7} tokens "
+            f"{result['mode']:>13} chunk={str(result['chunk_size']):>4} "
+            f"{result['tokens_per_s']:>12.0f} tok/s")
+    if result["mode"] == "streaming":
+        line += f" p50={result['p50_delta_us']:.1f}us p99={result['p99_delta_us']:.1f}us"
+    line += f" peak={result['peak_memory_kb']:.0f}KiB"
+    print(line)
+
+
+def result_key(result):
+    return (result["parser"], result["kind"], result["num_tokens"], result["mode"], result["chunk_size"])
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {result_key(result): result for result in json.load(f)["results"]}
+    print(f"\nCompared with {baseline_path} (>1.00 is faster):")
+    for result in results:
+        base = baseline.get(result_key(result))
+        if base is None or not result["tokens_per_s"]:
+            continue
+        speedup = result["tokens_per_s"] / base["tokens_per_s"] if base["tokens_per_s"] else float("inf")
+        print(f"{result['parser']:>9} {result['kind']:>19} {result['num_tokens']:>7} tokens "
+              f"{result['mode']:>13} chunk={str(result['chunk_size']):>4} x{speedup:.2f}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark the HCX reasoning and tool parsers.")
+    arg_parser.add_argument("--parsers", nargs="+", default=["reasoning", "tool"], choices=["reasoning", "tool"])
+    arg_parser.add_argument("--kinds", nargs="+", default=OUTPUT_KINDS, choices=OUTPUT_KINDS)
+    arg_parser.add_argument("--lengths", nargs="+", type=int, default=[100, 1000, 8000, 32000, 128000])
+    arg_parser.add_argument("--chunk-sizes", nargs="+", type=int, default=[1, 4, 16])
+    arg_parser.add_argument("--parser-metrics", default="off", choices=["off", "noop"],
+                            help="Run without parser metrics, or with a no-op metrics sink.")
+    arg_parser.add_argument("--output", type=str, default=None, help="Save the results as a JSON baseline.")
+    arg_parser.add_argument("--compare", type=str, default=None, help="Compare with a saved JSON baseline.")
+    args = arg_parser.parse_args()
+
+    hcx_parser_metrics.set_parser_metrics(
+        hcx_parser_metrics.HcxParserMetricsSink() if args.parser_metrics == "noop" else None)
+    results = run(args)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"results": results}, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# HyperCLOVAX vLLM Plugin
+# Copyright (c) 2025-present NAVER Cloud Corp.
+# Apache-2.0
+"""
+Parity check and CPU timing of the Peri-LN residual step of HyperCLOVAXDecoderLayer (post-norm custom op, then
+the residual_multiplier-scaled add and the next pre-norm in one fused_add_rms_norm) against the original unfused
+op sequence.
+
+    python benchmarks/benchmark_peri_ln.py --hidden-sizes 1024 5120 --num-tokens 1 256 --dtypes float32 bfloat16
+    python benchmarks/benchmark_peri_ln.py --compile   # also time the torch.compile'd fused step
+"""
+import argparse
+import os
+import sys
+import time
+
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vllm.model_executor.layers.layernorm import RMSNorm  # noqa: E402
+
+from model.vllm_hyperclovax import peri_ln_add_rms_norm, peri_ln_add_rms_norm_reference  # noqa: E402
+
+# max abs error allowed relative to the magnitude of the outputs
+TOLERANCE = {torch.float32: 1e-5, torch.bfloat16: 2e-2, torch.float16: 4e-3}
+
+
+def make_norm(hidden_size, dtype, seed):
+    norm = RMSNorm(hidden_size, eps=1e-5).to(dtype)
+    generator = torch.Generator().manual_seed(seed)
+    with torch.no_grad():
+        norm.weight.copy_(1.0 + 0.1 * torch.randn(hidden_size, generator=generator))
+    return norm
+
+
+def time_fn(fn, repeats):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats
+
+
+def check(hidden_size, num_tokens, dtype, multiplier, use_post_norm, compiled, repeats):
+    post_norm = make_norm(hidden_size, dtype, 0) if use_post_norm else None
+    norm = make_norm(hidden_size, dtype, 1)
+    generator = torch.Generator().manual_seed(2)
+    x = torch.randn(num_tokens, hidden_size, generator=generator).to(dtype)
+    residual = torch.randn(num_tokens, hidden_size, generator=generator).to(dtype)
+
+    # vLLM's fused_add_rms_norm writes into its inputs, so every call gets fresh copies
+    with torch.no_grad():
+        out, new_residual = peri_ln_add_rms_norm(x.clone(), residual.clone(), multiplier, post_norm, norm)
+        ref_out, ref_residual = peri_ln_add_rms_norm_reference(x.clone(), residual.clone(), multiplier, post_norm, norm)
+
+        error = max((out - ref_out).abs().max().item() / max(ref_out.abs().max().item(), 1.0),
+                    (new_residual - ref_residual).abs().max().item() / max(ref_residual.abs().max().item(), 1.0))
+        passed = error <= TOLERANCE[dtype]
+
+        fused_s = time_fn(lambda: peri_ln_add_rms_norm(x.clone(), residual.clone(), multiplier, post_norm, norm), repeats)
+        ref_s = time_fn(lambda: peri_ln_add_rms_norm_reference(x.clone(), residual.clone(), multiplier, post_norm, norm), repeats)
+        line = (f"hidden={hidden_size:>6} tokens={num_tokens:>5} {str(dtype):>14} m={multiplier:<5} "
+                f"post_norm={use_post_norm!s:>5} rel_err={error:.2e} {'ok' if passed else 'FAIL'} "
+                f"reference={ref_s * 1e6:.1f}us fused={fused_s * 1e6:.1f}us")
+        if compiled is not None:
+            compiled_s = time_fn(lambda: compiled(x.clone(), residual.clone(), multiplier, post_norm, norm), repeats)
+            line += f" compiled={compiled_s * 1e6:.1f}us"
+    print(line)
+    return passed
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Parity and timing of the fused Peri-LN residual step.")
+    arg_parser.add_argument("--hidden-sizes", nargs="+", type=int, default=[1024, 5120])
+    arg_parser.add_argument("--num-tokens", nargs="+", type=int, default=[1, 256])
+    arg_parser.add_argument("--dtypes", nargs="+", default=["float32", "bfloat16"], choices=["float32", "bfloat16", "float16"])
+    arg_parser.add_argument("--multipliers", nargs="+", type=float, default=[1.0, 0.25])
+    arg_parser.add_argument("--repeats", type=int, default=100)
+    arg_parser.add_argument("--compile", action="store_true", help="Also time torch.compile(peri_ln_add_rms_norm).")
+    args = arg_parser.parse_args()
+
+    compiled = torch.compile(peri_ln_add_rms_norm, dynamic=True) if args.compile else None
+    passed = True
+    for hidden_size in args.hidden_sizes:
+        for num_tokens in args.num_tokens:
+            for dtype in args.dtypes:
+                for multiplier in args.multipliers:
+                    for use_post_norm in (False, True):
+                        passed &= check(hidden_size, num_tokens, getattr(torch, dtype), multiplier, use_post_norm,
+                                        compiled, args.repeats)
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
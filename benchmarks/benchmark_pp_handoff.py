@@ -0,0 +1,72 @@
+# HyperCLOVAX vLLM Plugin
+# Copyright (c) 2025-present NAVER Cloud Corp.
+# Apache-2.0
+"""
+Bytes sent per token between pipeline stages of HyperCLOVAXModel, for a simulated split of a config.
+
+Runs on CPU: the intermediate tensors are built with the model's make_empty_intermediate_tensors factory for each
+stage boundary, and compared with the previous contract that also sent a `residual` tensor.
+
+    python benchmarks/benchmark_pp_handoff.py --pipeline-parallel-size 4
+    python benchmarks/benchmark_pp_handoff.py --config <checkpoint>/config.json --pipeline-parallel-size 8 --dtype bfloat16
+"""
+import argparse
+import json
+import os
+import sys
+
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vllm.distributed.utils import get_pp_indices  # noqa: E402
+from vllm.model_executor.models.utils import make_empty_intermediate_tensors_factory  # noqa: E402
+
+from model.vllm_hyperclovax import HyperCLOVAXModel  # noqa: E402
+
+PREVIOUS_INTERMEDIATE_TENSOR_KEYS = ["hidden_states", "residual"]
+TINY_CONFIG = {"hidden_size": 256, "num_hidden_layers": 8}
+
+
+def bytes_per_token(keys, hidden_size, num_tokens, dtype):
+    factory = make_empty_intermediate_tensors_factory(keys, hidden_size)
+    intermediate_tensors = factory(num_tokens, dtype, torch.device("cpu"))
+    return sum(tensor.numel() * tensor.element_size()
+               for tensor in intermediate_tensors.tensors.values()) / num_tokens
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Inter-stage bytes per token of HyperCLOVAXModel.")
+    arg_parser.add_argument("--config", type=str, default=None, help="config.json of a checkpoint (default: tiny).")
+    arg_parser.add_argument("--pipeline-parallel-size", type=int, default=4)
+    arg_parser.add_argument("--num-tokens", type=int, default=512)
+    arg_parser.add_argument("--dtype", default="bfloat16", choices=["float32", "bfloat16", "float16"])
+    args = arg_parser.parse_args()
+
+    config = TINY_CONFIG
+    if args.config:
+        with open(args.config) as f:
+            config = json.load(f)
+    hidden_size, num_layers = config["hidden_size"], config["num_hidden_layers"]
+    dtype = getattr(torch, args.dtype)
+
+    for rank in range(args.pipeline_parallel_size):
+        start, end = get_pp_indices(num_layers, rank, args.pipeline_parallel_size)
+        print(f"stage {rank}: layers [{start}, {end})")
+
+    current = bytes_per_token(HyperCLOVAXModel.intermediate_tensor_keys, hidden_size, args.num_tokens, dtype)
+    previous = bytes_per_token(PREVIOUS_INTERMEDIATE_TENSOR_KEYS, hidden_size, args.num_tokens, dtype)
+    num_boundaries = args.pipeline_parallel_size - 1
+    print(f"per boundary: {current:.0f} B/token (previously {previous:.0f} B/token)")
+    print(f"per token over {num_boundaries} boundaries: {current * num_boundaries:.0f} B "
+          f"(previously {previous * num_boundaries:.0f} B, x{current / previous:.2f})")
+
+    # only the residual stream should cross a stage boundary
+    expected = hidden_size * torch.tensor([], dtype=dtype).element_size()
+    if current != expected:
+        print(f"FAIL: expected {expected} B/token per boundary")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# HyperCLOVAX vLLM Plugin
+# Copyright (c) 2025-present NAVER Cloud Corp.
+# Apache-2.0
+"""
+CPU simulation of HcxStructuredProposer on synthetic HCX outputs (stand-in tokenizer, no model files needed).
+
+Each output is replayed as a greedy target model would generate it: at every decode step the proposer drafts up to
+k tokens, the drafts matching the output are accepted, and one more token is generated by the step.
+Reports the decode steps against one step per token, the acceptance rate and the time spent in propose().
+
+    python benchmarks/benchmark_speculative_proposer.py --lengths 200 2000 --num-speculative-tokens 2 4 8
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.benchmark_parsers import OUTPUT_KINDS, StandInTokenizer, make_output  # noqa: E402
+from parser.hcx_speculative_proposer import HcxStructuredProposer  # noqa: E402
+
+# the tools called by benchmark_parsers.tool_calls_text
+TOOLS = [{
+    "type": "function",
+    "function": {
+        "name": f"tool_{idx}",
+        "parameters": {
+            "type": "object",
+            "properties": {"query": {"type": "string"}, "limit": {"type": "integer"}},
+            "required": ["query", "limit"],
+        },
+    },
+} for idx in range(4)]
+
+
+def simulate(tokenizer, token_ids, tools, num_speculative_tokens):
+    proposer = HcxStructuredProposer(tokenizer, tools)
+    position, num_steps, propose_s = 0, 0, 0.0
+    while position < len(token_ids):
+        start = time.perf_counter()
+        proposal = proposer.propose(token_ids[:position], num_speculative_tokens)
+        propose_s += time.perf_counter() - start
+
+        num_accepted = 0
+        for proposed, generated in zip(proposal, token_ids[position:]):
+            if proposed != generated:
+                break
+            num_accepted += 1
+        position += num_accepted + 1
+        num_steps += 1
+    # records the acceptance of the last proposal
+    proposer.propose(token_ids, 0)
+    return proposer, num_steps, propose_s
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Simulate the HCX structured draft proposer.")
+    arg_parser.add_argument("--lengths", nargs="+", type=int, default=[200, 2000])
+    arg_parser.add_argument("--num-speculative-tokens", nargs="+", type=int, default=[2, 4, 8])
+    arg_parser.add_argument("--kinds", nargs="+", default=OUTPUT_KINDS, choices=OUTPUT_KINDS)
+    args = arg_parser.parse_args()
+
+    for kind in args.kinds:
+        for length in args.lengths:
+            tokenizer = StandInTokenizer()
+            token_ids = tokenizer.encode(make_output(kind, length))
+            tools = TOOLS if "tool_call" in kind else None
+            for k in args.num_speculative_tokens:
+                proposer, num_steps, propose_s = simulate(tokenizer, token_ids, tools, k)
+                print(f"{kind:>20} len={length:<6} k={k:<2} tokens={len(token_ids):<6} steps={num_steps:<6} "
+                      f"saved={1 - num_steps / len(token_ids):6.1%} "
+                      f"proposed={proposer.num_proposed_tokens:<5} accepted={proposer.num_accepted_tokens:<5} "
+                      f"acceptance={proposer.acceptance_rate:6.1%} "
+                      f"propose={propose_s / num_steps * 1e6:6.1f}us/step")
+
+
+if __name__ == "__main__":
+    main()
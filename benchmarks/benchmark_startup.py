@@ -0,0 +1,90 @@
+# HyperCLOVAX vLLM Plugin
+# Copyright (c) 2025-present NAVER Cloud Corp.
+# Apache-2.0
+"""
+Import time and RSS added by the plugin entry points, per vLLM process type.
+
+Each measurement runs in a fresh interpreter that first imports vllm (as every vLLM process does), then runs:
+- worker: the three `vllm.general_plugins` entry points, as in every spawned worker
+- api_server: the entry points, then resolves the `hcx` reasoning and tool parsers
+- engine: the entry points, then resolves the HyperCLOVAXForCausalLM class
+`--eager` also measures importing every plugin module up front, as the entry points did before lazy registration.
+
+    python benchmarks/benchmark_startup.py --repeats 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROCESS_TYPES = ["worker", "api_server", "engine"]
+
+CHILD = r'''
+import json, sys, time
+sys.path.insert(0, ROOT)
+
+def rss_kib():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+import vllm  # noqa: F401
+base_rss = rss_kib()
+start = time.perf_counter()
+
+if MODE == "eager":
+    import model.vllm_hyperclovax, parser.hcx_reasoner, parser.hcx_tool_parser  # noqa: F401, E401
+import model, parser  # noqa: E401
+model.register()
+parser.register_reasoning_parser()
+parser.register_tool_parser()
+plugins_s = time.perf_counter() - start
+
+if PROCESS_TYPE == "api_server":
+    from vllm.reasoning import ReasoningParserManager
+    from vllm.entrypoints.openai.tool_parsers.abstract_tool_parser import ToolParserManager
+    ReasoningParserManager.get_reasoning_parser("hcx")
+    ToolParserManager.get_tool_parser("hcx")
+elif PROCESS_TYPE == "engine":
+    from vllm import ModelRegistry
+    ModelRegistry.resolve_model_cls(["HyperCLOVAXForCausalLM"])
+
+print(json.dumps({"plugins_s": plugins_s, "total_s": time.perf_counter() - start,
+                  "rss_mib": (rss_kib() - base_rss) / 1024,
+                  "model_imported": "model.vllm_hyperclovax" in sys.modules,
+                  "parsers_imported": "parser.hcx_tool_parser" in sys.modules}))
+'''
+
+
+def measure(process_type, mode):
+    code = f"ROOT = {ROOT!r}\nMODE = {mode!r}\nPROCESS_TYPE = {process_type!r}\n" + CHILD
+    result = subprocess.run([sys.executable, "-c", code], check=True, stdout=subprocess.PIPE, text=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark the startup cost of the plugin entry points.")
+    arg_parser.add_argument("--process-types", nargs="+", default=PROCESS_TYPES, choices=PROCESS_TYPES)
+    arg_parser.add_argument("--repeats", type=int, default=3)
+    arg_parser.add_argument("--eager", action="store_true", help="Also measure importing every plugin module.")
+    args = arg_parser.parse_args()
+
+    modes = ["lazy", "eager"] if args.eager else ["lazy"]
+    for process_type in args.process_types:
+        for mode in modes:
+            results = [measure(process_type, mode) for _ in range(args.repeats)]
+            print(f"{process_type:>10} {mode:>5}: "
+                  f"plugins {statistics.median(r['plugins_s'] for r in results) * 1e3:7.1f}ms "
+                  f"total {statistics.median(r['total_s'] for r in results) * 1e3:7.1f}ms "
+                  f"+RSS {statistics.median(r['rss_mib'] for r in results):6.1f}MiB "
+                  f"model imported={results[-1]['model_imported']} parsers imported={results[-1]['parsers_imported']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# HyperCLOVAX vLLM Plugin
+# Copyright (c) 2025-present NAVER Cloud Corp.
+# Apache-2.0
+"""
+Read throughput of a safetensors checkpoint, sequential vs. iterate_safetensors_parallel, on CPU.
+With --fused, also compares building the parameter tensors from the checkpoint (stacking, mistral permutes, dtype
+casts) against reading the same tensors from a checkpoint converted by hcx-convert-checkpoint.
+
+Drop the page cache between runs for cold-start numbers (`sync; echo 3 > /proc/sys/vm/drop_caches`).
+
+    python benchmarks/benchmark_weight_loading.py --checkpoint <checkpoint dir> --threads 1 4 8 --prefetch 16
+    python benchmarks/benchmark_weight_loading.py --checkpoint <checkpoint dir> --fused <fused checkpoint dir>
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from safetensors import safe_open  # noqa: E402
+
+from model.hcx_checkpoint import CheckpointReader, iterate_fused_tensors, load_config  # noqa: E402
+from model.hcx_weight_loader import iterate_safetensors_parallel  # noqa: E402
+
+
+def iterate_safetensors(files):
+    for path in files:
+        with safe_open(path, framework="pt") as f:
+            for name in f.keys():
+                yield name, f.get_tensor(name)
+
+
+def consume(weights):
+    start = time.perf_counter()
+    num_tensors, num_bytes = 0, 0
+    for _, tensor in weights:
+        num_tensors += 1
+        num_bytes += tensor.numel() * tensor.element_size()
+    return num_tensors, num_bytes, time.perf_counter() - start
+
+
+def print_result(label, num_tensors, num_bytes, seconds):
+    print(f"{label:>22}: {num_tensors} tensors, {num_bytes / 2**30:.2f} GiB in {seconds:.2f}s "
+          f"({num_bytes / 2**30 / seconds:.2f} GiB/s)")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark reading a safetensors checkpoint.")
+    arg_parser.add_argument("--checkpoint", required=True, help="Directory with *.safetensors files.")
+    arg_parser.add_argument("--threads", nargs="+", type=int, default=[1, 4, 8])
+    arg_parser.add_argument("--prefetch", type=int, default=16)
+    arg_parser.add_argument("--fused", type=str, default=None, help="The checkpoint converted by hcx-convert-checkpoint.")
+    args = arg_parser.parse_args()
+
+    files = sorted(glob.glob(os.path.join(args.checkpoint, "*.safetensors")))
+    if not files:
+        sys.exit(f"No safetensors files in {args.checkpoint}")
+
+    print_result("sequential", *consume(iterate_safetensors(files)))
+    for num_threads in args.threads:
+        print_result(f"parallel ({num_threads} threads)",
+                     *consume(iterate_safetensors_parallel(files, num_threads, args.prefetch)))
+
+    if args.fused:
+        fused_files = sorted(glob.glob(os.path.join(args.fused, "*.safetensors")))
+        dtype = next(iterate_safetensors(fused_files))[1].dtype
+        reader = CheckpointReader(args.checkpoint, load_config(args.checkpoint))
+        print_result("stacked from source", *consume(iterate_fused_tensors(reader, dtype)))
+        print_result("fused", *consume(iterate_safetensors(fused_files)))
+
+
+if __name__ == "__main__":
+    main()
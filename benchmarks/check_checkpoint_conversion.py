@@ -0,0 +1,145 @@
+# HyperCLOVAX vLLM Plugin
+# Copyright (c) 2025-present NAVER Cloud Corp.
+# Apache-2.0
+"""
+Checks hcx-convert-checkpoint on CPU with a tiny random checkpoint written in both input formats:
+- HF: config.json and q/k/v_proj, gate/up_proj tensors
+- mistral: params.json only, with wq/wk/wv/wo, w1/w2/w3 tensors and wq/wk in the interleaved rotary layout
+
+Each is converted and verified, and both fused checkpoints must hold the same tensors and the same model config.
+
+    python benchmarks/check_checkpoint_conversion.py
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+import torch
+from safetensors import safe_open
+from safetensors.torch import save_file
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model.hcx_checkpoint import VERIFIED_CONFIG_KEYS, convert, load_config, verify  # noqa: E402
+
+PARAMS = {"dim": 64, "n_layers": 2, "n_heads": 4, "n_kv_heads": 2, "head_dim": 16, "hidden_dim": 128,
+          "vocab_size": 256, "norm_eps": 1e-5, "rope_theta": 10000.0, "max_seq_len": 512}
+CONFIG = {"architectures": ["HyperCLOVAXForCausalLM"], "model_type": "hyperclovax", "hidden_size": 64,
+          "num_hidden_layers": 2, "num_attention_heads": 4, "num_key_value_heads": 2, "head_dim": 16,
+          "intermediate_size": 128, "vocab_size": 256, "rms_norm_eps": 1e-5, "rope_theta": 10000.0,
+          "max_position_embeddings": 512, "torch_dtype": "float32"}
+
+
+def make_hf_tensors(seed):
+    generator = torch.Generator().manual_seed(seed)
+    hidden_size, head_dim = CONFIG["hidden_size"], CONFIG["head_dim"]
+    shapes = {"model.embed_tokens.weight": (CONFIG["vocab_size"], hidden_size),
+              "model.norm.weight": (hidden_size, ),
+              "lm_head.weight": (CONFIG["vocab_size"], hidden_size)}
+    for idx in range(CONFIG["num_hidden_layers"]):
+        prefix = f"model.layers.{idx}"
+        shapes[f"{prefix}.self_attn.q_proj.weight"] = (CONFIG["num_attention_heads"] * head_dim, hidden_size)
+        shapes[f"{prefix}.self_attn.k_proj.weight"] = (CONFIG["num_key_value_heads"] * head_dim, hidden_size)
+        shapes[f"{prefix}.self_attn.v_proj.weight"] = (CONFIG["num_key_value_heads"] * head_dim, hidden_size)
+        shapes[f"{prefix}.self_attn.o_proj.weight"] = (hidden_size, CONFIG["num_attention_heads"] * head_dim)
+        shapes[f"{prefix}.mlp.gate_proj.weight"] = (CONFIG["intermediate_size"], hidden_size)
+        shapes[f"{prefix}.mlp.up_proj.weight"] = (CONFIG["intermediate_size"], hidden_size)
+        shapes[f"{prefix}.mlp.down_proj.weight"] = (hidden_size, CONFIG["intermediate_size"])
+        shapes[f"{prefix}.input_layernorm.weight"] = (hidden_size, )
+        shapes[f"{prefix}.post_attention_layernorm.weight"] = (hidden_size, )
+    return {name: torch.randn(shape, generator=generator) for name, shape in shapes.items()}
+
+
+def to_mistral(hf_tensors):
+    '''
+    The mistral-format names and rotary layout of the HF tensors (the inverse of permute_mistral_weight).
+    '''
+    def unpermute(w, n_heads):
+        head_dim = CONFIG["head_dim"]
+        return w.view(n_heads, 2, head_dim // 2, -1).transpose(1, 2).reshape(n_heads * head_dim, -1)
+
+    names = {"model.embed_tokens": "tok_embeddings", "model.norm": "norm", "lm_head": "output"}
+    layer_names = {"self_attn.q_proj": "attention.wq", "self_attn.k_proj": "attention.wk",
+                   "self_attn.v_proj": "attention.wv", "self_attn.o_proj": "attention.wo",
+                   "mlp.gate_proj": "feed_forward.w1", "mlp.down_proj": "feed_forward.w2",
+                   "mlp.up_proj": "feed_forward.w3", "input_layernorm": "attention_norm",
+                   "post_attention_layernorm": "ffn_norm"}
+    tensors = {}
+    for name, tensor in hf_tensors.items():
+        module = name[:-len(".weight")]
+        if module in names:
+            tensors[f"{names[module]}.weight"] = tensor
+            continue
+        _, _, idx, layer_module = module.split(".", 3)
+        mistral_module = layer_names[layer_module]
+        if mistral_module == "attention.wq":
+            tensor = unpermute(tensor, CONFIG["num_attention_heads"])
+        elif mistral_module == "attention.wk":
+            tensor = unpermute(tensor, CONFIG["num_key_value_heads"])
+        tensors[f"layers.{idx}.{mistral_module}.weight"] = tensor.contiguous()
+    return tensors
+
+
+def read_tensors(path):
+    tensors = {}
+    for file in sorted(os.listdir(path)):
+        if file.endswith(".safetensors"):
+            with safe_open(os.path.join(path, file), framework="pt") as f:
+                tensors.update({name: f.get_tensor(name) for name in f.keys()})
+    return tensors
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Check the checkpoint converter with HF and mistral inputs.")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    hf_tensors = make_hf_tensors(args.seed)
+    passed = True
+    with tempfile.TemporaryDirectory() as root:
+        hf_path, mistral_path = os.path.join(root, "hf"), os.path.join(root, "mistral")
+        os.makedirs(hf_path)
+        os.makedirs(mistral_path)
+        with open(os.path.join(hf_path, "config.json"), "w") as f:
+            json.dump(CONFIG, f)
+        save_file(hf_tensors, os.path.join(hf_path, "model.safetensors"))
+        with open(os.path.join(mistral_path, "params.json"), "w") as f:
+            json.dump(PARAMS, f)
+        save_file(to_mistral(hf_tensors), os.path.join(mistral_path, "consolidated.safetensors"))
+
+        fused = {}
+        for name, path in (("hf", hf_path), ("mistral", mistral_path)):
+            output_path = os.path.join(root, f"{name}_fused")
+            convert(path, output_path, torch.float32, 2**30)
+            errors = verify(path, output_path)
+            passed &= not errors
+            print(f"{name:>16} {'ok' if not errors else 'FAIL'}")
+            for error in errors:
+                print(f"{'':>16} {error}")
+            fused[name] = output_path
+
+        errors = []
+        hf_fused, mistral_fused = read_tensors(fused["hf"]), read_tensors(fused["mistral"])
+        for name in sorted(set(hf_fused) | set(mistral_fused)):
+            if name not in hf_fused or name not in mistral_fused:
+                errors.append(f"{name}: only in one of the fused checkpoints")
+            elif not torch.equal(hf_fused[name], mistral_fused[name]):
+                errors.append(f"{name}: differs between the fused checkpoints")
+        if os.path.exists(os.path.join(fused["mistral"], "params.json")):
+            errors.append("params.json was copied to the fused checkpoint")
+        hf_config, mistral_config = load_config(hf_path), load_config(mistral_path)
+        for key in VERIFIED_CONFIG_KEYS:
+            if getattr(hf_config, key, None) != getattr(mistral_config, key, None):
+                errors.append(f"{key}: {getattr(hf_config, key, None)!r} (HF) != "
+                              f"{getattr(mistral_config, key, None)!r} (mistral)")
+        passed &= not errors
+        print(f"{'hf_vs_mistral':>16} {'ok' if not errors else 'FAIL'}")
+        for error in errors:
+            print(f"{'':>16} {error}")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
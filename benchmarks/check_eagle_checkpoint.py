@@ -0,0 +1,227 @@
+# HyperCLOVAX vLLM Plugin
+# Copyright (c) 2025-present NAVER Cloud Corp.
+# Apache-2.0
+"""
+Checks on CPU that an EAGLE checkpoint fits HyperCLOVAXForCausalLMEagle and its target model: tensor names and shapes
+against the draft config, and the hidden size, vocabulary and μP / Peri-LN settings against the target config.
+
+    python benchmarks/check_eagle_checkpoint.py --target <HyperCLOVAX checkpoint> --draft <EAGLE checkpoint>
+
+--parity also checks HyperCLOVAXEagleModel.forward against a reference EAGLE head built from the reference
+implementation (model/hcx_reference.py), with the same random weights and the configs of benchmark_layers.py:
+fc(concat(μP-scaled embedding, target hidden state)), then the decoder layers with no input_layernorm in the first
+one and no final norm. As in benchmark_layers.py, vLLM's attention backend is replaced by the reference attention,
+so a CPU build of vLLM is enough.
+
+    python benchmarks/check_eagle_checkpoint.py --parity --num-layers 1 2 --num-tokens 16
+
+Serve with the draft:
+
+    vllm serve <HyperCLOVAX checkpoint> --speculative-config '{"method": "eagle", "model": "<EAGLE checkpoint>", "num_speculative_tokens": 3}'
+"""
+import argparse
+import glob
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import torch  # noqa: E402
+from safetensors import safe_open  # noqa: E402
+from torch import nn  # noqa: E402
+
+from benchmarks.benchmark_layers import (CONFIGS, TOLERANCE, VARIANTS, ReferenceAttentionBackend,  # noqa: E402
+                                         init_vllm_distributed, make_config, make_reference, relative_error)
+from model.configuration_hyperclovax import HyperCLOVAXConfig  # noqa: E402
+
+MUP_ATTRIBUTES = ["embedding_multiplier", "logits_scaling", "attention_multiplier", "residual_multiplier",
+                  "use_post_norm"]
+
+
+def get_expected_shapes(config):
+    hidden_size = config.hidden_size
+    head_dim = config.head_dim
+    q_size = config.num_attention_heads * head_dim
+    kv_size = config.num_key_value_heads * head_dim
+    shapes = {"fc.weight": (hidden_size, 2 * hidden_size)}
+    for idx in range(config.num_hidden_layers):
+        prefix = f"layers.{idx}"
+        shapes.update({
+            f"{prefix}.self_attn.q_proj.weight": (q_size, hidden_size),
+            f"{prefix}.self_attn.k_proj.weight": (kv_size, hidden_size),
+            f"{prefix}.self_attn.v_proj.weight": (kv_size, hidden_size),
+            f"{prefix}.self_attn.o_proj.weight": (hidden_size, q_size),
+            f"{prefix}.mlp.gate_proj.weight": (config.intermediate_size, hidden_size),
+            f"{prefix}.mlp.up_proj.weight": (config.intermediate_size, hidden_size),
+            f"{prefix}.mlp.down_proj.weight": (hidden_size, config.intermediate_size),
+            f"{prefix}.post_attention_layernorm.weight": (hidden_size, ),
+        })
+        # the first EAGLE layer has no input_layernorm
+        if idx > 0:
+            shapes[f"{prefix}.input_layernorm.weight"] = (hidden_size, )
+        if config.use_post_norm:
+            shapes[f"{prefix}.post_norm1.weight"] = (hidden_size, )
+            shapes[f"{prefix}.post_norm2.weight"] = (hidden_size, )
+    return shapes
+
+
+# optional tensors: shared with the target model when left out
+OPTIONAL_SHAPES = {"embed_tokens.weight", "lm_head.weight"}
+
+
+def check(target_path, draft_path):
+    target = HyperCLOVAXConfig.from_pretrained(target_path)
+    draft = HyperCLOVAXConfig.from_pretrained(draft_path)
+    errors = []
+
+    for attribute in ["hidden_size", "vocab_size"]:
+        if getattr(target, attribute) != getattr(draft, attribute):
+            errors.append(f"{attribute}: draft {getattr(draft, attribute)}, target {getattr(target, attribute)}")
+    for attribute in MUP_ATTRIBUTES:
+        if getattr(target, attribute) != getattr(draft, attribute):
+            # the draft's own value is used for its layers; embedding and logits scaling must match the shared weights
+            errors.append(f"{attribute}: draft {getattr(draft, attribute)}, target {getattr(target, attribute)}")
+
+    tensors = {}
+    for path in sorted(glob.glob(os.path.join(draft_path, "*.safetensors"))):
+        with safe_open(path, framework="pt") as f:
+            for name in f.keys():
+                tensors[name.removeprefix("model.")] = tuple(f.get_slice(name).get_shape())
+    if not tensors:
+        errors.append(f"no safetensors files in {draft_path}")
+
+    expected = get_expected_shapes(draft)
+    for name in sorted(set(expected) - set(tensors)):
+        errors.append(f"{name}: missing")
+    for name, shape in sorted(tensors.items()):
+        if name in OPTIONAL_SHAPES:
+            expected_shape = (draft.vocab_size, draft.hidden_size)
+        elif name in expected:
+            expected_shape = expected[name]
+        else:
+            errors.append(f"{name}: unexpected")
+            continue
+        if shape != expected_shape:
+            errors.append(f"{name}: shape {shape}, expected {expected_shape}")
+    return errors
+
+
+class ReferenceEagleModel(nn.Module):
+    '''
+    EAGLE head on top of the reference decoder layers: the first layer has no input_layernorm and there is no final norm.
+    '''
+    def __init__(self, reference, seed=0):
+        super().__init__()
+        config = reference.config
+        self.embedding_multiplier = reference.model.embedding_multiplier # MuP
+        self.embed_tokens = reference.model.embed_tokens
+        self.layers = reference.model.layers
+        self.layers[0].input_layernorm = nn.Identity()
+        self.fc = nn.Linear(config.hidden_size * 2, config.hidden_size, bias=False)
+        generator = torch.Generator().manual_seed(seed)
+        with torch.no_grad():
+            self.fc.weight.copy_(0.02 * torch.randn(self.fc.weight.shape, generator=generator))
+        self.to(reference.model.embed_tokens.weight.dtype)
+
+    def forward(self, input_ids, positions, hidden_states):
+        input_embeds = self.embed_tokens(input_ids) * self.embedding_multiplier
+        residual = self.fc(torch.cat((input_embeds, hidden_states), dim=-1))
+        for layer_idx, layer in enumerate(self.layers):
+            residual = layer(positions, residual, layer_idx)
+        return residual
+
+
+def build_vllm_eagle_model(config, reference_eagle, dtype, prefix):
+    from vllm.config import VllmConfig, set_current_vllm_config
+
+    from model.vllm_hyperclovax_eagle import HyperCLOVAXEagleModel
+
+    vllm_config = VllmConfig()
+    # HyperCLOVAXEagleModel only reads these fields; the attention layers register in the current config
+    eagle_vllm_config = SimpleNamespace(
+        speculative_config=SimpleNamespace(draft_model_config=SimpleNamespace(hf_config=config)),
+        cache_config=None, quant_config=None)
+    default_dtype = torch.get_default_dtype()
+    torch.set_default_dtype(dtype)
+    try:
+        with set_current_vllm_config(vllm_config):
+            model = HyperCLOVAXEagleModel(vllm_config=eagle_vllm_config, prefix=prefix,
+                                          start_layer_id=config.num_hidden_layers)
+    finally:
+        torch.set_default_dtype(default_dtype)
+
+    for layer in model.layers:
+        layer.self_attn.attn = ReferenceAttentionBackend(layer.self_attn)
+    reference_params = dict(reference_eagle.named_parameters())
+    with torch.no_grad():
+        for name, param in model.named_parameters():
+            tensor = reference_params[name]
+            # the vocabulary of VocabParallelEmbedding is padded
+            param[:tensor.shape[0]].copy_(tensor)
+    return model.eval()
+
+
+def check_parity(name, variant, num_layers, num_tokens, dtype, seed=1):
+    config = make_config(name, variant, None)
+    config.num_hidden_layers = num_layers
+    reference_eagle = ReferenceEagleModel(make_reference(config, dtype)).eval()
+    vllm_model = build_vllm_eagle_model(config, reference_eagle, dtype,
+                                        prefix=f"eagle_{name}_{variant}_{num_layers}.model")
+
+    generator = torch.Generator().manual_seed(seed)
+    positions = torch.arange(num_tokens)
+    input_ids = torch.randint(0, config.vocab_size, (num_tokens, ), generator=generator)
+    # target hidden states are the residual stream of the target model, so larger than the normed activations
+    hidden_states = (4.0 * torch.randn(num_tokens, config.hidden_size, generator=generator)).to(dtype)
+
+    # the fused residual steps may write into their inputs
+    expected = reference_eagle(input_ids, positions, hidden_states.clone())
+    output, residual = vllm_model(input_ids, positions, hidden_states.clone())
+    return max(relative_error(output, expected), relative_error(residual, expected))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Check an EAGLE checkpoint for HyperCLOVAXForCausalLMEagle.")
+    arg_parser.add_argument("--target", default=None)
+    arg_parser.add_argument("--draft", default=None)
+    arg_parser.add_argument("--parity", action="store_true",
+                            help="Check HyperCLOVAXEagleModel.forward against the reference (needs a CPU build of vLLM).")
+    arg_parser.add_argument("--configs", nargs="+", default=list(CONFIGS), choices=list(CONFIGS))
+    arg_parser.add_argument("--variants", nargs="+", default=list(VARIANTS), choices=list(VARIANTS))
+    arg_parser.add_argument("--num-layers", nargs="+", type=int, default=[1, 2])
+    arg_parser.add_argument("--num-tokens", nargs="+", type=int, default=[16])
+    arg_parser.add_argument("--dtype", default="float32", choices=["float32", "bfloat16"])
+    args = arg_parser.parse_args()
+    if (args.target is None) != (args.draft is None):
+        arg_parser.error("--target and --draft go together")
+    if args.target is None and not args.parity:
+        arg_parser.error("give --target and --draft, or --parity")
+
+    passed = True
+    if args.target is not None:
+        errors = check(args.target, args.draft)
+        for error in errors:
+            print(error)
+        passed &= not errors
+        if not errors:
+            print("The EAGLE checkpoint matches HyperCLOVAXForCausalLMEagle and the target model.")
+
+    if args.parity:
+        dtype = getattr(torch, args.dtype)
+        init_vllm_distributed()
+        with torch.inference_mode():
+            for name in args.configs:
+                for variant in args.variants:
+                    for num_layers in args.num_layers:
+                        for num_tokens in args.num_tokens:
+                            error = check_parity(name, variant, num_layers, num_tokens, dtype)
+                            ok = error <= TOLERANCE[dtype]
+                            passed &= ok
+                            print(f"{name:>6} {variant:>7} layers={num_layers} tokens={num_tokens:<5} "
+                                  f"eagle_err={error:.1e} {'ok' if ok else 'FAIL'}")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# HyperCLOVAX vLLM Plugin
+# Copyright (c) 2025-present NAVER Cloud Corp.
+# Apache-2.0
+"""
+Checks that HCX_FOLD_MUP_MULTIPLIERS=1 (μP multipliers folded into the weights at load time) gives the same
+outputs as the runtime multipliers, and compares the decode throughput of both.
+
+Each mode runs in its own process, since the setting is read when the model module is imported:
+
+    python benchmarks/check_mup_folding.py --model <HyperCLOVAX checkpoint> --tensor-parallel-size 1
+"""
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+
+PROMPTS = [
+    "The capital of South Korea is",
+    "Write a short poem about the sea.",
+    "def fibonacci(n):",
+    "Explain the difference between TCP and UDP in one paragraph.",
+]
+
+
+def run_mode(args):
+    from vllm import LLM, SamplingParams
+
+    llm = LLM(model=args.model, tensor_parallel_size=args.tensor_parallel_size, dtype=args.dtype,
+              max_model_len=args.max_model_len, trust_remote_code=True, seed=0)
+    prompt_params = SamplingParams(max_tokens=1, prompt_logprobs=0)
+    prompt_logprobs = []
+    for output in llm.generate(PROMPTS, prompt_params, use_tqdm=False):
+        # the first prompt token has no logprob
+        prompt_logprobs.append([next(iter(logprobs.values())).logprob for logprobs in output.prompt_logprobs[1:]])
+
+    decode_params = SamplingParams(max_tokens=args.max_tokens, temperature=0.0, ignore_eos=True)
+    start = time.perf_counter()
+    outputs = llm.generate(PROMPTS * args.repeats, decode_params, use_tqdm=False)
+    elapsed = time.perf_counter() - start
+    num_tokens = sum(len(output.outputs[0].token_ids) for output in outputs)
+    json.dump({"prompt_logprobs": prompt_logprobs,
+               "greedy_token_ids": [list(output.outputs[0].token_ids) for output in outputs[:len(PROMPTS)]],
+               "tokens_per_s": num_tokens / elapsed}, sys.stdout)
+    print(flush=True)
+
+
+def launch(args, fold):
+    env = dict(os.environ, HCX_FOLD_MUP_MULTIPLIERS="1" if fold else "0")
+    command = [sys.executable, os.path.abspath(__file__), "--run-mode", *sys.argv[1:]]
+    result = subprocess.run(command, env=env, check=True, stdout=subprocess.PIPE, text=True)
+    # vLLM also logs to stdout
+    return json.loads(next(line for line in reversed(result.stdout.splitlines()) if line.startswith('{"prompt_logprobs"')))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Check μP multiplier folding against the runtime multipliers.")
+    arg_parser.add_argument("--model", required=True)
+    arg_parser.add_argument("--tensor-parallel-size", type=int, default=1)
+    arg_parser.add_argument("--dtype", default="bfloat16")
+    arg_parser.add_argument("--max-model-len", type=int, default=4096)
+    arg_parser.add_argument("--max-tokens", type=int, default=128)
+    arg_parser.add_argument("--repeats", type=int, default=8)
+    arg_parser.add_argument("--tolerance", type=float, default=0.05,
+                            help="Max allowed absolute prompt logprob difference.")
+    arg_parser.add_argument("--run-mode", action="store_true", help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.run_mode:
+        run_mode(args)
+        return
+
+    runtime = launch(args, fold=False)
+    folded = launch(args, fold=True)
+
+    max_diff = max(abs(a - b)
+                   for runtime_logprobs, folded_logprobs in zip(runtime["prompt_logprobs"], folded["prompt_logprobs"])
+                   for a, b in zip(runtime_logprobs, folded_logprobs)
+                   if math.isfinite(a) and math.isfinite(b))
+    same_greedy = sum(a == b for a, b in zip(runtime["greedy_token_ids"], folded["greedy_token_ids"]))
+    print(f"max prompt logprob diff: {max_diff:.4g} (tolerance {args.tolerance})")
+    print(f"identical greedy outputs: {same_greedy}/{len(PROMPTS)}")
+    print(f"decode throughput: runtime {runtime['tokens_per_s']:.1f} tok/s, folded {folded['tokens_per_s']:.1f} tok/s "
+          f"(x{folded['tokens_per_s'] / runtime['tokens_per_s']:.3f})")
+    sys.exit(0 if max_diff <= args.tolerance else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# HyperCLOVAX vLLM Plugin
+# Copyright (c) 2025-present NAVER Cloud Corp.
+# Apache-2.0
+"""
+Checks the handover from HcxReasoningParser to HcxToolParser in streaming, on CPU with a stand-in tokenizer.
+
+The streaming loop of vLLM's serving_chat for requests with tools and a reasoning parser is replayed with the
+parsers of one request linked by HcxToolParser.adjust_request: the reasoning parser classifies the deltas until
+is_reasoning_end() holds for the prompt ids or the delta ids, then the tool parser gets the content of that delta
+followed by the new text. The reasoning, content and tool calls sent to the client must match the expected ones
+for every chunk size.
+
+    python benchmarks/check_streaming_handover.py --chunk-sizes 1 2 3
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vllm.entrypoints.openai.protocol import ChatCompletionRequest  # noqa: E402
+
+from benchmarks.benchmark_parsers import FUNCTION_CALL_ROLE, THINK_END, THINK_START, StandInTokenizer  # noqa: E402
+from parser.hcx_reasoner import HcxReasoningParser  # noqa: E402
+from parser.hcx_tool_parser import HcxToolParser  # noqa: E402
+
+PROMPT = "<|im_start|>user\nWhat is 2 + 2?<|im_end|>\n<|im_start|>assistant"
+TOOLS = [{"type": "function", "function": {"name": "calculate", "parameters": {"type": "object"}}}]
+CALLS = '[{"name": "calculate", "arguments": {"expression": "2 + 2", "steps": [1, {"x": null}]}}]'
+ARGUMENTS = '{"expression": "2 + 2", "steps": [1, {"x": null}]}'
+
+# output (without the final stop token, which is not part of the text), chat_template_kwargs,
+# and the expected reasoning, content and tool calls
+CASES = {
+    "reasoning_answer": (THINK_START + "Add them." + THINK_END + "\nThe answer is 4.", None,
+                         "Add them.", "\nThe answer is 4.", []),
+    "reasoning_tool_call": (THINK_START + "Use the tool." + THINK_END + FUNCTION_CALL_ROLE + CALLS, None,
+                            "Use the tool.", "", [("calculate", ARGUMENTS)]),
+    "reasoning_content_tool_call": (THINK_START + "Use the tool." + THINK_END + "\nLet me call it." + THINK_END
+                                    + FUNCTION_CALL_ROLE + CALLS, None,
+                                    "Use the tool.", "\nLet me call it.", [("calculate", ARGUMENTS)]),
+    # a plain-text prefix of <|im_end|> is released on its ids
+    "reasoning_plain_prefix": (THINK_START + "Write <|im and stop." + THINK_END + "\nThe answer is 4.", None,
+                               "Write <|im and stop.", "\nThe answer is 4.", []),
+    "answer": ("\nThe answer is 4.", None, "", "\nThe answer is 4.", []),
+    "tool_call": ("\n" + FUNCTION_CALL_ROLE + CALLS, None, "", "\n", [("calculate", ARGUMENTS)]),
+    "forced_reasoning_answer": ("Add them." + THINK_END + "\nThe answer is 4.", {"force_reasoning": True},
+                                "Add them.", "\nThe answer is 4.", []),
+    "skipped_reasoning_answer": ("The answer is 4.", {"skip_reasoning": True}, "", "The answer is 4.", []),
+    "skipped_reasoning_tool_call": (FUNCTION_CALL_ROLE + CALLS, {"skip_reasoning": True},
+                                    "", "", [("calculate", ARGUMENTS)]),
+}
+
+
+def stream(tokenizer, output, chunk_size, chat_template_kwargs=None):
+    '''
+    Replays the reasoning -> tool parser branch of serving_chat's streaming loop and returns what the client gets.
+    '''
+    request = ChatCompletionRequest(messages=[], model="hcx", tools=TOOLS, tool_choice="auto",
+                                    chat_template_kwargs=chat_template_kwargs)
+    tool_parser = HcxToolParser(tokenizer)
+    request = tool_parser.adjust_request(request)
+    reasoning_parser = HcxReasoningParser(tokenizer, chat_template_kwargs=request.chat_template_kwargs)
+
+    prompt_token_ids = tokenizer.encode(PROMPT)
+    token_ids = tokenizer.encode(output)
+    reasoning_end = added_content_delta = False
+    previous_text, previous_token_ids = "", []
+    reasoning, content, tool_calls = "", "", {}
+    for idx in range(0, len(token_ids), chunk_size):
+        output_token_ids = token_ids[idx:idx + chunk_size]
+        delta_text = tokenizer.decode(output_token_ids)
+        current_text = previous_text + delta_text
+        current_token_ids = previous_token_ids + output_token_ids
+
+        if not reasoning_end:
+            delta_message = reasoning_parser.extract_reasoning_content_streaming(
+                previous_text, current_text, delta_text, previous_token_ids, current_token_ids, output_token_ids)
+            if reasoning_parser.is_reasoning_end(prompt_token_ids):
+                reasoning_end = True
+                current_token_ids = output_token_ids
+                if delta_message and delta_message.content:
+                    current_text = delta_message.content
+                    delta_message.content = None
+                else:
+                    current_text = ""
+            if reasoning_parser.is_reasoning_end(output_token_ids):
+                reasoning_end = True
+                current_token_ids = reasoning_parser.extract_content_ids(output_token_ids)
+                if delta_message and delta_message.content:
+                    current_text = delta_message.content
+                    delta_message.content = None
+                else:
+                    current_text = ""
+        else:
+            delta_token_ids = output_token_ids
+            if not added_content_delta:
+                added_content_delta = True
+                previous_text, previous_token_ids = "", []
+                delta_text, delta_token_ids = current_text, current_token_ids
+            delta_message = tool_parser.extract_tool_calls_streaming(
+                previous_text, current_text, delta_text, previous_token_ids, current_token_ids, delta_token_ids,
+                request)
+
+        previous_text, previous_token_ids = current_text, current_token_ids
+        if delta_message is None:
+            continue
+        reasoning += delta_message.reasoning_content or ""
+        content += delta_message.content or ""
+        for tool_call in delta_message.tool_calls or []:
+            name, arguments = tool_calls.get(tool_call.index, ("", ""))
+            function = tool_call.function or {}
+            tool_calls[tool_call.index] = (name + (function.get("name") or ""),
+                                           arguments + (function.get("arguments") or ""))
+    return reasoning, content, [tool_calls[index] for index in sorted(tool_calls)]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Check the reasoning -> tool parser handover in streaming.")
+    arg_parser.add_argument("--chunk-sizes", nargs="+", type=int, default=[1, 2, 3])
+    args = arg_parser.parse_args()
+
+    tokenizer = StandInTokenizer()
+    passed = True
+    for name, (output, chat_template_kwargs, *expected) in CASES.items():
+        for chunk_size in args.chunk_sizes:
+            result = stream(tokenizer, output, chunk_size, chat_template_kwargs)
+            ok = list(result) == expected
+            passed &= ok
+            print(f"{name:>28} chunk={chunk_size:<2} {'ok' if ok else 'FAIL'}")
+            if not ok:
+                print(f"{'':>28} expected {json.dumps(expected)}\n{'':>28}      got {json.dumps(list(result))}")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+# HyperCLOVAX vLLM Plugin
+# Copyright (c) 2025-present NAVER Cloud Corp.
+# Apache-2.0
+"""
+Checks HcxToolCallGrammarLogitsProcessor on CPU by feeding it fake logits, with the HCX tokenizer and xgrammar.
+
+Decoding is replayed step by step: the processor gets the token ids generated so far and a logits row, and
+- before ' -> tool/function_call\\n' (reasoning, free text, the marker itself) the logits must be left untouched;
+- in the tool-call region, the tokens of a valid call array must stay allowed while tokens that break the JSON or
+  name an unknown tool must be masked;
+- greedy decoding from random logits, constrained by the processor, must produce a call array of the request's
+  tools followed by the stop token.
+
+    python benchmarks/check_tool_call_grammar.py --tokenizer <HyperCLOVAX checkpoint> --num-samples 16
+"""
+import argparse
+import json
+import os
+import sys
+
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parser.hcx_logits_processors import (FUNCTION_CALL_ROLE, STOP_TOKENS,  # noqa: E402
+                                          HcxToolCallGrammarLogitsProcessor)
+
+TOOLS = [
+    {"type": "function", "function": {"name": "get_weather", "parameters": {
+        "type": "object",
+        "properties": {"location": {"type": "string", "maxLength": 32}, "unit": {"enum": ["celsius", "fahrenheit"]}},
+        "required": ["location", "unit"],
+        "additionalProperties": False}}},
+    {"type": "function", "function": {"name": "calculate", "parameters": {
+        "type": "object",
+        "properties": {"expression": {"type": "string", "maxLength": 32}},
+        "required": ["expression"],
+        "additionalProperties": False}}},
+]
+PREFIX = "Let me check the weather first." + FUNCTION_CALL_ROLE
+CALLS = '[{"name": "get_weather", "arguments": {"location": "서울", "unit": "celsius"}}]'
+# (text generated in the tool-call region, description)
+REJECTED = [
+    ("Hello", "free text"),
+    ('{"name": "get_weather"', "an object instead of an array"),
+    ('[{"name": "search', "an unknown tool"),
+    ('[{"name": "calculate", "arguments": {"unit', "an unknown argument"),
+]
+
+
+def allowed(logits, token_id):
+    return logits[token_id].item() != float("-inf")
+
+
+def check_forced_output(tokenizer, vocab_size):
+    '''
+    Replays PREFIX + CALLS + stop token and checks each step against the expectations of the docstring.
+    '''
+    stop_token_id = tokenizer.get_vocab()[STOP_TOKENS[0]]
+    prefix_ids = tokenizer.encode(PREFIX, add_special_tokens=False)
+    token_ids = prefix_ids + tokenizer.encode(CALLS, add_special_tokens=False) + [stop_token_id]
+    if tokenizer.decode(prefix_ids) != PREFIX:
+        raise SystemExit("The tokenizer does not round-trip the prefix")
+
+    processor = HcxToolCallGrammarLogitsProcessor(tokenizer, TOOLS)
+    errors = []
+    for position, token_id in enumerate(token_ids):
+        logits = processor(token_ids[:position], torch.zeros(vocab_size))
+        num_masked = int(torch.isinf(logits).sum())
+        if position < len(prefix_ids):
+            if num_masked:
+                errors.append(f"{num_masked} tokens masked at position {position}, before the tool-call region")
+        elif not allowed(logits, token_id):
+            errors.append(f"token {tokenizer.decode([token_id])!r} of the call array masked at position {position}")
+        elif not num_masked:
+            errors.append(f"nothing masked at position {position}, in the tool-call region")
+    if processor.disabled:
+        errors.append("the grammar stopped constraining a valid call array")
+
+    for text, description in REJECTED:
+        region_ids = tokenizer.encode(text, add_special_tokens=False)
+        processor = HcxToolCallGrammarLogitsProcessor(tokenizer, TOOLS)
+        # the prefix of the text must be accepted, its last token must be masked
+        for position in range(len(prefix_ids) + len(region_ids)):
+            logits = processor((prefix_ids + region_ids)[:position], torch.zeros(vocab_size))
+        if allowed(logits, region_ids[-1]):
+            errors.append(f"{description} is allowed: {text!r}")
+    return errors
+
+
+def check_greedy_decoding(tokenizer, vocab_size, num_samples, max_tokens, seed):
+    '''
+    Greedy decoding from random logits after PREFIX must give a valid call array and then the stop token.
+    '''
+    vocab = tokenizer.get_vocab()
+    stop_token_ids = {vocab[token] for token in STOP_TOKENS if token in vocab}
+    prefix_ids = tokenizer.encode(PREFIX, add_special_tokens=False)
+    names = {tool["function"]["name"] for tool in TOOLS}
+    generator = torch.Generator().manual_seed(seed)
+    errors = []
+    for sample in range(num_samples):
+        processor = HcxToolCallGrammarLogitsProcessor(tokenizer, TOOLS)
+        token_ids = list(prefix_ids)
+        for _ in range(max_tokens):
+            logits = processor(token_ids, torch.randn(vocab_size, generator=generator))
+            token_ids.append(int(logits.argmax()))
+            if token_ids[-1] in stop_token_ids:
+                break
+        else:
+            errors.append(f"sample {sample}: no stop token after {max_tokens} tokens")
+            continue
+        text = tokenizer.decode(token_ids[len(prefix_ids):-1])
+        try:
+            calls = json.loads(text)
+        except json.JSONDecodeError:
+            errors.append(f"sample {sample}: invalid JSON {text!r}")
+            continue
+        if not calls or any(call["name"] not in names for call in calls):
+            errors.append(f"sample {sample}: unexpected calls {text!r}")
+    return errors
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Check the tool-call grammar logits processor with fake logits.")
+    arg_parser.add_argument("--tokenizer", required=True, help="HyperCLOVAX tokenizer (or checkpoint) path.")
+    arg_parser.add_argument("--num-samples", type=int, default=16)
+    arg_parser.add_argument("--max-tokens", type=int, default=512)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    from transformers import AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(args.tokenizer)
+    # the logits width of the model is usually padded beyond the tokenizer
+    vocab_size = len(tokenizer) + 64
+
+    passed = True
+    for name, errors in (("forced_output", check_forced_output(tokenizer, vocab_size)),
+                         ("greedy_decoding", check_greedy_decoding(tokenizer, vocab_size, args.num_samples,
+                                                                   args.max_tokens, args.seed))):
+        passed &= not errors
+        print(f"{name:>16} {'ok' if not errors else 'FAIL'}")
+        for error in errors:
+            print(f"{'':>16} {error}")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,14 @@
-from vllm import ModelRegistry
-
 def register():
-    from .vllm_hyperclovax import HyperCLOVAXForCausalLM
+    from vllm import ModelRegistry
 
-    if "HyperCLOVAXForCausalLM" not in ModelRegistry.get_supported_archs():
-        ModelRegistry.register_model("HyperCLOVAXForCausalLM", HyperCLOVAXForCausalLM)
+    # registered by reference: vllm_hyperclovax (torch, attention, layers) is imported only where the model is built
+    models = {
+        "HyperCLOVAXForCausalLM": f"{__name__}.vllm_hyperclovax:HyperCLOVAXForCausalLM",
+        # EAGLE draft, under the name vLLM gives to EAGLE checkpoints of HyperCLOVAXForCausalLM, and its own
+        "EagleHyperCLOVAXForCausalLM": f"{__name__}.vllm_hyperclovax_eagle:HyperCLOVAXForCausalLMEagle",
+        "HyperCLOVAXForCausalLMEagle": f"{__name__}.vllm_hyperclovax_eagle:HyperCLOVAXForCausalLMEagle",
+    }
+    supported_archs = ModelRegistry.get_supported_archs()
+    for arch, model_cls in models.items():
+        if arch not in supported_archs:
+            ModelRegistry.register_model(arch, model_cls)
@@ -0,0 +1,398 @@
+# HyperCLOVAX vLLM Plugin
+# Copyright (c) 2025-present NAVER Cloud Corp.
+# Apache-2.0
+"""
+Checkpoint layouts of HyperCLOVAX, and an offline converter to the fused layout.
+
+The fused layout stores the tensors under the parameter names and shapes of HyperCLOVAXForCausalLM at TP=1:
+q/k/v_proj are concatenated into qkv_proj and gate/up_proj into gate_up_proj, mistral-format names are remapped and
+wq/wk re-permuted, and floating-point tensors are cast to one dtype. Its config.json is marked with
+`"hcx_checkpoint_format": "fused"`, and load_weights then copies the tensors without any transform.
+
+    hcx-convert-checkpoint --input <checkpoint> --output <fused checkpoint> --dtype bfloat16 --verify
+"""
+import argparse
+import glob
+import json
+import os
+import shutil
+import time
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import torch
+
+HCX_CHECKPOINT_FORMAT_KEY = "hcx_checkpoint_format"
+FUSED_CHECKPOINT_FORMAT = "fused"
+
+STACKED_PARAMS_MAPPING = [
+    # (param_name, shard_name, shard_id)
+    (".qkv_proj", ".q_proj", "q"),
+    (".qkv_proj", ".k_proj", "k"),
+    (".qkv_proj", ".v_proj", "v"),
+    (".gate_up_proj", ".gate_proj", 0),
+    (".gate_up_proj", ".up_proj", 1),
+]
+
+# Mistral/HyperCLOVAX models can also be loaded with --load-format mistral
+# from consolidated.safetensors checkpoints
+MISTRAL_MAPPING = {
+    "layers": "model.layers",
+    "attention": "self_attn",
+    "qscale_act": "input_scale",
+    "qscale_weight": "weight_scale",
+    "kv_fake_quantizer.qscale_act": "kv_scale",
+    "wq": "q_proj",
+    "wk": "k_proj",
+    "wv": "v_proj",
+    "wo": "o_proj",
+    "attention_norm": "input_layernorm",
+    "feed_forward": "mlp",
+    "w1": "gate_proj",
+    "w2": "down_proj",
+    "w3": "up_proj",
+    "ffn_norm": "post_attention_layernorm",
+    "tok_embeddings": "model.embed_tokens",
+    "output": "lm_head",
+    "norm": "model.norm",
+}
+
+# params.json keys of mistral-format checkpoints -> config.json keys, as vLLM maps them for --config-format mistral
+MISTRAL_CONFIG_MAPPING = {
+    "dim": "hidden_size",
+    "n_layers": "num_hidden_layers",
+    "n_heads": "num_attention_heads",
+    "n_kv_heads": "num_key_value_heads",
+    "hidden_dim": "intermediate_size",
+    "norm_eps": "rms_norm_eps",
+    "max_seq_len": "max_position_embeddings",
+    "tied_embeddings": "tie_word_embeddings",
+    "quantization": "quantization_config",
+}
+REQUIRED_MISTRAL_PARAMS = ("dim", "n_layers", "n_heads", "hidden_dim", "vocab_size")
+
+# config fields that the fused config.json must carry over from the source config
+VERIFIED_CONFIG_KEYS = ("vocab_size", "hidden_size", "intermediate_size", "num_hidden_layers", "num_attention_heads",
+                        "num_key_value_heads", "head_dim", "rms_norm_eps", "rope_theta", "tie_word_embeddings",
+                        "use_post_norm", "embedding_multiplier", "logits_scaling", "attention_multiplier",
+                        "residual_multiplier")
+
+SKIPPED_WEIGHTS = ("rotary_emb.inv_freq", "rotary_emb.cos_cached", "rotary_emb.sin_cached")
+
+
+def is_fused_checkpoint(config) -> bool:
+    return getattr(config, HCX_CHECKPOINT_FORMAT_KEY, None) == FUSED_CHECKPOINT_FORMAT
+
+
+def remap_mistral_name(name: str) -> str:
+    modules = name.split(".")
+    num_modules = len(modules)
+    for i in range(num_modules):
+        item = modules[i]
+        next_item = modules[i + 1] if i < num_modules - 1 else None
+
+        combined_item = (f"{item}.{next_item}"
+                         if next_item is not None else None)
+
+        if combined_item in MISTRAL_MAPPING:
+            name = name.replace(combined_item, MISTRAL_MAPPING[combined_item])
+        elif item in MISTRAL_MAPPING and MISTRAL_MAPPING[item] not in name:
+            name = name.replace(item, MISTRAL_MAPPING[item])
+    return name
+
+
+def mistral_params_to_config_dict(params: dict) -> dict:
+    '''
+    config.json of a mistral-format checkpoint from its params.json. Keys without a mapping (head_dim, vocab_size,
+    rope_theta, the μP multipliers, ...) are kept under their own names.
+    '''
+    missing = [key for key in REQUIRED_MISTRAL_PARAMS if key not in params]
+    if missing:
+        raise ValueError(f"params.json lacks {', '.join(missing)}")
+    config_dict = {"architectures": ["HyperCLOVAXForCausalLM"], "model_type": "hyperclovax"}
+    for key, value in params.items():
+        config_dict[MISTRAL_CONFIG_MAPPING.get(key, key)] = value
+    return config_dict
+
+
+def read_config_dict(path: str) -> dict:
+    '''
+    config.json of a checkpoint directory, or the one derived from params.json for a mistral-format checkpoint.
+    '''
+    config_path = os.path.join(path, "config.json")
+    params_path = os.path.join(path, "params.json")
+    if not os.path.exists(config_path) and os.path.exists(params_path):
+        with open(params_path) as f:
+            return mistral_params_to_config_dict(json.load(f))
+    with open(config_path) as f:
+        return json.load(f)
+
+
+def permute_mistral_weight(name: str, loaded_weight: torch.Tensor, config) -> torch.Tensor:
+
+    def permute(w: torch.Tensor, n_heads: int):
+        attn_in = config.head_dim * n_heads
+        attn_out = config.hidden_size
+
+        return w.view(n_heads, attn_in // n_heads // 2, 2,
+                      attn_out).transpose(1, 2).reshape(attn_in, attn_out)
+
+    modules = name.split(".")
+
+    # rotary embeds should be sliced
+    if "wk" in modules and modules[-1] == "weight":
+        loaded_weight = permute(loaded_weight,
+                                config.num_key_value_heads)
+    elif "wq" in modules and modules[-1] == "weight":
+        loaded_weight = permute(loaded_weight,
+                                config.num_attention_heads)
+    return loaded_weight
+
+
+def get_param_name(name: str) -> Tuple[str, Optional[int]]:
+    '''
+    Returns the parameter of a checkpoint tensor (HF names), and its shard index in a stacked parameter.
+    '''
+    for param_name, weight_name, _ in STACKED_PARAMS_MAPPING:
+        if weight_name in name:
+            shard_names = [shard_name for stacked_name, shard_name, _ in STACKED_PARAMS_MAPPING
+                           if stacked_name == param_name]
+            return name.replace(weight_name, param_name), shard_names.index(weight_name)
+    return name, None
+
+
+def get_fused_param_shapes(config) -> Dict[str, Tuple[int, ...]]:
+    '''
+    Parameter names and shapes of HyperCLOVAXForCausalLM at TP=1 for an unquantized config.
+    '''
+    hidden_size = config.hidden_size
+    head_dim = getattr(config, "head_dim", None) or hidden_size // config.num_attention_heads
+    q_size = config.num_attention_heads * head_dim
+    kv_size = getattr(config, "num_key_value_heads", config.num_attention_heads) * head_dim
+    attention_bias = getattr(config, "attention_bias", False) or getattr(config, "bias", False)
+    mlp_bias = getattr(config, "mlp_bias", False)
+
+    shapes = {"model.embed_tokens.weight": (config.vocab_size, hidden_size), "model.norm.weight": (hidden_size, )}
+    if not config.tie_word_embeddings:
+        shapes["lm_head.weight"] = (config.vocab_size, hidden_size)
+    for idx in range(config.num_hidden_layers):
+        prefix = f"model.layers.{idx}"
+        shapes[f"{prefix}.self_attn.qkv_proj.weight"] = (q_size + 2 * kv_size, hidden_size)
+        shapes[f"{prefix}.self_attn.o_proj.weight"] = (hidden_size, q_size)
+        shapes[f"{prefix}.mlp.gate_up_proj.weight"] = (2 * config.intermediate_size, hidden_size)
+        shapes[f"{prefix}.mlp.down_proj.weight"] = (hidden_size, config.intermediate_size)
+        if attention_bias:
+            shapes[f"{prefix}.self_attn.qkv_proj.bias"] = (q_size + 2 * kv_size, )
+            shapes[f"{prefix}.self_attn.o_proj.bias"] = (hidden_size, )
+        if mlp_bias:
+            shapes[f"{prefix}.mlp.gate_up_proj.bias"] = (2 * config.intermediate_size, )
+            shapes[f"{prefix}.mlp.down_proj.bias"] = (hidden_size, )
+        norms = ["input_layernorm", "post_attention_layernorm"]
+        if getattr(config, "use_post_norm", False):
+            norms += ["post_norm1", "post_norm2"]
+        for norm in norms:
+            shapes[f"{prefix}.{norm}.weight"] = (hidden_size, )
+    return shapes
+
+
+class CheckpointReader:
+    '''
+    Random access to the tensors of a safetensors checkpoint under their HF names.
+    '''
+    def __init__(self, path: str, config):
+        from safetensors import safe_open
+
+        self.config = config
+        index_path = os.path.join(path, "model.safetensors.index.json")
+        if os.path.exists(index_path):
+            with open(index_path) as f:
+                files = sorted(set(json.load(f)["weight_map"].values()))
+            files = [os.path.join(path, file) for file in files]
+        else:
+            files = sorted(glob.glob(os.path.join(path, "*.safetensors")))
+        if not files:
+            raise FileNotFoundError(f"No safetensors files in {path}")
+
+        self.handles = [safe_open(file, framework="pt") for file in files]
+        # HF name -> (handle, name in the file)
+        self.names: Dict[str, Tuple[object, str]] = {}
+        for handle in self.handles:
+            for name in handle.keys():
+                hf_name = name if name.startswith(("model.", "lm_head.")) else remap_mistral_name(name)
+                self.names[hf_name] = (handle, name)
+
+    def get_tensor(self, hf_name: str) -> torch.Tensor:
+        handle, name = self.names[hf_name]
+        tensor = handle.get_tensor(name)
+        if name != hf_name:
+            tensor = permute_mistral_weight(name, tensor, self.config)
+        return tensor
+
+    def get_param_sources(self) -> Dict[str, List[str]]:
+        '''
+        Parameter name -> HF names of its tensors, in shard order.
+        '''
+        sources: Dict[str, Dict[int, str]] = defaultdict(dict)
+        for hf_name in self.names:
+            if hf_name.endswith(SKIPPED_WEIGHTS):
+                continue
+            if self.config.tie_word_embeddings and hf_name.startswith("lm_head."):
+                continue
+            param_name, shard_index = get_param_name(hf_name)
+            sources[param_name][shard_index or 0] = hf_name
+        return {param_name: [shards[idx] for idx in sorted(shards)] for param_name, shards in sources.items()}
+
+
+def fuse(reader: CheckpointReader, hf_names: List[str], dtype: torch.dtype) -> torch.Tensor:
+    tensors = [reader.get_tensor(hf_name) for hf_name in hf_names]
+    tensor = tensors[0] if len(tensors) == 1 else torch.cat(tensors, dim=0)
+    if tensor.is_floating_point():
+        tensor = tensor.to(dtype)
+    return tensor.contiguous()
+
+
+def iterate_fused_tensors(reader: CheckpointReader, dtype: torch.dtype) -> Iterator[Tuple[str, torch.Tensor]]:
+    for param_name, hf_names in sorted(reader.get_param_sources().items()):
+        yield param_name, fuse(reader, hf_names, dtype)
+
+
+def load_config(path: str):
+    from .configuration_hyperclovax import HyperCLOVAXConfig
+
+    config = HyperCLOVAXConfig.from_dict(read_config_dict(path))
+    if getattr(config, "quantization_config", None) is not None:
+        raise ValueError("Quantized checkpoints are not supported by the fused checkpoint format")
+    if is_fused_checkpoint(config):
+        raise ValueError(f"{path} is already a fused checkpoint")
+    return config
+
+
+def convert(input_path: str, output_path: str, dtype: Optional[torch.dtype], max_shard_size: int) -> Dict[str, str]:
+    from safetensors.torch import save_file
+
+    config = load_config(input_path)
+    dtype = dtype or getattr(config, "torch_dtype", None) or torch.bfloat16
+    if isinstance(dtype, str):
+        dtype = getattr(torch, dtype)
+    reader = CheckpointReader(input_path, config)
+    os.makedirs(output_path, exist_ok=True)
+
+    weight_map: Dict[str, str] = {}
+    shards: List[Dict[str, torch.Tensor]] = []
+    shard, shard_size = {}, 0
+    total_size = 0
+
+    def write_shard(shard):
+        file = f"model-{len(shards) + 1:05d}.safetensors"
+        save_file(shard, os.path.join(output_path, file), metadata={"format": "pt"})
+        shards.append(file)
+        weight_map.update({name: file for name in shard})
+
+    for param_name, tensor in iterate_fused_tensors(reader, dtype):
+        size = tensor.numel() * tensor.element_size()
+        if shard and shard_size + size > max_shard_size:
+            write_shard(shard)
+            shard, shard_size = {}, 0
+        shard[param_name] = tensor
+        shard_size += size
+        total_size += size
+    if shard:
+        write_shard(shard)
+
+    with open(os.path.join(output_path, "model.safetensors.index.json"), "w") as f:
+        json.dump({"metadata": {"total_size": total_size}, "weight_map": weight_map}, f, indent=2)
+
+    # tokenizer, generation config, ... are copied as is; params.json is replaced by the config.json written below
+    for file in os.listdir(input_path):
+        source = os.path.join(input_path, file)
+        if (os.path.isfile(source) and not file.endswith((".safetensors", ".bin", ".pt", ".pth"))
+                and file not in ("model.safetensors.index.json", "config.json", "params.json")):
+            shutil.copy2(source, os.path.join(output_path, file))
+
+    config_dict = read_config_dict(input_path)
+    config_dict[HCX_CHECKPOINT_FORMAT_KEY] = FUSED_CHECKPOINT_FORMAT
+    config_dict["torch_dtype"] = str(dtype).replace("torch.", "")
+    with open(os.path.join(output_path, "config.json"), "w") as f:
+        json.dump(config_dict, f, indent=2)
+    return weight_map
+
+
+def verify(input_path: str, output_path: str) -> List[str]:
+    '''
+    Checks a fused checkpoint against its source: its config.json against the source config (or params.json),
+    names and shapes against the model config, and each stacked tensor split back into its shards bit-identical
+    to the source tensors cast to the fused dtype.
+    Returns the mismatches.
+    '''
+    from .configuration_hyperclovax import HyperCLOVAXConfig
+
+    config = load_config(input_path)
+    source = CheckpointReader(input_path, config)
+    fused = CheckpointReader(output_path, config)
+    sources = source.get_param_sources()
+    errors = []
+
+    fused_config = HyperCLOVAXConfig.from_dict(read_config_dict(output_path))
+    if not is_fused_checkpoint(fused_config):
+        errors.append(f"config.json: not marked with {HCX_CHECKPOINT_FORMAT_KEY}={FUSED_CHECKPOINT_FORMAT!r}")
+    for key in VERIFIED_CONFIG_KEYS:
+        if getattr(fused_config, key, None) != getattr(config, key, None):
+            errors.append(f"config.json: {key} is {getattr(fused_config, key, None)!r}, "
+                          f"expected {getattr(config, key, None)!r}")
+
+    expected_shapes = get_fused_param_shapes(config)
+    for name in sorted(set(expected_shapes) - set(fused.names)):
+        errors.append(f"{name}: missing")
+    for name in sorted(set(fused.names) - set(sources)):
+        errors.append(f"{name}: unexpected")
+
+    for name in sorted(set(fused.names) & set(sources)):
+        tensor = fused.get_tensor(name)
+        if name in expected_shapes and tuple(tensor.shape) != expected_shapes[name]:
+            errors.append(f"{name}: shape {tuple(tensor.shape)}, expected {expected_shapes[name]}")
+            continue
+        shards = [source.get_tensor(hf_name) for hf_name in sources[name]]
+        parts = torch.split(tensor, [shard.shape[0] for shard in shards], dim=0)
+        for hf_name, shard, part in zip(sources[name], shards, parts):
+            if shard.is_floating_point():
+                shard = shard.to(tensor.dtype)
+            if shard.shape != part.shape or not torch.equal(shard, part):
+                errors.append(f"{name}: differs from {hf_name}")
+    return errors
+
+
+def parse_size(size: str) -> int:
+    units = {"KB": 10**3, "MB": 10**6, "GB": 10**9, "KiB": 2**10, "MiB": 2**20, "GiB": 2**30}
+    for unit, multiplier in units.items():
+        if size.endswith(unit):
+            return int(float(size[:-len(unit)]) * multiplier)
+    return int(size)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Convert a HyperCLOVAX checkpoint to the fused layout.")
+    arg_parser.add_argument("--input", required=True,
+                            help="HF (config.json) or mistral-format (params.json) safetensors checkpoint directory.")
+    arg_parser.add_argument("--output", required=True)
+    arg_parser.add_argument("--dtype", default=None, choices=["float32", "bfloat16", "float16"],
+                            help="dtype of the floating-point tensors (default: torch_dtype of the config).")
+    arg_parser.add_argument("--max-shard-size", default="5GB")
+    arg_parser.add_argument("--verify", action="store_true", help="Verify the fused checkpoint against the input.")
+    args = arg_parser.parse_args()
+
+    start = time.perf_counter()
+    weight_map = convert(args.input, args.output, getattr(torch, args.dtype) if args.dtype else None,
+                         parse_size(args.max_shard_size))
+    print(f"Wrote {len(weight_map)} tensors to {args.output} in {time.perf_counter() - start:.1f}s")
+
+    if args.verify:
+        errors = verify(args.input, args.output)
+        for error in errors:
+            print(error)
+        if errors:
+            raise SystemExit(f"Verification failed: {len(errors)} mismatches")
+        print("Verified: every tensor matches its source")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+# HyperCLOVAX vLLM Plugin
+# Copyright (c) 2025-present NAVER Cloud Corp.
+# Apache-2.0
+"""
+Calibration of FP8 KV-cache scales for HyperCLOVAX on CPU.
+
+Runs the reference forward pass (hcx_reference.py) of an unquantized checkpoint over sample texts and collects the
+per-layer absmax and a log-spaced histogram of |K| (after RoPE) and |V|, as they are written to the KV cache.
+The scales (absmax or a percentile of |x|, divided by the FP8 E4M3 maximum) are written as
+`model.layers.{i}.self_attn.k_proj.k_scale` / `v_proj.v_scale` tensors, the names HyperCLOVAXModel.load_weights
+remaps to the attention layers' k_scale / v_scale. Held-out texts are then evaluated with the KV cache
+fake-quantized to FP8, and the perplexity, KL divergence and top-1 agreement against the unquantized forward
+are reported for each scale method.
+
+    hcx-calibrate-kv-cache --model <checkpoint> --dataset samples.jsonl --output <dir> --checkpoint <FP8 checkpoint>
+"""
+import argparse
+import json
+import math
+import os
+import shutil
+import time
+from typing import Dict, List, Tuple
+
+import torch
+
+from .hcx_reference import HyperCLOVAXReferenceForCausalLM, load_reference_model
+
+FP8_E4M3_MAX = 448.0
+SCALES_FILE = "kv_cache_scales.safetensors"
+REPORT_FILE = "kv_cache_scales.json"
+
+# log2 |x| histogram: HISTOGRAM_BINS_PER_OCTAVE bins per power of two from 2**HISTOGRAM_MIN_EXPONENT
+HISTOGRAM_MIN_EXPONENT = -24
+HISTOGRAM_BINS_PER_OCTAVE = 64
+HISTOGRAM_NUM_BINS = 48 * HISTOGRAM_BINS_PER_OCTAVE
+
+
+class KVCacheStatistics:
+    '''
+    Per-layer absmax and |x| histogram of the keys and values, fed by observe() as the kv_hook of the reference model.
+    '''
+    def __init__(self, num_layers: int):
+        self.absmax = {kind: [0.0] * num_layers for kind in ("k", "v")}
+        self.histograms = {kind: [torch.zeros(HISTOGRAM_NUM_BINS, dtype=torch.int64) for _ in range(num_layers)]
+                           for kind in ("k", "v")}
+        self.num_tokens = 0
+
+    def observe(self, layer_idx: int, k: torch.Tensor, v: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        if layer_idx == 0:
+            self.num_tokens += k.shape[0]
+        for kind, x in (("k", k), ("v", v)):
+            x = x.detach().float().abs().flatten()
+            self.absmax[kind][layer_idx] = max(self.absmax[kind][layer_idx], x.max().item())
+            bins = ((x.log2() - HISTOGRAM_MIN_EXPONENT) * HISTOGRAM_BINS_PER_OCTAVE).floor()
+            bins = bins.nan_to_num(0.0, posinf=HISTOGRAM_NUM_BINS - 1, neginf=0.0).clamp(0, HISTOGRAM_NUM_BINS - 1)
+            self.histograms[kind][layer_idx] += torch.bincount(bins.long(), minlength=HISTOGRAM_NUM_BINS)
+        return k, v
+
+    def percentile(self, kind: str, layer_idx: int, q: float) -> float:
+        '''
+        Upper edge of the histogram bin holding the q-th percentile of |x|, capped at the absmax.
+        '''
+        histogram = self.histograms[kind][layer_idx]
+        total = histogram.sum().item()
+        if total == 0:
+            return 0.0
+        cumulative = histogram.cumsum(0)
+        index = int(torch.searchsorted(cumulative, torch.tensor(math.ceil(q / 100 * total))).item())
+        upper_edge = 2.0 ** ((index + 1) / HISTOGRAM_BINS_PER_OCTAVE + HISTOGRAM_MIN_EXPONENT)
+        return min(upper_edge, self.absmax[kind][layer_idx])
+
+    def get_scales(self, method: str) -> Dict[str, List[float]]:
+        '''
+        method: "absmax" or "p<q>" (e.g. "p99.99"). Returns {"k": [scale per layer], "v": [...]}.
+        '''
+        scales = {}
+        for kind in ("k", "v"):
+            values = []
+            for layer_idx, absmax in enumerate(self.absmax[kind]):
+                value = absmax if method == "absmax" else self.percentile(kind, layer_idx, float(method[1:]))
+                values.append(value / FP8_E4M3_MAX if value > 0 else 1.0)
+            scales[kind] = values
+        return scales
+
+
+def is_percentile_method(method: str) -> bool:
+    try:
+        return method.startswith("p") and 0 < float(method[1:]) <= 100
+    except ValueError:
+        return False
+
+
+def fake_quantize(x: torch.Tensor, scale: float) -> torch.Tensor:
+    # as stored in an fp8 (E4M3) KV cache: x / scale cast to FP8, dequantized by the attention backend
+    quantized = (x.float() / scale).clamp(-FP8_E4M3_MAX, FP8_E4M3_MAX).to(torch.float8_e4m3fn)
+    return (quantized.float() * scale).to(x.dtype)
+
+
+def get_fake_quantize_hook(scales: Dict[str, List[float]]):
+    def kv_hook(layer_idx, k, v):
+        return fake_quantize(k, scales["k"][layer_idx]), fake_quantize(v, scales["v"][layer_idx])
+
+    return kv_hook
+
+
+def evaluate(model: HyperCLOVAXReferenceForCausalLM, samples: List[List[int]],
+             scales_by_method: Dict[str, Dict[str, List[float]]]) -> Dict[str, Dict[str, float]]:
+    '''
+    Perplexity of the held-out samples without and with each set of scales, and the mean KL divergence and top-1
+    agreement of the fake-quantized next-token distributions against the unquantized ones.
+    '''
+    totals = {"unquantized": {"nll": 0.0}}
+    totals.update({method: {"nll": 0.0, "kl": 0.0, "top1": 0.0} for method in scales_by_method})
+    num_tokens = 0
+    for token_ids in samples:
+        input_ids = torch.tensor(token_ids)
+        targets = input_ids[1:]
+        logprobs = model(input_ids)[:-1].log_softmax(dim=-1)
+        totals["unquantized"]["nll"] += -logprobs.gather(1, targets[:, None]).sum().item()
+        for method, scales in scales_by_method.items():
+            quantized_logprobs = model(input_ids, kv_hook=get_fake_quantize_hook(scales))[:-1].log_softmax(dim=-1)
+            total = totals[method]
+            total["nll"] += -quantized_logprobs.gather(1, targets[:, None]).sum().item()
+            total["kl"] += (logprobs.exp() * (logprobs - quantized_logprobs)).sum().item()
+            total["top1"] += (logprobs.argmax(dim=-1) == quantized_logprobs.argmax(dim=-1)).sum().item()
+        num_tokens += len(targets)
+
+    report = {}
+    for method, total in totals.items():
+        report[method] = {"perplexity": math.exp(total["nll"] / max(num_tokens, 1))}
+        if method != "unquantized":
+            report[method]["kl_divergence"] = total["kl"] / max(num_tokens, 1)
+            report[method]["top1_agreement"] = total["top1"] / max(num_tokens, 1)
+    return report
+
+
+def get_scale_tensors(scales: Dict[str, List[float]]) -> Dict[str, torch.Tensor]:
+    tensors = {}
+    for layer_idx, (k_scale, v_scale) in enumerate(zip(scales["k"], scales["v"])):
+        prefix = f"model.layers.{layer_idx}.self_attn"
+        tensors[f"{prefix}.k_proj.k_scale"] = torch.tensor(k_scale, dtype=torch.float32)
+        tensors[f"{prefix}.v_proj.v_scale"] = torch.tensor(v_scale, dtype=torch.float32)
+    return tensors
+
+
+def add_to_checkpoint(scales_path: str, checkpoint: str, names: List[str]):
+    '''
+    Copies the scales file into a checkpoint, and lists its tensors in the safetensors index when there is one
+    (vLLM only loads the files listed in the index).
+    '''
+    shutil.copy2(scales_path, os.path.join(checkpoint, SCALES_FILE))
+    index_path = os.path.join(checkpoint, "model.safetensors.index.json")
+    if not os.path.exists(index_path):
+        return
+    with open(index_path) as f:
+        index = json.load(f)
+    index["weight_map"].update({name: SCALES_FILE for name in names})
+    with open(index_path, "w") as f:
+        json.dump(index, f, indent=2)
+
+
+def load_samples(path: str, text_field: str) -> List[str]:
+    with open(path) as f:
+        lines = [line.strip() for line in f if line.strip()]
+    if path.endswith(".jsonl"):
+        return [json.loads(line)[text_field] for line in lines]
+    return lines
+
+
+def tokenize(tokenizer, texts: List[str], max_length: int) -> List[List[int]]:
+    samples = [tokenizer.encode(text)[:max_length] for text in texts]
+    return [token_ids for token_ids in samples if len(token_ids) > 1]
+
+
+def calibrate(model: HyperCLOVAXReferenceForCausalLM, samples: List[List[int]]) -> KVCacheStatistics:
+    statistics = KVCacheStatistics(model.config.num_hidden_layers)
+    for token_ids in samples:
+        model(torch.tensor(token_ids), kv_hook=statistics.observe)
+    return statistics
+
+
+def print_statistics(statistics: KVCacheStatistics, methods: List[str]):
+    percentiles = [method for method in methods if method != "absmax"]
+    header = ["layer"] + [f"{kind} {column}" for kind in ("k", "v") for column in ["absmax"] + percentiles]
+    print(" ".join(f"{column:>12}" for column in header))
+    for layer_idx in range(len(statistics.absmax["k"])):
+        row = [str(layer_idx)]
+        for kind in ("k", "v"):
+            row.append(f"{statistics.absmax[kind][layer_idx]:.4g}")
+            row += [f"{statistics.percentile(kind, layer_idx, float(p[1:])):.4g}" for p in percentiles]
+        print(" ".join(f"{column:>12}" for column in row))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Calibrate FP8 KV-cache scales for a HyperCLOVAX checkpoint.")
+    arg_parser.add_argument("--model", required=True, help="Unquantized safetensors checkpoint (HF, mistral or fused).")
+    arg_parser.add_argument("--tokenizer", default=None, help="Tokenizer path (default: --model).")
+    arg_parser.add_argument("--dataset", required=True, help="*.jsonl with a text field, or one sample per line.")
+    arg_parser.add_argument("--text-field", default="text")
+    arg_parser.add_argument("--num-calibration-samples", type=int, default=128)
+    arg_parser.add_argument("--num-eval-samples", type=int, default=16,
+                            help="Held-out samples following the calibration samples in the dataset.")
+    arg_parser.add_argument("--max-length", type=int, default=512)
+    arg_parser.add_argument("--methods", nargs="+", default=["absmax", "p99.99"],
+                            help="Scale methods to evaluate: absmax and/or p<percentile> of |x|.")
+    arg_parser.add_argument("--scale-method", default="absmax", help="Method of the written scales.")
+    arg_parser.add_argument("--dtype", default="float32", choices=["float32", "bfloat16", "float16"])
+    arg_parser.add_argument("--output", required=True, help=f"Directory for {SCALES_FILE} and {REPORT_FILE}.")
+    arg_parser.add_argument("--checkpoint", default=None,
+                            help="Also add the scales to this (FP8-quantized) checkpoint served with --kv-cache-dtype fp8.")
+    args = arg_parser.parse_args()
+
+    from safetensors.torch import save_file
+    from transformers import AutoTokenizer
+
+    methods = list(dict.fromkeys(args.methods + [args.scale_method]))
+    for method in methods:
+        if method != "absmax" and not is_percentile_method(method):
+            arg_parser.error(f"Unknown scale method: {method}")
+
+    tokenizer = AutoTokenizer.from_pretrained(args.tokenizer or args.model)
+    texts = load_samples(args.dataset, args.text_field)
+    calibration_samples = tokenize(tokenizer, texts[:args.num_calibration_samples], args.max_length)
+    eval_samples = tokenize(tokenizer, texts[args.num_calibration_samples:][:args.num_eval_samples], args.max_length)
+    if not calibration_samples:
+        raise SystemExit(f"No calibration samples in {args.dataset}")
+
+    model = load_reference_model(args.model, getattr(torch, args.dtype))
+    with torch.inference_mode():
+        start = time.perf_counter()
+        statistics = calibrate(model, calibration_samples)
+        print(f"Calibrated on {len(calibration_samples)} samples ({statistics.num_tokens} tokens) "
+              f"in {time.perf_counter() - start:.1f}s")
+        print_statistics(statistics, methods)
+
+        scales_by_method = {method: statistics.get_scales(method) for method in methods}
+        evaluation = evaluate(model, eval_samples, scales_by_method) if eval_samples else {}
+    for method, result in evaluation.items():
+        print(f"{method:>12}: " + " ".join(f"{name}={value:.6g}" for name, value in result.items()))
+    if not eval_samples:
+        print("No held-out samples: the accuracy was not evaluated")
+
+    os.makedirs(args.output, exist_ok=True)
+    scale_tensors = get_scale_tensors(scales_by_method[args.scale_method])
+    scales_path = os.path.join(args.output, SCALES_FILE)
+    save_file(scale_tensors, scales_path, metadata={"format": "pt"})
+    with open(os.path.join(args.output, REPORT_FILE), "w") as f:
+        json.dump({
+            "model": args.model,
+            "num_calibration_samples": len(calibration_samples),
+            "num_calibration_tokens": statistics.num_tokens,
+            "num_eval_samples": len(eval_samples),
+            "scale_method": args.scale_method,
+            "absmax": statistics.absmax,
+            "scales": scales_by_method,
+            "evaluation": evaluation,
+        }, f, indent=2)
+    print(f"Wrote the {args.scale_method} scales to {scales_path}")
+
+    if args.checkpoint:
+        add_to_checkpoint(scales_path, args.checkpoint, list(scale_tensors))
+        print(f"Added the scales to {args.checkpoint}")
+
+
+if __name__ == "__main__":
+    main()
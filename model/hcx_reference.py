@@ -0,0 +1,294 @@
+# HyperCLOVAX vLLM Plugin
+# Copyright (c) 2025-present NAVER Cloud Corp.
+# Apache-2.0
+"""
+Pure-PyTorch reference of the HyperCLOVAX forward pass, running on CPU without vLLM.
+
+It follows the op order of the original (unfused) decoder layer: μP embedding/residual/attention multipliers and
+logits scaling, Peri-LN post-norms, GQA and RoPE (default, linear, dynamic NTK, llama3 and YaRN scaling).
+The parameters have the names and shapes of HyperCLOVAXForCausalLM at TP=1 (qkv_proj, gate_up_proj), so a state
+dict can be copied between the two.
+
+`num_layers` exits after the first layers (the draft pass of self-speculative decoding).
+`kv_hook(layer_idx, k, v) -> (k, v)` receives the keys (after RoPE) and values of each layer as they would be written
+to the KV cache, shaped (num_tokens, num_kv_heads, head_dim), and may observe or replace them.
+"""
+import math
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+import torch
+from torch import nn
+
+from .hcx_checkpoint import CheckpointReader, iterate_fused_tensors, read_config_dict
+
+KVHook = Callable[[int, torch.Tensor, torch.Tensor], Tuple[torch.Tensor, torch.Tensor]]
+
+
+def rms_norm(x: torch.Tensor, weight: torch.Tensor, eps: float) -> torch.Tensor:
+    # same numerics as RMSNorm.forward_native
+    orig_dtype = x.dtype
+    x = x.to(torch.float32)
+    x = x * torch.rsqrt(x.pow(2).mean(dim=-1, keepdim=True) + eps)
+    return x.to(orig_dtype) * weight
+
+
+class RMSNorm(nn.Module):
+
+    def __init__(self, hidden_size: int, eps: float):
+        super().__init__()
+        self.weight = nn.Parameter(torch.ones(hidden_size))
+        self.variance_epsilon = eps
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        return rms_norm(x, self.weight, self.variance_epsilon)
+
+
+def yarn_find_correction_dim(num_rotations: float, dim: int, base: float, max_position: int) -> float:
+    return (dim * math.log(max_position / (num_rotations * 2 * math.pi))) / (2 * math.log(base))
+
+
+def yarn_get_mscale(scale: float) -> float:
+    return 1.0 if scale <= 1 else 0.1 * math.log(scale) + 1.0
+
+
+def get_inv_freq(config) -> Tuple[torch.Tensor, float, float]:
+    '''
+    Returns the RoPE inverse frequencies, the position scale and the cos/sin scale (mscale) of the config's
+    rope_scaling, computed like vLLM's get_rope.
+    '''
+    head_dim = config.head_dim
+    base = getattr(config, "rope_theta", 10000)
+    rope_scaling = getattr(config, "rope_scaling", None) or {}
+    rope_type = rope_scaling.get("rope_type", rope_scaling.get("type", "default"))
+    exponents = torch.arange(0, head_dim, 2, dtype=torch.float32) / head_dim
+
+    if rope_type == "dynamic":
+        # dynamic NTK, precomputed for max_position_embeddings * factor
+        factor = rope_scaling["factor"]
+        base = base * (factor * factor - (factor - 1)) ** (head_dim / (head_dim - 2))
+    inv_freq = 1.0 / (base ** exponents)
+
+    if rope_type in ("default", "dynamic"):
+        return inv_freq, 1.0, 1.0
+    if rope_type == "linear":
+        return inv_freq, 1.0 / rope_scaling["factor"], 1.0
+    original_max_position = (getattr(config, "original_max_position_embeddings", None)
+                             or rope_scaling["original_max_position_embeddings"])
+    if rope_type == "llama3":
+        factor = rope_scaling["factor"]
+        low_freq_factor = rope_scaling["low_freq_factor"]
+        high_freq_factor = rope_scaling["high_freq_factor"]
+        low_freq_wavelen = original_max_position / low_freq_factor
+        high_freq_wavelen = original_max_position / high_freq_factor
+        wavelen = 2 * math.pi / inv_freq
+        smooth = (original_max_position / wavelen - low_freq_factor) / (high_freq_factor - low_freq_factor)
+        scaled = torch.where(wavelen > low_freq_wavelen, inv_freq / factor,
+                             (1 - smooth) * inv_freq / factor + smooth * inv_freq)
+        return torch.where(wavelen < high_freq_wavelen, inv_freq, scaled), 1.0, 1.0
+    if rope_type == "yarn":
+        factor = rope_scaling["factor"]
+        low = max(math.floor(yarn_find_correction_dim(rope_scaling.get("beta_fast", 32), head_dim, base,
+                                                      original_max_position)), 0)
+        high = min(math.ceil(yarn_find_correction_dim(rope_scaling.get("beta_slow", 1), head_dim, base,
+                                                      original_max_position)), head_dim - 1)
+        if low == high:
+            high += 0.001
+        ramp = ((torch.arange(head_dim // 2, dtype=torch.float32) - low) / (high - low)).clamp(0, 1)
+        extrapolation_mask = (1 - ramp) * rope_scaling.get("extrapolation_factor", 1)
+        inv_freq = inv_freq / factor * (1 - extrapolation_mask) + inv_freq * extrapolation_mask
+        return inv_freq, 1.0, yarn_get_mscale(factor) * rope_scaling.get("attn_factor", 1)
+    raise NotImplementedError(f"rope_type {rope_type!r} is not supported by the reference implementation")
+
+
+class RotaryEmbedding(nn.Module):
+    '''
+    Neox-style RoPE over the whole head dimension, as get_rope(..., is_neox_style=True).
+    '''
+    def __init__(self, config):
+        super().__init__()
+        inv_freq, self.position_scale, self.mscale = get_inv_freq(config)
+        self.register_buffer("inv_freq", inv_freq, persistent=False)
+
+    def forward(self, positions: torch.Tensor, q: torch.Tensor, k: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        freqs = torch.outer(positions.to(torch.float32) * self.position_scale, self.inv_freq)
+        cos = (freqs.cos() * self.mscale)[:, None, :]
+        sin = (freqs.sin() * self.mscale)[:, None, :]
+        return self.rotate(q, cos, sin), self.rotate(k, cos, sin)
+
+    @staticmethod
+    def rotate(x: torch.Tensor, cos: torch.Tensor, sin: torch.Tensor) -> torch.Tensor:
+        x1, x2 = x.float().chunk(2, dim=-1)
+        return torch.cat((x1 * cos - x2 * sin, x2 * cos + x1 * sin), dim=-1).to(x.dtype)
+
+
+def causal_attention(q: torch.Tensor, k: torch.Tensor, v: torch.Tensor, scaling: float) -> torch.Tensor:
+    '''
+    Causal attention of one sequence in float32: q (num_tokens, num_heads, head_dim), k and v
+    (num_tokens, num_kv_heads, head_dim) with each KV head serving num_heads // num_kv_heads query heads (GQA).
+    '''
+    num_tokens = q.shape[0]
+    groups = q.shape[1] // k.shape[1]
+    k = k.repeat_interleave(groups, dim=1)
+    v = v.repeat_interleave(groups, dim=1)
+    scores = torch.einsum("qhd,khd->hqk", q.float(), k.float()) * scaling
+    causal_mask = torch.ones(num_tokens, num_tokens, dtype=torch.bool).triu(1)
+    scores.masked_fill_(causal_mask, float("-inf"))
+    return torch.einsum("hqk,khd->qhd", scores.softmax(dim=-1), v.float()).to(q.dtype)
+
+
+class HyperCLOVAXReferenceAttention(nn.Module):
+
+    def __init__(self, config):
+        super().__init__()
+        self.num_heads = config.num_attention_heads
+        self.num_kv_heads = config.num_key_value_heads
+        self.head_dim = config.head_dim
+        self.q_size = self.num_heads * self.head_dim
+        self.kv_size = self.num_kv_heads * self.head_dim
+        self.scaling = getattr(config, "attention_multiplier", self.head_dim ** -0.5) # MuP
+        bias = getattr(config, "attention_bias", False) or getattr(config, "bias", False)
+        self.qkv_proj = nn.Linear(config.hidden_size, self.q_size + 2 * self.kv_size, bias=bias)
+        self.o_proj = nn.Linear(self.q_size, config.hidden_size, bias=bias)
+        self.rotary_emb = RotaryEmbedding(config)
+
+    def forward(self, positions: torch.Tensor, hidden_states: torch.Tensor, layer_idx: int,
+                kv_hook: Optional[KVHook] = None) -> torch.Tensor:
+        num_tokens = hidden_states.shape[0]
+        q, k, v = self.qkv_proj(hidden_states).split([self.q_size, self.kv_size, self.kv_size], dim=-1)
+        q = q.view(num_tokens, self.num_heads, self.head_dim)
+        k = k.view(num_tokens, self.num_kv_heads, self.head_dim)
+        v = v.view(num_tokens, self.num_kv_heads, self.head_dim)
+        q, k = self.rotary_emb(positions, q, k)
+        if kv_hook is not None:
+            k, v = kv_hook(layer_idx, k, v)
+        attn_output = causal_attention(q, k, v, self.scaling)
+        return self.o_proj(attn_output.reshape(num_tokens, self.q_size))
+
+
+class HyperCLOVAXReferenceMLP(nn.Module):
+
+    def __init__(self, config):
+        super().__init__()
+        if config.hidden_act != "silu":
+            raise ValueError(f"Unsupported activation: {config.hidden_act}. Only silu is supported for now.")
+        bias = getattr(config, "mlp_bias", False)
+        self.gate_up_proj = nn.Linear(config.hidden_size, 2 * config.intermediate_size, bias=bias)
+        self.down_proj = nn.Linear(config.intermediate_size, config.hidden_size, bias=bias)
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        gate, up = self.gate_up_proj(x).chunk(2, dim=-1)
+        return self.down_proj(nn.functional.silu(gate) * up)
+
+
+class HyperCLOVAXReferenceDecoderLayer(nn.Module):
+
+    def __init__(self, config):
+        super().__init__()
+        self.residual_multiplier = getattr(config, "residual_multiplier", 1.0) # MuP
+        self.self_attn = HyperCLOVAXReferenceAttention(config)
+        self.mlp = HyperCLOVAXReferenceMLP(config)
+        self.input_layernorm = RMSNorm(config.hidden_size, config.rms_norm_eps)
+        self.post_attention_layernorm = RMSNorm(config.hidden_size, config.rms_norm_eps)
+
+        # Peri-LN (post-norm)
+        self.use_post_norm = getattr(config, "use_post_norm", False)
+        if self.use_post_norm:
+            self.post_norm1 = RMSNorm(config.hidden_size, config.rms_norm_eps)
+            self.post_norm2 = RMSNorm(config.hidden_size, config.rms_norm_eps)
+
+    def forward(self, positions: torch.Tensor, residual: torch.Tensor, layer_idx: int,
+                kv_hook: Optional[KVHook] = None) -> torch.Tensor:
+        """Takes and returns the residual stream."""
+        hidden_states = self.self_attn(positions, self.input_layernorm(residual), layer_idx, kv_hook)
+        if self.use_post_norm:
+            hidden_states = self.post_norm1(hidden_states)
+        residual = residual + hidden_states * self.residual_multiplier
+
+        hidden_states = self.mlp(self.post_attention_layernorm(residual))
+        if self.use_post_norm:
+            hidden_states = self.post_norm2(hidden_states)
+        return residual + hidden_states * self.residual_multiplier
+
+
+class HyperCLOVAXReferenceModel(nn.Module):
+
+    def __init__(self, config):
+        super().__init__()
+        self.config = config
+        self.embedding_multiplier = getattr(config, "embedding_multiplier", 1.0) # MuP
+        self.embed_tokens = nn.Embedding(config.vocab_size, config.hidden_size)
+        self.layers = nn.ModuleList([HyperCLOVAXReferenceDecoderLayer(config)
+                                     for _ in range(config.num_hidden_layers)])
+        self.norm = RMSNorm(config.hidden_size, config.rms_norm_eps)
+
+    def forward(self, input_ids: torch.Tensor, positions: torch.Tensor, kv_hook: Optional[KVHook] = None,
+                num_layers: Optional[int] = None) -> torch.Tensor:
+        """With num_layers, exits after the first num_layers layers (the final norm is still applied)."""
+        residual = self.embed_tokens(input_ids) * self.embedding_multiplier # MuP
+        for layer_idx, layer in enumerate(self.layers[:num_layers]):
+            residual = layer(positions, residual, layer_idx, kv_hook)
+        return self.norm(residual)
+
+
+class HyperCLOVAXReferenceForCausalLM(nn.Module):
+    """Reference of HyperCLOVAXForCausalLM for one sequence: forward() takes the token ids (num_tokens, ) and
+    returns the logits (num_tokens, vocab_size), scaled like its LogitsProcessor."""
+
+    def __init__(self, config):
+        super().__init__()
+        self.config = config
+        self.model = HyperCLOVAXReferenceModel(config)
+        self.lm_head = nn.Linear(config.hidden_size, config.vocab_size, bias=False)
+        if config.tie_word_embeddings:
+            self.lm_head.weight = self.model.embed_tokens.weight
+        self.logit_scale = getattr(config, "logit_scale", 1.0) * getattr(config, "logits_scaling", 1.0) # MuP
+
+    def forward(self, input_ids: torch.Tensor, positions: Optional[torch.Tensor] = None,
+                kv_hook: Optional[KVHook] = None, num_layers: Optional[int] = None) -> torch.Tensor:
+        if positions is None:
+            positions = torch.arange(input_ids.shape[0])
+        return self.compute_logits(self.model(input_ids, positions, kv_hook, num_layers))
+
+    def compute_logits(self, hidden_states: torch.Tensor) -> torch.Tensor:
+        return self.lm_head(hidden_states).float() * self.logit_scale
+
+    def forward_early_exits(self, input_ids: torch.Tensor, exit_layers: Sequence[int]) -> Dict[int, torch.Tensor]:
+        '''
+        Logits of the early exits after each of exit_layers and of the full model (key num_hidden_layers), from one
+        pass: the exits apply the final norm and the lm_head to the residual stream after their layer.
+        '''
+        positions = torch.arange(input_ids.shape[0])
+        num_layers = len(self.model.layers)
+        exit_layers = set(exit_layers) | {num_layers}
+        logits = {}
+        residual = self.model.embed_tokens(input_ids) * self.model.embedding_multiplier # MuP
+        for layer_idx, layer in enumerate(self.model.layers):
+            residual = layer(positions, residual, layer_idx)
+            if layer_idx + 1 in exit_layers:
+                logits[layer_idx + 1] = self.compute_logits(self.model.norm(residual))
+        return logits
+
+
+def load_reference_model(path: str, dtype: Optional[torch.dtype] = None) -> HyperCLOVAXReferenceForCausalLM:
+    '''
+    Builds the reference model from an unquantized HF, mistral-format or fused safetensors checkpoint.
+    '''
+    from .configuration_hyperclovax import HyperCLOVAXConfig
+
+    config = HyperCLOVAXConfig.from_dict(read_config_dict(path))
+    if getattr(config, "quantization_config", None) is not None:
+        raise ValueError("Quantized checkpoints are not supported by the reference implementation")
+    dtype = dtype or getattr(config, "torch_dtype", None) or torch.float32
+    if isinstance(dtype, str):
+        dtype = getattr(torch, dtype)
+
+    with torch.device("meta"):
+        model = HyperCLOVAXReferenceForCausalLM(config)
+    state_dict = dict(iterate_fused_tensors(CheckpointReader(path, config), dtype))
+    if config.tie_word_embeddings:
+        state_dict["lm_head.weight"] = state_dict["model.embed_tokens.weight"]
+    model.load_state_dict(state_dict, strict=True, assign=True)
+    for module in model.modules():
+        if isinstance(module, RotaryEmbedding):
+            module.inv_freq = get_inv_freq(config)[0]
+    return model.eval()
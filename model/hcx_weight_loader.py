@@ -0,0 +1,173 @@
+# HyperCLOVAX vLLM Plugin
+# Copyright (c) 2025-present NAVER Cloud Corp.
+# Apache-2.0
+"""
+Parallel, prefetching weight loading.
+
+With HCX_WEIGHT_LOADER_THREADS=N (N > 0), HyperCLOVAXForCausalLM.load_weights reads the checkpoint iterator in a
+background thread into a bounded queue, and N threads resolve the names and copy the tensors into the parameters,
+so I/O and deserialization overlap with the weight_loader calls. Time per phase (read, remap, copy) is logged.
+"""
+import os
+import queue
+import threading
+import time
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+import torch
+
+HCX_WEIGHT_LOADER_THREADS = int(os.environ.get("HCX_WEIGHT_LOADER_THREADS", "0"))
+HCX_WEIGHT_LOADER_PREFETCH = int(os.environ.get("HCX_WEIGHT_LOADER_PREFETCH", "16"))
+
+# resolves (name, tensor) to a function copying it into its parameter and returning the loaded parameter names,
+# or to None for a tensor that is skipped
+WeightResolver = Callable[[str, torch.Tensor], Optional[Callable[[], Iterable[str]]]]
+
+_END = object()
+
+
+class WeightLoadingTimings:
+    '''
+    Seconds spent per phase. read is the time spent waiting on the checkpoint iterator; remap and copy are summed
+    over the loading threads.
+    '''
+    def __init__(self):
+        self.read = 0.0
+        self.remap = 0.0
+        self.copy = 0.0
+        self.total = 0.0
+        self.num_tensors = 0
+        self.num_bytes = 0
+        self.lock = threading.Lock()
+
+    def add(self, remap: float, copy: float, num_bytes: int):
+        with self.lock:
+            self.remap += remap
+            self.copy += copy
+            self.num_tensors += 1
+            self.num_bytes += num_bytes
+
+    def __str__(self):
+        return (f"{self.num_tensors} tensors ({self.num_bytes / 2**30:.2f} GiB) in {self.total:.2f}s: "
+                f"read {self.read:.2f}s, remap {self.remap:.2f}s, copy {self.copy:.2f}s")
+
+
+def put(items: queue.Queue, item, stop: threading.Event) -> bool:
+    # a bounded put that gives up once the consumer stopped
+    while not stop.is_set():
+        try:
+            items.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def load_weights_parallel(weights: Iterable[Tuple[str, torch.Tensor]], resolve: WeightResolver,
+                          num_threads: int, max_prefetch: int) -> Tuple[Set[str], WeightLoadingTimings]:
+    '''
+    Loads weights with one reader thread and num_threads loading threads.
+    At most max_prefetch tensors are read ahead of the loading threads.
+    '''
+    timings = WeightLoadingTimings()
+    items = queue.Queue(maxsize=max(1, max_prefetch))
+    stop = threading.Event()
+    errors: List[BaseException] = []
+    loaded_params: List[Set[str]] = [set() for _ in range(num_threads)]
+
+    def read():
+        try:
+            iterator = iter(weights)
+            while not stop.is_set():
+                start = time.perf_counter()
+                item = next(iterator, _END)
+                timings.read += time.perf_counter() - start
+                if item is _END:
+                    break
+                if not put(items, item, stop):
+                    break
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            for _ in range(num_threads):
+                put(items, _END, stop)
+
+    def load(loaded: Set[str]):
+        try:
+            while not stop.is_set():
+                try:
+                    item = items.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if item is _END:
+                    break
+                name, loaded_weight = item
+                start = time.perf_counter()
+                copy_weight = resolve(name, loaded_weight)
+                resolved = time.perf_counter()
+                if copy_weight is not None:
+                    loaded.update(copy_weight())
+                timings.add(resolved - start, time.perf_counter() - resolved,
+                            loaded_weight.numel() * loaded_weight.element_size())
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=read, name="hcx-weight-reader", daemon=True)]
+    threads += [threading.Thread(target=load, args=(loaded,), name=f"hcx-weight-loader-{idx}", daemon=True)
+                for idx, loaded in enumerate(loaded_params)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    timings.total = time.perf_counter() - start
+
+    if errors:
+        raise errors[0]
+    return set().union(*loaded_params), timings
+
+
+def iterate_safetensors_parallel(files: Sequence[str], num_threads: int,
+                                 max_prefetch: int) -> Iterator[Tuple[str, torch.Tensor]]:
+    '''
+    Reads safetensors files with num_threads readers, one file at a time per reader.
+    At most max_prefetch tensors are held ahead of the consumer; the tensors of different files are interleaved.
+    '''
+    from safetensors import safe_open
+
+    items = queue.Queue(maxsize=max(1, max_prefetch))
+    stop = threading.Event()
+    errors: List[BaseException] = []
+
+    def read(paths: Sequence[str]):
+        try:
+            for path in paths:
+                with safe_open(path, framework="pt") as f:
+                    for name in f.keys():
+                        if not put(items, (name, f.get_tensor(name)), stop):
+                            return
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            put(items, _END, stop)
+
+    num_threads = max(1, min(num_threads, len(files)))
+    threads = [threading.Thread(target=read, args=(files[idx::num_threads],), daemon=True)
+               for idx in range(num_threads)]
+    for thread in threads:
+        thread.start()
+
+    try:
+        num_finished = 0
+        while num_finished < num_threads:
+            item = items.get()
+            if item is _END:
+                num_finished += 1
+                if errors:
+                    raise errors[0]
+                continue
+            yield item
+    finally:
+        stop.set()
@@ -21,7 +21,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 """Inference-only HyperCLOVAX model compatible with HuggingFace weights."""
-from typing import Any, Dict, Iterable, Optional, Set, Tuple, Type, Union
+import os
+import threading
+from typing import Any, Dict, Iterable, Optional, Sequence, Set, Tuple, Type, Union
 
 import torch
 from torch import nn
@@ -30,6 +32,7 @@ from vllm.attention import Attention
 from vllm.compilation.decorators import support_torch_compile
 from vllm.config import CacheConfig, VllmConfig
 from vllm.distributed import get_pp_group, get_tensor_model_parallel_world_size
+from vllm.logger import init_logger
 from vllm.model_executor.layers.activation import SiluAndMul
 from vllm.model_executor.layers.layernorm import RMSNorm
 from vllm.model_executor.layers.linear import (MergedColumnParallelLinear,
@@ -50,6 +53,54 @@ from vllm.model_executor.models.utils import (AutoWeightsLoader, PPMissingLayer,
                     make_empty_intermediate_tensors_factory, make_layers,
                     maybe_prefix)
 
+from .hcx_checkpoint import (MISTRAL_MAPPING, STACKED_PARAMS_MAPPING, is_fused_checkpoint, permute_mistral_weight,
+                             remap_mistral_name)
+from .hcx_weight_loader import (HCX_WEIGHT_LOADER_PREFETCH, HCX_WEIGHT_LOADER_THREADS, WeightResolver,
+                                load_weights_parallel)
+
+logger = init_logger(__name__)
+
+HCX_FOLD_MUP_MULTIPLIERS = os.environ.get("HCX_FOLD_MUP_MULTIPLIERS", "0").lower() in ("1", "true")
+
+
+def peri_ln_add_rms_norm(
+    x: torch.Tensor,
+    residual: torch.Tensor,
+    multiplier: float,
+    post_norm: Optional[RMSNorm],
+    norm: Optional[RMSNorm],
+) -> Tuple[Optional[torch.Tensor], torch.Tensor]:
+    """Peri-LN residual step:
+    residual = residual + multiplier * post_norm(x); returns (norm(residual), residual).
+
+    Both norms are vLLM's RMSNorm custom ops, so the add and the next pre-norm run as one fused_add_rms_norm kernel
+    with or without torch.compile. The multiplier costs one extra op unless HCX_FOLD_MUP_MULTIPLIERS folds it into
+    post_norm.
+    """
+    if post_norm is not None:
+        x = post_norm(x)
+    if multiplier != 1.0:
+        x = x * multiplier
+    if norm is None:
+        return None, residual + x
+    return norm(x, residual)
+
+
+def peri_ln_add_rms_norm_reference(
+    x: torch.Tensor,
+    residual: torch.Tensor,
+    multiplier: float,
+    post_norm: Optional[RMSNorm],
+    norm: Optional[RMSNorm],
+) -> Tuple[Optional[torch.Tensor], torch.Tensor]:
+    """Unfused op sequence of the original decoder layer, for parity checks of peri_ln_add_rms_norm."""
+    if post_norm is not None:
+        x = post_norm.forward_native(x)
+    residual = residual + x * multiplier
+    if norm is None:
+        return None, residual
+    return norm.forward_native(residual), residual
+
 
 class HyperCLOVAXMLP(nn.Module):
 
@@ -262,37 +313,36 @@ class HyperCLOVAXDecoderLayer(nn.Module):
         self,
         positions: torch.Tensor,
         hidden_states: torch.Tensor,
-    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        residual: torch.Tensor,
+        next_norm: Optional[RMSNorm] = None,
+    ) -> Tuple[Optional[torch.Tensor], torch.Tensor]:
+        """hidden_states is the input already normalized by input_layernorm, and residual the residual stream.
+        The MLP output is added to the residual together with the pre-norm of what follows (next_norm):
+        returns (next_norm(residual), residual), or (None, residual) without next_norm.
+        """
         # Self Attention
-        residual = hidden_states
-
-        hidden_states = self.input_layernorm(hidden_states)
-
         hidden_states = self.self_attn(
             positions=positions,
             hidden_states=hidden_states)
 
-        # Peri-LN (post-norm)
-        if self.use_post_norm:
-            hidden_states = self.post_norm1(hidden_states)
+        # Peri-LN (post-norm) + MuP residual + pre-norm
+        hidden_states, residual = peri_ln_add_rms_norm(
+            hidden_states, residual, self.residual_multiplier,
+            self.post_norm1 if self.use_post_norm else None, self.post_attention_layernorm)
 
-        hidden_states = residual + hidden_states * self.residual_multiplier # MuP
         # Fully Connected
-        residual = hidden_states
-        hidden_states = self.post_attention_layernorm(hidden_states)
         hidden_states = self.mlp(hidden_states)
 
-        # Peri-LN (post-norm)
-        if self.use_post_norm:
-            hidden_states = self.post_norm2(hidden_states)
-
-        hidden_states = residual + hidden_states * self.residual_multiplier # MuP
-
-        return hidden_states
+        return peri_ln_add_rms_norm(
+            hidden_states, residual, self.residual_multiplier,
+            self.post_norm2 if self.use_post_norm else None, next_norm)
 
 
 @support_torch_compile
 class HyperCLOVAXModel(nn.Module):
+    # sent between pipeline stages: the residual stream only, the next stage applies its first input_layernorm
+    intermediate_tensor_keys = ["hidden_states"]
+    stacked_params_mapping = STACKED_PARAMS_MAPPING
 
     def __init__(self,
                  *,
@@ -337,7 +387,7 @@ class HyperCLOVAXModel(nn.Module):
 
         self.make_empty_intermediate_tensors = (
             make_empty_intermediate_tensors_factory(
-                ["hidden_states", "residual"], config.hidden_size))
+                self.intermediate_tensor_keys, config.hidden_size))
 
         self.embedding_multiplier = getattr(config, "embedding_multiplier", 1.0) # MuP
 
@@ -356,36 +406,46 @@ class HyperCLOVAXModel(nn.Module):
                 hidden_states = inputs_embeds
             else:
                 hidden_states = self.get_input_embeddings(input_ids)
-            residual = None
 
-            hidden_states *= self.embedding_multiplier # MuP
+            if self.embedding_multiplier != 1.0:
+                hidden_states *= self.embedding_multiplier # MuP
         else:
             assert intermediate_tensors is not None
             hidden_states = intermediate_tensors["hidden_states"]
-            residual = intermediate_tensors["residual"]
 
-        for layer in self.layers[self.start_layer:self.end_layer]:
-            hidden_states = layer(positions, hidden_states)
+        hidden_states, residual = self.run_layers(positions, hidden_states,
+                                                  self.layers[self.start_layer:self.end_layer],
+                                                  self.norm if get_pp_group().is_last_rank else None)
 
         if not get_pp_group().is_last_rank:
-            return IntermediateTensors({
-                "hidden_states": hidden_states,
-                "residual": residual
-            })
+            return IntermediateTensors({"hidden_states": residual})
 
-        hidden_states = self.norm(hidden_states)
         return hidden_states
 
+    def run_layers(
+        self,
+        positions: torch.Tensor,
+        residual: torch.Tensor,
+        layers: Sequence[HyperCLOVAXDecoderLayer],
+        last_norm: Optional[RMSNorm],
+    ) -> Tuple[Optional[torch.Tensor], torch.Tensor]:
+        """Returns (last_norm(residual), residual) after the layers, or (None, residual) without last_norm."""
+        # the residual stream is carried through the layers; each layer applies the pre-norm of the next one
+        norms = [layer.input_layernorm for layer in layers[1:]]
+        norms.append(last_norm)
+
+        hidden_states = None
+        if layers:
+            hidden_states = layers[0].input_layernorm(residual)
+        elif last_norm is not None:
+            hidden_states = last_norm(residual)
+        for layer, next_norm in zip(layers, norms):
+            hidden_states, residual = layer(positions, hidden_states, residual, next_norm)
+        return hidden_states, residual
+
     def load_weights(self, weights: Iterable[Tuple[str,
                                                    torch.Tensor]]) -> Set[str]:
-        stacked_params_mapping = [
-            # (param_name, shard_name, shard_id)
-            (".qkv_proj", ".q_proj", "q"),
-            (".qkv_proj", ".k_proj", "k"),
-            (".qkv_proj", ".v_proj", "v"),
-            (".gate_up_proj", ".gate_proj", 0),
-            (".gate_up_proj", ".up_proj", 1),
-        ]
+        stacked_params_mapping = self.stacked_params_mapping
         params_dict = dict(self.named_parameters())
         loaded_params: Set[str] = set()
         for name, loaded_weight in weights:
@@ -462,26 +522,7 @@ class HyperCLOVAXForCausalLM(nn.Module, SupportsLoRA, SupportsPP):
 
     # Mistral/HyperCLOVAX models can also be loaded with --load-format mistral
     # from consolidated.safetensors checkpoints
-    mistral_mapping = {
-        "layers": "model.layers",
-        "attention": "self_attn",
-        "qscale_act": "input_scale",
-        "qscale_weight": "weight_scale",
-        "kv_fake_quantizer.qscale_act": "kv_scale",
-        "wq": "q_proj",
-        "wk": "k_proj",
-        "wv": "v_proj",
-        "wo": "o_proj",
-        "attention_norm": "input_layernorm",
-        "feed_forward": "mlp",
-        "w1": "gate_proj",
-        "w2": "down_proj",
-        "w3": "up_proj",
-        "ffn_norm": "post_attention_layernorm",
-        "tok_embeddings": "model.embed_tokens",
-        "output": "lm_head",
-        "norm": "model.norm",
-    }
+    mistral_mapping = MISTRAL_MAPPING
 
     def __init__(self,
                  *,
@@ -532,6 +573,64 @@ class HyperCLOVAXForCausalLM(nn.Module, SupportsLoRA, SupportsPP):
         self.make_empty_intermediate_tensors = (
             self.model.make_empty_intermediate_tensors)
 
+        # parameter -> μP multiplier folded into it at load time
+        self.mup_fold_multipliers: Dict[nn.Parameter, float] = {}
+        if HCX_FOLD_MUP_MULTIPLIERS:
+            self.init_mup_folding(quant_config)
+
+    def init_mup_folding(self, quant_config: Optional[QuantizationConfig]):
+        """Moves the μP multipliers out of the forward pass: each one is set to 1.0 and multiplied into the weights
+        it scales when they are loaded. Multipliers whose weights cannot be scaled (quantized, LoRA) stay at runtime.
+
+        - residual_multiplier: into post_norm1/post_norm2 with Peri-LN, otherwise into o_proj/down_proj
+        - embedding_multiplier: into embed_tokens (with tie_word_embeddings, the logit scale is divided by it)
+        - logits_scaling (and logit_scale): into lm_head, unless the weights are tied
+        """
+        if self.lora_config is not None:
+            logger.warning("HCX_FOLD_MUP_MULTIPLIERS is not supported with LoRA; the multipliers are applied at runtime.")
+            return
+
+        def fold(module: nn.Module, multiplier: float):
+            for param in module.parameters(recurse=False):
+                self.mup_fold_multipliers[param] = self.mup_fold_multipliers.get(param, 1.0) * multiplier
+
+        unquantized_embeddings = quant_config is None or quant_config.get_name() != "gguf"
+
+        residual_multiplier = getattr(self.config, "residual_multiplier", 1.0)
+        if residual_multiplier != 1.0:
+            for layer in self.model.layers[self.model.start_layer:self.model.end_layer]:
+                if layer.use_post_norm:
+                    modules = (layer.post_norm1, layer.post_norm2)
+                elif quant_config is None:
+                    modules = (layer.self_attn.o_proj, layer.mlp.down_proj)
+                else:
+                    continue
+                for module in modules:
+                    fold(module, residual_multiplier)
+                layer.residual_multiplier = 1.0
+
+        embedding_multiplier = getattr(self.config, "embedding_multiplier", 1.0)
+        if (embedding_multiplier != 1.0 and unquantized_embeddings
+                and not isinstance(self.model.embed_tokens, PPMissingLayer)):
+            fold(self.model.embed_tokens, embedding_multiplier)
+            self.model.embedding_multiplier = 1.0
+            if self.config.tie_word_embeddings and get_pp_group().is_last_rank:
+                self.logits_processor.scale /= embedding_multiplier
+
+        if (get_pp_group().is_last_rank and not self.config.tie_word_embeddings and unquantized_embeddings
+                and self.logits_processor.scale != 1.0):
+            fold(self.lm_head, self.logits_processor.scale)
+            self.logits_processor.scale = 1.0
+
+    def fold_mup_multipliers(self, loaded_params: Set[str]):
+        params_dict = dict(self.named_parameters())
+        with torch.no_grad():
+            for name in loaded_params:
+                param = params_dict.get(name)
+                multiplier = self.mup_fold_multipliers.get(param) if param is not None else None
+                if multiplier is not None:
+                    param.mul_(multiplier)
+
     def _init_model(self,
                     vllm_config: VllmConfig,
                     prefix: str = "",
@@ -564,14 +663,110 @@ class HyperCLOVAXForCausalLM(nn.Module, SupportsLoRA, SupportsPP):
 
     def load_weights(self, weights: Iterable[Tuple[str,
                                                    torch.Tensor]]) -> Set[str]:
-        loader = AutoWeightsLoader(
-            self,
-            skip_prefixes=(["lm_head."]
-                           if self.config.tie_word_embeddings else None),
-        )
-        return loader.load_weights(
-            self.maybe_remap_mistral(name, loaded_weight)
-            for name, loaded_weight in weights)
+        if is_fused_checkpoint(self.config):
+            resolve = self.get_fused_weight_resolver()
+        elif HCX_WEIGHT_LOADER_THREADS > 0:
+            resolve = self.get_weight_resolver()
+        else:
+            resolve = None
+
+        if HCX_WEIGHT_LOADER_THREADS > 0:
+            loaded_params, timings = load_weights_parallel(
+                weights, resolve, HCX_WEIGHT_LOADER_THREADS, HCX_WEIGHT_LOADER_PREFETCH)
+            logger.info("Loaded %s with %d threads.", timings, HCX_WEIGHT_LOADER_THREADS)
+        elif resolve is not None:
+            loaded_params = set()
+            for name, loaded_weight in weights:
+                copy_weight = resolve(name, loaded_weight)
+                if copy_weight is not None:
+                    loaded_params.update(copy_weight())
+        else:
+            loader = AutoWeightsLoader(
+                self,
+                skip_prefixes=(["lm_head."]
+                               if self.config.tie_word_embeddings else None),
+            )
+            loaded_params = loader.load_weights(
+                self.maybe_remap_mistral(name, loaded_weight)
+                for name, loaded_weight in weights)
+        if self.mup_fold_multipliers:
+            self.fold_mup_multipliers(loaded_params)
+        return loaded_params
+
+    def get_fused_weight_resolver(self) -> WeightResolver:
+        """Resolver of checkpoint tensors in the fused layout written by hcx-convert-checkpoint.
+
+        The tensors are stored under the parameter names: at TP=1 they are copied as is, otherwise the weight
+        loaders split the fused tensors into the shards of this rank.
+        """
+        params_dict = dict(self.named_parameters())
+        tp_size = get_tensor_model_parallel_world_size()
+
+        def copy_weight(name, param, loaded_weight):
+            if tp_size == 1 and param.shape == loaded_weight.shape and param.dtype == loaded_weight.dtype:
+                param.data.copy_(loaded_weight)
+            else:
+                weight_loader = getattr(param, "weight_loader", default_weight_loader)
+                weight_loader(param, loaded_weight)
+            return (name, )
+
+        def resolve(name: str, loaded_weight: torch.Tensor):
+            param = params_dict.get(name)
+            if param is None:
+                if is_pp_missing_parameter(name, self):
+                    return None
+                raise ValueError(f"Unexpected weight {name} in a fused HyperCLOVAX checkpoint")
+            return lambda: copy_weight(name, param, loaded_weight)
+
+        return resolve
+
+    def get_weight_resolver(self) -> WeightResolver:
+        """Resolver of checkpoint tensors for load_weights_parallel.
+
+        Checkpoint names are looked up in a table built once from the parameters of this rank, with the q/k/v and
+        gate/up shard names of the stacked parameters; mistral names are looked up after maybe_remap_mistral.
+        Tensors outside the table (KV-cache scales, extra biases, ...) go through the AutoWeightsLoader path.
+        """
+        table: Dict[str, Tuple[str, nn.Parameter, Optional[Union[str, int]]]] = {}
+        for name, param in self.named_parameters():
+            table[name] = (name, param, None)
+            for param_name, weight_name, shard_id in self.model.stacked_params_mapping:
+                if param_name in name:
+                    table[name.replace(param_name, weight_name)] = (name, param, shard_id)
+
+        quant_config = self.model.quant_config
+        skip_prefixes = ("lm_head.", ) if self.config.tie_word_embeddings else ()
+        lock = threading.Lock()
+
+        def copy_weight(param_name, param, shard_id, loaded_weight):
+            weight_loader = getattr(param, "weight_loader", default_weight_loader)
+            if shard_id is None:
+                weight_loader(param, loaded_weight)
+            else:
+                weight_loader(param, loaded_weight, shard_id)
+            return (param_name, )
+
+        def load_with_auto_weights_loader(name, loaded_weight):
+            # parameter lookups of this path are not thread-safe
+            with lock:
+                loader = AutoWeightsLoader(self, skip_prefixes=list(skip_prefixes) or None)
+                return loader.load_weights([(name, loaded_weight)])
+
+        def resolve(name: str, loaded_weight: torch.Tensor):
+            if quant_config is None or not quant_config.get_cache_scale(name):
+                entry = table.get(name)
+                if entry is None:
+                    name, loaded_weight = self.maybe_remap_mistral(name, loaded_weight)
+                    entry = table.get(name)
+                if entry is not None:
+                    return lambda: copy_weight(*entry, loaded_weight)
+
+            if ("rotary_emb." in name or name.startswith(skip_prefixes)
+                    or is_pp_missing_parameter(name, self)):
+                return None
+            return lambda: load_with_auto_weights_loader(name, loaded_weight)
+
+        return resolve
 
     # This function is used to remap the mistral format as
     # used by Mistral and Llama <=2
@@ -580,36 +775,5 @@ class HyperCLOVAXForCausalLM(nn.Module, SupportsLoRA, SupportsPP):
         name: str,
         loaded_weight: torch.Tensor,
     ) -> Tuple[str, torch.Tensor]:
-
-        def permute(w: torch.Tensor, n_heads: int):
-            attn_in = self.config.head_dim * n_heads
-            attn_out = self.config.hidden_size
-
-            return w.view(n_heads, attn_in // n_heads // 2, 2,
-                          attn_out).transpose(1, 2).reshape(attn_in, attn_out)
-
-        mapping = self.mistral_mapping
-        modules = name.split(".")
-
-        # rotary embeds should be sliced
-        if "wk" in modules and modules[-1] == "weight":
-            loaded_weight = permute(loaded_weight,
-                                    self.config.num_key_value_heads)
-        elif "wq" in modules and modules[-1] == "weight":
-            loaded_weight = permute(loaded_weight,
-                                    self.config.num_attention_heads)
-
-        num_modules = len(modules)
-        for i in range(num_modules):
-            item = modules[i]
-            next_item = modules[i + 1] if i < num_modules - 1 else None
-
-            combined_item = (f"{item}.{next_item}"
-                             if next_item is not None else None)
-
-            if combined_item in mapping:
-                name = name.replace(combined_item, mapping[combined_item])
-            elif item in mapping and mapping[item] not in name:
-                name = name.replace(item, mapping[item])
-
-        return name, loaded_weight
+        loaded_weight = permute_mistral_weight(name, loaded_weight, self.config)
+        return remap_mistral_name(name), loaded_weight
@@ -0,0 +1,140 @@
+# HyperCLOVAX vLLM Plugin
+# Copyright (c) 2025-present NAVER Cloud Corp.
+# Apache-2.0
+#
+# Adapted from https://github.com/vllm-project/vllm/blob/main/vllm/model_executor/models/llama_eagle.py
+"""EAGLE draft model for speculative decoding of HyperCLOVAX."""
+from typing import Iterable, Optional, Set, Tuple
+
+import torch
+from torch import nn
+
+from vllm.config import VllmConfig
+from vllm.model_executor.layers.logits_processor import LogitsProcessor
+from vllm.model_executor.layers.vocab_parallel_embedding import (
+    DEFAULT_VOCAB_PADDING_SIZE, ParallelLMHead, VocabParallelEmbedding)
+from vllm.model_executor.models.utils import AutoWeightsLoader, maybe_prefix
+
+from .vllm_hyperclovax import (HCX_FOLD_MUP_MULTIPLIERS, HyperCLOVAXDecoderLayer, HyperCLOVAXForCausalLM,
+                               HyperCLOVAXModel)
+
+
+class HyperCLOVAXEagleModel(nn.Module):
+    """EAGLE head: fc(concat(embedding, target hidden state)) followed by HyperCLOVAX decoder layers.
+
+    The layers keep the μP residual_multiplier/attention_multiplier and the Peri-LN post-norms of the config;
+    as in EAGLE, the first layer has no input_layernorm and there is no final norm.
+    """
+    stacked_params_mapping = HyperCLOVAXModel.stacked_params_mapping
+
+    def __init__(self, *, vllm_config: VllmConfig, prefix: str = "", start_layer_id: int = 0):
+        super().__init__()
+        config = vllm_config.speculative_config.draft_model_config.hf_config
+        self.config = config
+        self.quant_config = vllm_config.quant_config
+
+        self.embed_tokens = VocabParallelEmbedding(
+            config.vocab_size,
+            config.hidden_size,
+            prefix=maybe_prefix(prefix, "embed_tokens"),
+        )
+        # layer names continue after the target layers, so that the attention layers get their own KV cache
+        self.layers = nn.ModuleList([
+            HyperCLOVAXDecoderLayer(config,
+                                    cache_config=vllm_config.cache_config,
+                                    quant_config=self.quant_config,
+                                    prefix=maybe_prefix(prefix, f"layers.{idx + start_layer_id}"))
+            for idx in range(config.num_hidden_layers)
+        ])
+        self.start_layer, self.end_layer = 0, len(self.layers)
+        # https://github.com/SafeAILab/EAGLE/blob/35c78f6cdc19a73e05cf5c330b4c358dad970c6a/eagle/model/cnets.py#L427
+        self.layers[0].input_layernorm = nn.Identity()
+        self.fc = nn.Linear(config.hidden_size * 2, config.hidden_size, bias=False)
+
+        self.embedding_multiplier = getattr(config, "embedding_multiplier", 1.0) # MuP
+
+    def get_input_embeddings(self, input_ids: torch.Tensor) -> torch.Tensor:
+        return self.embed_tokens(input_ids)
+
+    def forward(
+        self,
+        input_ids: torch.Tensor,
+        positions: torch.Tensor,
+        hidden_states: torch.Tensor,
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        input_embeds = self.get_input_embeddings(input_ids)
+        if self.embedding_multiplier != 1.0:
+            input_embeds = input_embeds * self.embedding_multiplier # MuP
+        hidden_states = self.fc(torch.cat((input_embeds, hidden_states), dim=-1))
+
+        residual = hidden_states
+        norms = [layer.input_layernorm for layer in self.layers[1:]] + [None]
+        for layer, next_norm in zip(self.layers, norms):
+            hidden_states, residual = layer(positions, hidden_states, residual, next_norm)
+        return residual, residual
+
+    load_weights = HyperCLOVAXModel.load_weights
+
+
+class HyperCLOVAXForCausalLMEagle(HyperCLOVAXForCausalLM):
+    """EAGLE draft for HyperCLOVAXForCausalLM, loading standard EAGLE checkpoints (names without the "model." prefix).
+
+    vLLM's EAGLE proposer replaces embed_tokens and lm_head with the target's; the logits keep the μP logits_scaling
+    of the config. With HCX_FOLD_MUP_MULTIPLIERS the draft folds its multipliers like the target, so the shared
+    (already folded) embedding and lm_head are not scaled twice.
+    """
+
+    def __init__(self, *, vllm_config: VllmConfig, prefix: str = "", start_layer_id: Optional[int] = None):
+        nn.Module.__init__(self)
+        config = vllm_config.speculative_config.draft_model_config.hf_config
+        self.config = config
+        self.lora_config = None
+        if start_layer_id is None:
+            start_layer_id = vllm_config.model_config.get_num_layers(vllm_config.parallel_config)
+
+        self.model = HyperCLOVAXEagleModel(vllm_config=vllm_config,
+                                           prefix=maybe_prefix(prefix, "model"),
+                                           start_layer_id=start_layer_id)
+
+        self.unpadded_vocab_size = config.vocab_size
+        self.lm_head = ParallelLMHead(
+            config.vocab_size,
+            config.hidden_size,
+            org_num_embeddings=config.vocab_size,
+            padding_size=DEFAULT_VOCAB_PADDING_SIZE,
+            prefix=maybe_prefix(prefix, "lm_head"),
+        )
+        if config.tie_word_embeddings:
+            self.lm_head = self.lm_head.tie_weights(self.model.embed_tokens)
+
+        logit_scale = getattr(config, "logit_scale", 1.0)
+        logit_scale *= getattr(config, "logits_scaling", 1.0) # MuP
+        self.logits_processor = LogitsProcessor(config.vocab_size, scale=logit_scale)
+
+        self.mup_fold_multipliers = {}
+        if HCX_FOLD_MUP_MULTIPLIERS:
+            self.init_mup_folding(vllm_config.quant_config)
+
+    def forward(
+        self,
+        input_ids: torch.Tensor,
+        positions: torch.Tensor,
+        hidden_states: torch.Tensor,
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        return self.model(input_ids, positions, hidden_states)
+
+    def load_weights(self, weights: Iterable[Tuple[str, torch.Tensor]]) -> Set[str]:
+        loader = AutoWeightsLoader(
+            self,
+            skip_prefixes=(["lm_head."] if self.config.tie_word_embeddings else None),
+        )
+        loaded_params = loader.load_weights(
+            (name if name.startswith(("lm_head.", "model.")) else "model." + name, loaded_weight)
+            for name, loaded_weight in weights)
+        if self.mup_fold_multipliers:
+            self.fold_mup_multipliers(loaded_params)
+
+        # EAGLE checkpoints usually leave out the embedding and lm_head, which are shared with the target model
+        loaded_params.update(name for name, _ in self.named_parameters()
+                             if name.startswith(("model.embed_tokens.", "lm_head.")))
+        return loaded_params
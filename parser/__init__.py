@@ -1,10 +1,24 @@
-from vllm.reasoning import ReasoningParserManager
-from vllm.entrypoints.openai.tool_parsers.abstract_tool_parser import ToolParserManager
+# vLLM and the parsers are imported only when registering: the entry points run in every vLLM process,
+# and with lazy registration the parser modules are imported only by the process that uses them.
 
 def register_reasoning_parser():
+    from vllm.reasoning import ReasoningParserManager
+
+    if hasattr(ReasoningParserManager, "register_lazy_module"):
+        ReasoningParserManager.register_lazy_module(name="hcx", module_path=f"{__name__}.hcx_reasoner",
+                                                    class_name="HcxReasoningParser")
+        return
+
     from .hcx_reasoner import HcxReasoningParser
     ReasoningParserManager.register_module(name="hcx", module=HcxReasoningParser, force=True)
 
 def register_tool_parser():
+    from vllm.entrypoints.openai.tool_parsers.abstract_tool_parser import ToolParserManager
+
+    if hasattr(ToolParserManager, "register_lazy_module"):
+        ToolParserManager.register_lazy_module(name="hcx", module_path=f"{__name__}.hcx_tool_parser",
+                                               class_name="HcxToolParser")
+        return
+
     from .hcx_tool_parser import HcxToolParser
     ToolParserManager.register_module(name="hcx", module=HcxToolParser, force=True)
@@ -0,0 +1,175 @@
+# HyperCLOVAX vLLM Plugin
+# Copyright (c) 2025-present NAVER Cloud Corp.
+# Apache-2.0
+"""
+Batch post-processing of offline HCX generations into reasoning/content/tool-call records.
+
+    hcx-postprocess --tokenizer naver-hyperclovax/HyperCLOVAX-SEED-Think-14B \\
+        --input generations.jsonl --output parsed.jsonl --num-workers 16
+
+Each input line is a JSON object with the raw completion in `--text-field` (default: "text").
+The optional "chat_template_kwargs", "tool_choice" and "tools" fields are used as the request of the record.
+Output lines keep the input order and fields, plus "reasoning_content", "content", "tools_called" and "tool_calls".
+Records with a reasoning budget also get "reasoning_budget_exceeded", counted from the generated "token_ids"
+when the record has them and from the re-tokenized reasoning otherwise.
+With HCX_TOOL_CALL_VALIDATION=1, records with invalid tool calls also get "tool_call_validation_errors".
+"""
+import argparse
+import itertools
+import json
+import sys
+import time
+from collections import deque
+from multiprocessing import get_context
+
+_worker_state = {}
+
+
+def init_worker(tokenizer_name: str, trust_remote_code: bool, text_field: str,
+                parse_reasoning: bool, parse_tools: bool):
+    from transformers import AutoTokenizer
+
+    from .hcx_reasoner import HcxReasoningParser
+    from .hcx_tool_parser import HcxToolParser
+
+    tokenizer = AutoTokenizer.from_pretrained(tokenizer_name, trust_remote_code=trust_remote_code)
+    _worker_state.update(tokenizer=tokenizer, text_field=text_field,
+                         parse_reasoning=parse_reasoning, parse_tools=parse_tools)
+    # build the per-tokenizer parser constants once per worker
+    _worker_state["reasoning_parser"] = HcxReasoningParser(tokenizer) if parse_reasoning else None
+    _worker_state["tool_parser"] = HcxToolParser(tokenizer) if parse_tools else None
+
+
+def make_request(record: dict):
+    from vllm.entrypoints.openai.protocol import ChatCompletionRequest
+
+    request_fields = {key: record[key] for key in ("chat_template_kwargs", "tool_choice", "tools") if key in record}
+    return ChatCompletionRequest(messages=[], **request_fields)
+
+
+def postprocess_record(record: dict, reasoning_parser=None, tool_parser=None, text_field: str = "text") -> dict:
+    request = make_request(record)
+    reasoning_content, content = None, record[text_field]
+
+    reasoning_budget_exceeded = None
+    if reasoning_parser is not None:
+        token_ids = record.get("token_ids")
+        reasoning_content, content = reasoning_parser.extract_reasoning_content(content, request, token_ids)
+        if reasoning_parser.reasoning_budget is not None:
+            reasoning_budget_exceeded = reasoning_parser.reasoning_budget_exceeded
+
+    tools_called, tool_calls, validation_errors = False, [], []
+    if tool_parser is not None and content:
+        tool_call_info = tool_parser.extract_tool_calls(content, request)
+        tools_called = tool_call_info.tools_called
+        validation_errors = getattr(tool_call_info, "validation_errors", [])
+        content = tool_call_info.content
+        tool_calls = [{"name": tool_call.function.name, "arguments": tool_call.function.arguments}
+                      for tool_call in tool_call_info.tool_calls]
+
+    output = dict(record)
+    output.update(reasoning_content=reasoning_content, content=content,
+                  tools_called=tools_called, tool_calls=tool_calls)
+    if reasoning_budget_exceeded is not None:
+        output["reasoning_budget_exceeded"] = reasoning_budget_exceeded
+    if validation_errors:
+        output["tool_call_validation_errors"] = validation_errors
+    return output
+
+
+def postprocess_lines(lines: list[str]) -> list[str]:
+    outputs = []
+    for line in lines:
+        try:
+            output = postprocess_record(json.loads(line),
+                                        reasoning_parser=_worker_state["reasoning_parser"],
+                                        tool_parser=_worker_state["tool_parser"],
+                                        text_field=_worker_state["text_field"])
+        except Exception as e:
+            output = {"input": line.rstrip("\n"), "error": f"{type(e).__name__}: {e}"}
+        outputs.append(json.dumps(output, ensure_ascii=False))
+    return outputs
+
+
+def postprocess_jsonl(input_file, output_file, tokenizer_name: str, num_workers: int = 1,
+                      batch_size: int = 256, max_inflight_batches: int = None, trust_remote_code: bool = False,
+                      text_field: str = "text", parse_reasoning: bool = True, parse_tools: bool = True,
+                      log_interval: float = 10.0) -> int:
+    '''
+    Streams JSONL records from input_file to output_file in input order.
+    Work is sharded in batches over a process pool; at most max_inflight_batches batches are held in memory.
+    Returns the number of processed records.
+    '''
+    max_inflight_batches = max_inflight_batches or 4 * num_workers
+    initargs = (tokenizer_name, trust_remote_code, text_field, parse_reasoning, parse_tools)
+    lines = (line for line in input_file if line.strip())
+    batches = iter(lambda: list(itertools.islice(lines, batch_size)), [])
+
+    num_records = 0
+    start = last_log = time.perf_counter()
+
+    def write(outputs):
+        nonlocal num_records, last_log
+        for output in outputs:
+            output_file.write(output + "\n")
+        num_records += len(outputs)
+        now = time.perf_counter()
+        if log_interval and now - last_log >= log_interval:
+            last_log = now
+            print(f"{num_records} records, {num_records / (now - start):.1f} records/s", file=sys.stderr)
+
+    if num_workers <= 1:
+        init_worker(*initargs)
+        for batch in batches:
+            write(postprocess_lines(batch))
+    else:
+        with get_context("spawn").Pool(num_workers, initializer=init_worker, initargs=initargs) as pool:
+            inflight = deque()
+            for batch in batches:
+                inflight.append(pool.apply_async(postprocess_lines, (batch,)))
+                if len(inflight) >= max_inflight_batches:
+                    write(inflight.popleft().get())
+            while inflight:
+                write(inflight.popleft().get())
+
+    elapsed = time.perf_counter() - start
+    print(f"{num_records} records in {elapsed:.1f}s, {num_records / elapsed if elapsed else 0.0:.1f} records/s",
+          file=sys.stderr)
+    return num_records
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Post-process offline HCX generations (JSONL in, JSONL out).")
+    arg_parser.add_argument("--tokenizer", required=True, help="Tokenizer name or path of the HCX model.")
+    arg_parser.add_argument("--input", default="-", help="Input JSONL file ('-' for stdin).")
+    arg_parser.add_argument("--output", default="-", help="Output JSONL file ('-' for stdout).")
+    arg_parser.add_argument("--text-field", default="text", help="Field of the raw completion text.")
+    arg_parser.add_argument("--num-workers", type=int, default=1)
+    arg_parser.add_argument("--batch-size", type=int, default=256, help="Records per task sent to a worker.")
+    arg_parser.add_argument("--max-inflight-batches", type=int, default=None,
+                            help="Batches held in memory at once (default: 4 x num-workers).")
+    arg_parser.add_argument("--no-reasoning", action="store_true", help="Do not run the reasoning parser.")
+    arg_parser.add_argument("--no-tools", action="store_true", help="Do not run the tool parser.")
+    arg_parser.add_argument("--trust-remote-code", action="store_true")
+    args = arg_parser.parse_args()
+
+    input_file = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    output_file = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        postprocess_jsonl(input_file, output_file, args.tokenizer,
+                          num_workers=args.num_workers,
+                          batch_size=args.batch_size,
+                          max_inflight_batches=args.max_inflight_batches,
+                          trust_remote_code=args.trust_remote_code,
+                          text_field=args.text_field,
+                          parse_reasoning=not args.no_reasoning,
+                          parse_tools=not args.no_tools)
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()
+
+
+if __name__ == "__main__":
+    main()
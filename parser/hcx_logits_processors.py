@@ -0,0 +1,386 @@
+# HyperCLOVAX vLLM Plugin
+# Copyright (c) 2025-present NAVER Cloud Corp.
+# Apache-2.0
+"""
+Per-request logits processors for HCX outputs.
+
+Each processor is a callable `(output_token_ids, logits) -> logits` working on the logits row of one request,
+so it can be passed to `SamplingParams.logits_processors` (offline / V0 engine) or wrapped by the V1 adapters
+at the bottom of this module (`--logits-processors parser.hcx_logits_processors:<Adapter>`).
+"""
+import json
+import os
+from collections.abc import Sequence
+
+try:
+    import xgrammar as xgr
+except ImportError:
+    xgr = None
+
+from vllm.logger import init_logger
+
+from .hcx_parser_constants import get_tokenizer_constants
+from .hcx_reasoner import HcxReasoningParser
+from .hcx_schema_cache import CompiledSchemaCache
+
+logger = init_logger(__name__)
+
+HCX_TOOL_CALL_GRAMMAR_CACHE_SIZE = int(os.environ.get("HCX_TOOL_CALL_GRAMMAR_CACHE_SIZE", "256"))
+
+FUNCTION_CALL_ROLE = " -> tool/function_call\n"
+STOP_TOKENS = ("<|im_end|>", "<|endofturn|>", "<|stop|>")
+
+
+def get_tool_functions(tools) -> list[tuple[str, dict]]:
+    # request.tools (pydantic) or OpenAI-style dicts
+    functions = []
+    for tool in tools or []:
+        function = tool["function"] if isinstance(tool, dict) else tool.function
+        if isinstance(function, dict):
+            functions.append((function["name"], function.get("parameters")))
+        else:
+            functions.append((function.name, function.parameters))
+    return functions
+
+
+def build_tool_call_schema(tools) -> dict:
+    '''
+    JSON schema of the tool-call region: a non-empty array of {"name": <tool name>, "arguments": <tool parameters>}.
+    '''
+    calls = []
+    for name, parameters in get_tool_functions(tools):
+        calls.append({
+            "type": "object",
+            "properties": {"name": {"const": name}, "arguments": parameters or {"type": "object"}},
+            "required": ["name", "arguments"],
+        })
+    return {"type": "array", "minItems": 1, "items": {"anyOf": calls}}
+
+
+def get_tool_call_grammar_cache(tokenizer, vocab_size: int) -> CompiledSchemaCache:
+    '''
+    Compiled tool-call grammars, cached per tokenizer and vocab size (the logits width) and per tool set.
+    '''
+    def build(tokenizer):
+        vocab = tokenizer.get_vocab()
+        stop_token_ids = [vocab[token] for token in STOP_TOKENS if token in vocab]
+        tokenizer_info = xgr.TokenizerInfo.from_huggingface(tokenizer, vocab_size=vocab_size,
+                                                            stop_token_ids=stop_token_ids)
+        compiler = xgr.GrammarCompiler(tokenizer_info)
+        return CompiledSchemaCache(lambda schema: compiler.compile_json_schema(json.dumps(schema)),
+                                   HCX_TOOL_CALL_GRAMMAR_CACHE_SIZE)
+
+    return get_tokenizer_constants(tokenizer, ("tool_call_grammar", vocab_size), build)
+
+
+# a UTF-8 character spans at most 4 byte tokens
+MAX_PENDING_TOKENS = 4
+
+
+class HcxOutputTextTracker:
+    '''
+    Follows the generated token ids of one request and detects when a marker string has just been completed.
+    Only the new token ids are decoded on each step.
+    '''
+    def __init__(self, tokenizer, marker: str):
+        self.tokenizer = tokenizer
+        self.marker = marker
+        self.carry = ''
+        self.num_tokens = 0
+        self.marker_seen = False
+        # ids of a character split across byte tokens, decoded once it is complete
+        self.pending_token_ids = []
+
+    def new_token_ids(self, output_token_ids: Sequence[int]) -> Sequence[int]:
+        new_token_ids = output_token_ids[self.num_tokens:]
+        self.num_tokens = len(output_token_ids)
+        return new_token_ids
+
+    def decode(self, token_id: int) -> str:
+        '''
+        Returns the text of this token, or an empty string while it ends in an incomplete character, whose text
+        is then returned with the token that completes it.
+        '''
+        self.pending_token_ids.append(token_id)
+        text = self.tokenizer.decode(self.pending_token_ids)
+        if text.endswith("\ufffd") and len(self.pending_token_ids) < MAX_PENDING_TOKENS:
+            return ''
+        self.pending_token_ids = []
+        return text
+
+    def feed(self, token_id: int):
+        '''
+        Returns the text following the marker in this token when the marker is completed by it, otherwise None.
+        '''
+        if self.marker_seen:
+            return None
+        text = self.carry + self.decode(token_id)
+        marker_index = text.find(self.marker)
+        if marker_index < 0:
+            self.carry = text[max(len(text) - len(self.marker) + 1, 0):]
+            return None
+        self.marker_seen = True
+        self.carry = ''
+        return text[marker_index + len(self.marker):]
+
+
+class HcxToolCallGrammarLogitsProcessor:
+    '''
+    Leaves reasoning and free text unconstrained; once ' -> tool/function_call\\n' is generated,
+    constrains decoding to a JSON array of calls matching the request's tools, followed by the stop token.
+    Requires xgrammar.
+    '''
+    def __init__(self, tokenizer, tools):
+        if xgr is None:
+            raise ImportError("xgrammar is required for HcxToolCallGrammarLogitsProcessor")
+        self.tokenizer = tokenizer
+        self.schema = build_tool_call_schema(tools)
+        self.text_tracker = HcxOutputTextTracker(tokenizer, FUNCTION_CALL_ROLE)
+        self.matcher = None
+        self.bitmask = None
+        self.disabled = not self.schema["items"]["anyOf"]
+
+    def start_region(self, vocab_size: int):
+        compiled_grammar = get_tool_call_grammar_cache(self.tokenizer, vocab_size).get(self.schema)
+        self.matcher = xgr.GrammarMatcher(compiled_grammar)
+        self.bitmask = xgr.allocate_token_bitmask(1, vocab_size)
+
+    def __call__(self, output_token_ids: Sequence[int], logits):
+        if self.disabled:
+            return logits
+
+        for token_id in self.text_tracker.new_token_ids(output_token_ids):
+            if self.matcher is not None:
+                if not self.matcher.accept_token(token_id):
+                    logger.debug("Token %d is rejected by the tool-call grammar; stop constraining.", token_id)
+                    self.disabled = True
+                    return logits
+                continue
+
+            remaining_text = self.text_tracker.feed(token_id)
+            if remaining_text is None:
+                continue
+            if remaining_text:
+                # the marker ends in the middle of a token, so the grammar cannot follow the region exactly
+                logger.debug("Tool-call start token is not on a token boundary; tool-call grammar is not applied.")
+                self.disabled = True
+                return logits
+            self.start_region(logits.shape[-1])
+
+        if self.matcher is None or self.matcher.is_terminated():
+            return logits
+
+        self.matcher.fill_next_token_bitmask(self.bitmask)
+        xgr.apply_token_bitmask_inplace(logits.view(1, -1), self.bitmask.to(logits.device))
+        return logits
+
+
+class HcxReasoningBudgetLogitsProcessor:
+    '''
+    Caps the reasoning at reasoning_budget generated tokens: once the budget is spent and reasoning has not ended,
+    the think-end token sequence ('<|im_end|>\\n<|im_start|>assistant') is forced, and the model then decides
+    between the answer and a tool call.
+    '''
+    def __init__(self, tokenizer, reasoning_budget: int):
+        constants = get_tokenizer_constants(tokenizer, HcxReasoningParser, HcxReasoningParser.build_tokenizer_constants)
+        self.reasoning_budget = reasoning_budget
+        self.end_token_id = constants["end_token_id"]
+        self.non_reasoning_mode_start_token = constants["non_reasoning_mode_start_token"]
+
+        # common prefix of the think-end sequences, i.e. the tokens of think_end_string_base
+        think_end_tokens = constants["think_end_tokens"]
+        forced_tokens = []
+        for token_ids in zip(*think_end_tokens):
+            if len(set(token_ids)) > 1:
+                break
+            forced_tokens.append(token_ids[0])
+        self.forced_tokens = forced_tokens
+
+        self.text_tracker = HcxOutputTextTracker(tokenizer, FUNCTION_CALL_ROLE)
+        self.num_forced = 0
+        self.forcing = False
+        self.finished = not forced_tokens
+        self.budget_exceeded = False
+
+    def __call__(self, output_token_ids: Sequence[int], logits):
+        if self.finished:
+            return logits
+
+        start = self.text_tracker.num_tokens
+        for position, token_id in enumerate(self.text_tracker.new_token_ids(output_token_ids), start):
+            if self.forcing:
+                self.num_forced += 1
+                if self.num_forced >= len(self.forced_tokens):
+                    self.finished = True
+                    return logits
+            elif position == 0 and token_id == self.non_reasoning_mode_start_token:
+                # non-reasoning mode
+                self.finished = True
+                return logits
+            elif token_id == self.end_token_id or self.text_tracker.feed(token_id) is not None:
+                # reasoning ended (or a tool call started) within the budget
+                self.finished = True
+                return logits
+
+        if not self.forcing and self.text_tracker.num_tokens >= self.reasoning_budget:
+            self.forcing = True
+            self.budget_exceeded = True
+
+        if self.forcing:
+            logits.fill_(float("-inf"))
+            logits[self.forced_tokens[self.num_forced]] = 0.0
+        return logits
+
+
+class HcxToolCallStopLogitsProcessor:
+    '''
+    Ends the sequence as soon as the JSON array of the tool-call region closes and parses, by forcing '<|im_end|>'
+    instead of letting the model generate trailing text. The tool parser then reports the calls (finish reason tool_calls).
+    '''
+    def __init__(self, tokenizer):
+        constants = get_tokenizer_constants(tokenizer, HcxReasoningParser, HcxReasoningParser.build_tokenizer_constants)
+        self.tokenizer = tokenizer
+        self.end_token_id = constants["end_token_id"]
+        self.text_tracker = HcxOutputTextTracker(tokenizer, FUNCTION_CALL_ROLE)
+
+        # JSON state of the tool-call region
+        self.region_text = None
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+
+        self.stopping = False
+        self.finished = self.end_token_id is None
+
+    def scan(self, text: str):
+        for i, c in enumerate(text):
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif c == '\\':
+                    self.escaped = True
+                elif c == '"':
+                    self.in_string = False
+                continue
+
+            if self.depth == 0:
+                if c.isspace():
+                    continue
+                if c != '[':
+                    # not a JSON array, leave the output to the model
+                    self.finished = True
+                    return
+                self.region_text = ''
+
+            if c == '"':
+                self.in_string = True
+            elif c in '[{':
+                self.depth += 1
+            elif c in ']}':
+                self.depth -= 1
+                if self.depth == 0:
+                    try:
+                        json.loads(self.region_text + text[:i + 1])
+                    except json.JSONDecodeError:
+                        self.finished = True
+                        return
+                    self.stopping = True
+                    return
+
+        if self.region_text is not None:
+            self.region_text += text
+
+    def __call__(self, output_token_ids: Sequence[int], logits):
+        if self.finished:
+            return logits
+
+        for token_id in self.text_tracker.new_token_ids(output_token_ids):
+            if self.stopping:
+                # the forced end token was generated
+                self.finished = True
+                return logits
+
+            if not self.text_tracker.marker_seen:
+                remaining_text = self.text_tracker.feed(token_id)
+                if remaining_text:
+                    self.scan(remaining_text)
+            elif token_id == self.end_token_id:
+                # the model closed the turn itself
+                self.finished = True
+            else:
+                self.scan(self.text_tracker.decode(token_id))
+            if self.finished:
+                return logits
+
+        if self.stopping:
+            logits.fill_(float("-inf"))
+            logits[self.end_token_id] = 0.0
+        return logits
+
+
+try:
+    from vllm.v1.sample.logits_processor import AdapterLogitsProcessor
+except ImportError:
+    AdapterLogitsProcessor = None
+
+
+if AdapterLogitsProcessor is not None:
+    from vllm.transformers_utils.tokenizer import get_tokenizer
+
+    class HcxLogitsProcessorAdapter(AdapterLogitsProcessor):
+        '''
+        Base of the V1 adapters: loads the tokenizer once and builds a per-request processor from SamplingParams.extra_args
+        (`vllm_xargs` of the OpenAI-compatible request).
+        '''
+        def __init__(self, vllm_config, device, is_pin_memory: bool):
+            super().__init__(vllm_config, device, is_pin_memory)
+            model_config = vllm_config.model_config
+            self.tokenizer = get_tokenizer(model_config.tokenizer,
+                                           tokenizer_mode=model_config.tokenizer_mode,
+                                           trust_remote_code=model_config.trust_remote_code,
+                                           revision=model_config.tokenizer_revision)
+
+        def is_argmax_invariant(self) -> bool:
+            return False
+
+        def new_req_logits_processor(self, params):
+            return self.build(params.extra_args or {})
+
+        def build(self, extra_args: dict):
+            '''
+            The processor of one request, or None when the request does not enable it (the default).
+            '''
+            return None
+
+    class HcxToolCallGrammarAdapter(HcxLogitsProcessorAdapter):
+        '''
+        Enabled per request by `vllm_xargs: {"hcx_tools": "<JSON-encoded request.tools>"}`;
+        HcxToolParser.adjust_request sets it for requests with tools.
+        '''
+        def build(self, extra_args: dict):
+            tools = extra_args.get("hcx_tools")
+            if not tools:
+                return None
+            return HcxToolCallGrammarLogitsProcessor(self.tokenizer, json.loads(tools) if isinstance(tools, str) else tools)
+
+    class HcxToolCallStopAdapter(HcxLogitsProcessorAdapter):
+        '''
+        Enabled per request by `vllm_xargs: {"hcx_tool_call_stop": true}`;
+        HcxToolParser.adjust_request sets it for requests with tools.
+        '''
+        def build(self, extra_args: dict):
+            if not extra_args.get("hcx_tool_call_stop"):
+                return None
+            return HcxToolCallStopLogitsProcessor(self.tokenizer)
+
+    class HcxReasoningBudgetAdapter(HcxLogitsProcessorAdapter):
+        '''
+        Enabled per request by `vllm_xargs: {"reasoning_budget": N}`. HcxToolParser.adjust_request copies
+        chat_template_kwargs.reasoning_budget there, but vLLM only calls it for requests served with a tool parser
+        and tool_choice other than "none"; for the others the client sets vllm_xargs itself.
+        '''
+        def build(self, extra_args: dict):
+            reasoning_budget = extra_args.get("reasoning_budget")
+            if reasoning_budget is None:
+                return None
+            return HcxReasoningBudgetLogitsProcessor(self.tokenizer, int(reasoning_budget))
@@ -0,0 +1,25 @@
+# HyperCLOVAX vLLM Plugin
+# Copyright (c) 2025-present NAVER Cloud Corp.
+# Apache-2.0
+
+import threading
+import weakref
+
+# tokenizer -> {key: constants}; entries go away together with the tokenizer
+_tokenizer_constants = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def get_tokenizer_constants(tokenizer, key, build):
+    '''
+    Returns build(tokenizer), computed once per tokenizer and key.
+    The result is shared by every parser instance using the tokenizer, so it must be treated as read-only.
+    '''
+    per_tokenizer = _tokenizer_constants.get(tokenizer)
+    if per_tokenizer is not None and key in per_tokenizer:
+        return per_tokenizer[key]
+
+    constants = build(tokenizer)
+    with _lock:
+        per_tokenizer = _tokenizer_constants.setdefault(tokenizer, {})
+        return per_tokenizer.setdefault(key, constants)
@@ -0,0 +1,174 @@
+# HyperCLOVAX vLLM Plugin
+# Copyright (c) 2025-present NAVER Cloud Corp.
+# Apache-2.0
+"""
+Optional hot-path metrics of the HCX parsers.
+
+Disabled by default. With HCX_PARSER_METRICS=prometheus the metrics are registered in the prometheus_client
+registry served by vLLM's /metrics endpoint; HCX_PARSER_METRICS=<module>:<class> loads a custom sink, and
+set_parser_metrics() installs one programmatically.
+When disabled, parsers are not instrumented at all: only the constructor checks `parser_metrics`.
+"""
+import functools
+import importlib
+import os
+import time
+
+try:
+    import prometheus_client
+except ImportError:
+    prometheus_client = None
+
+HCX_PARSER_METRICS = os.environ.get("HCX_PARSER_METRICS", "")
+
+
+class HcxParserMetricsSink:
+    '''
+    Receiver of the parser metrics. Every method is a no-op; override the ones you need.
+    `parser` is the parser class name.
+    '''
+    def observe_parse_time(self, parser: str, seconds: float):
+        pass
+
+    def observe_buffer_length(self, parser: str, length: int):
+        pass
+
+    def inc_held_back(self, parser: str):
+        pass
+
+    def inc_json_decode_failure(self, parser: str):
+        pass
+
+    def observe_tool_calls(self, parser: str, num_tool_calls: int):
+        pass
+
+    def inc_reasoning_budget_exceeded(self, parser: str):
+        pass
+
+    def observe_speculative_tokens(self, proposer: str, kind: str, num_proposed: int, num_accepted: int):
+        pass
+
+
+class PrometheusParserMetrics(HcxParserMetricsSink):
+    def __init__(self):
+        if prometheus_client is None:
+            raise ImportError("prometheus_client is required for HCX_PARSER_METRICS=prometheus")
+        self.parse_time = prometheus_client.Histogram(
+            "hcx_parser_delta_parse_seconds", "Time spent parsing one streamed delta.", ["parser"],
+            buckets=(1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 1e-2))
+        self.buffer_length = prometheus_client.Histogram(
+            "hcx_parser_buffer_length", "Characters held back in the parser buffer after a delta.", ["parser"],
+            buckets=(0, 1, 2, 4, 8, 16, 32, 64))
+        self.held_back = prometheus_client.Counter(
+            "hcx_parser_held_back_deltas", "Deltas that returned None because of a partial special string.", ["parser"])
+        self.json_decode_failures = prometheus_client.Counter(
+            "hcx_parser_json_decode_failures", "Tool-call JSON that could not be decoded.", ["parser"])
+        self.tool_calls = prometheus_client.Histogram(
+            "hcx_parser_tool_calls_per_response", "Tool calls per response.", ["parser"],
+            buckets=(0, 1, 2, 4, 8, 16))
+        self.reasoning_budget_exceeded = prometheus_client.Counter(
+            "hcx_parser_reasoning_budget_exceeded", "Responses whose reasoning reached the reasoning budget.", ["parser"])
+        self.speculative_proposed_tokens = prometheus_client.Counter(
+            "hcx_speculative_proposed_tokens", "Draft tokens proposed by the structured proposer.", ["proposer", "kind"])
+        self.speculative_accepted_tokens = prometheus_client.Counter(
+            "hcx_speculative_accepted_tokens", "Proposed draft tokens matching the generated tokens.", ["proposer", "kind"])
+
+    def observe_parse_time(self, parser, seconds):
+        self.parse_time.labels(parser).observe(seconds)
+
+    def observe_buffer_length(self, parser, length):
+        self.buffer_length.labels(parser).observe(length)
+
+    def inc_held_back(self, parser):
+        self.held_back.labels(parser).inc()
+
+    def inc_json_decode_failure(self, parser):
+        self.json_decode_failures.labels(parser).inc()
+
+    def observe_tool_calls(self, parser, num_tool_calls):
+        self.tool_calls.labels(parser).observe(num_tool_calls)
+
+    def inc_reasoning_budget_exceeded(self, parser):
+        self.reasoning_budget_exceeded.labels(parser).inc()
+
+    def observe_speculative_tokens(self, proposer, kind, num_proposed, num_accepted):
+        self.speculative_proposed_tokens.labels(proposer, kind).inc(num_proposed)
+        self.speculative_accepted_tokens.labels(proposer, kind).inc(num_accepted)
+
+
+def load_parser_metrics(name: str):
+    if not name or name.lower() in ("0", "false", "off"):
+        return None
+    if name.lower() == "prometheus":
+        return PrometheusParserMetrics()
+    module_name, _, class_name = name.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+parser_metrics = load_parser_metrics(HCX_PARSER_METRICS)
+
+
+def set_parser_metrics(sink):
+    '''
+    Installs a sink (None disables the metrics). Only parsers created afterwards are instrumented.
+    '''
+    global parser_metrics
+    parser_metrics = sink
+
+
+def inc_json_decode_failure(parser):
+    if parser_metrics is not None:
+        parser_metrics.inc_json_decode_failure(type(parser).__name__)
+
+
+def observe_tool_calls(parser, num_tool_calls: int):
+    if parser_metrics is not None:
+        parser_metrics.observe_tool_calls(type(parser).__name__, num_tool_calls)
+
+
+def inc_reasoning_budget_exceeded(parser):
+    if parser_metrics is not None:
+        parser_metrics.inc_reasoning_budget_exceeded(type(parser).__name__)
+
+
+def get_buffer_length(parser) -> int:
+    state = parser.streaming_state
+    return len(state.buffer_string) if state is not None else 0
+
+
+def instrument_parser(parser, sink):
+    '''
+    Wraps the parse methods of one parser instance to report to sink.
+    '''
+    parser_name = type(parser).__name__
+
+    def instrument_streaming(method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            previous_buffer_length = get_buffer_length(parser)
+            start = time.perf_counter()
+            delta_message = method(*args, **kwargs)
+            sink.observe_parse_time(parser_name, time.perf_counter() - start)
+
+            buffer_length = get_buffer_length(parser)
+            sink.observe_buffer_length(parser_name, buffer_length)
+            if delta_message is None and buffer_length > previous_buffer_length:
+                sink.inc_held_back(parser_name)
+            return delta_message
+
+        return wrapper
+
+    def instrument_extract_tool_calls(method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            tool_call_info = method(*args, **kwargs)
+            sink.observe_tool_calls(parser_name, len(tool_call_info.tool_calls) if tool_call_info.tools_called else 0)
+            return tool_call_info
+
+        return wrapper
+
+    for method_name in ("extract_reasoning_content_streaming", "extract_tool_calls_streaming"):
+        if hasattr(parser, method_name):
+            setattr(parser, method_name, instrument_streaming(getattr(parser, method_name)))
+    if hasattr(parser, "extract_tool_calls"):
+        setattr(parser, "extract_tool_calls", instrument_extract_tool_calls(parser.extract_tool_calls))
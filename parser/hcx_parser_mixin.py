@@ -2,43 +2,139 @@
 # Copyright (c) 2025-present NAVER Cloud Corp.
 # Apache-2.0
 
-import re
+from collections import deque
+from functools import lru_cache
+
+
+class HcxSpecialStringAutomaton:
+    '''
+    Aho-Corasick automaton over a fixed set of special strings.
+    It is immutable once built, so a single instance is shared by every parser using the same special strings.
+    '''
+    def __init__(self, special_strings):
+        self.special_strings = tuple(special_strings)
+
+        # node 0 is the root; depth[node] is the length of the prefix the node represents
+        self.goto = [{}]
+        self.fail = [0]
+        self.depth = [0]
+        # pattern indices that end exactly at the node (including ones reachable through fail links)
+        self.output = [()]
+        # pattern indices whose prefix is a suffix of the node (including ones reachable through fail links)
+        self.partial = [()]
+
+        prefix_of = [set()]
+        for idx, ss in enumerate(self.special_strings):
+            node = 0
+            for c in ss:
+                if c not in self.goto[node]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.depth.append(self.depth[node] + 1)
+                    self.output.append(())
+                    self.partial.append(())
+                    prefix_of.append(set())
+                    self.goto[node][c] = len(self.goto) - 1
+                node = self.goto[node][c]
+                prefix_of[node].add(idx)
+            self.output[node] += (idx,)
+
+        queue = deque(self.goto[0].values())
+        for node in queue:
+            self.partial[node] = tuple(sorted(prefix_of[node]))
+        while queue:
+            node = queue.popleft()
+            for c, child in self.goto[node].items():
+                state = self.fail[node]
+                while state and c not in self.goto[state]:
+                    state = self.fail[state]
+                fail = self.goto[state].get(c, 0)
+                self.fail[child] = fail if fail != child else 0
+                self.output[child] += self.output[self.fail[child]]
+                self.partial[child] = tuple(sorted(prefix_of[child] | set(self.partial[self.fail[child]])))
+                queue.append(child)
+
+    def step(self, state, c):
+        while state and c not in self.goto[state]:
+            state = self.fail[state]
+        return self.goto[state].get(c, 0)
+
+
+@lru_cache(maxsize=None)
+def get_special_string_automaton(special_strings: tuple) -> HcxSpecialStringAutomaton:
+    return HcxSpecialStringAutomaton(special_strings)
+
+
+class HcxSpecialStringMatcher:
+    '''
+    Streaming matcher over the parser buffer.
+    Only newly appended text is consumed; complete matches are recorded as (start, end, pattern index)
+    relative to the start of the buffer, and the automaton state tells whether the buffer ends with a partial special string.
+    '''
+    def __init__(self, special_strings):
+        self.automaton = get_special_string_automaton(tuple(special_strings))
+        self.reset()
+
+    def reset(self):
+        self.state = 0
+        self.position = 0
+        self.matches = []
+
+    def feed(self, text):
+        automaton = self.automaton
+        state = self.state
+        position = self.position
+        for c in text:
+            state = automaton.step(state, c)
+            position += 1
+            for idx in automaton.output[state]:
+                self.matches.append((position - len(automaton.special_strings[idx]), position, idx))
+        self.state = state
+        self.position = position
+
+    @property
+    def is_partial(self):
+        return self.state != 0
+
+    @property
+    def partial_length(self):
+        return self.automaton.depth[self.state]
+
+    @property
+    def partial_special_strings(self):
+        return [self.automaton.special_strings[idx] for idx in self.automaton.partial[self.state]]
+
 
 class HcxStreamingParserFunctionsMixin:
     def __init__(self):
         '''
         # initialize these attributes in your class properly
         self.buffer_string = ''
-        self.escaped_special_strings = []
         self.special_strings = []
+        self.special_string_matcher = HcxSpecialStringMatcher(self.special_strings)
+
+        # and update the buffer only through append_buffer_string / set_buffer_string
         '''
         pass
 
-    def remove_special_string(self):
-        positions = []
-        for ss in self.escaped_special_strings:
-            positions += [(m.start(), m.end()) for m in re.finditer(ss, self.buffer_string)]
-
-        sorted_positions = sorted(positions, key=lambda x: x[0])
-        to_stream = self.buffer_string[:sorted_positions[-1][0]]
-        remaining = self.buffer_string[sorted_positions[-1][1]:]
-        for ss in self.special_strings:
-            to_stream.replace(ss, '')
-
-        return to_stream, remaining
+    def append_buffer_string(self, text):
+        self.buffer_string += text
+        self.special_string_matcher.feed(text)
 
+    def set_buffer_string(self, text=''):
+        self.buffer_string = text
+        self.special_string_matcher.reset()
+        self.special_string_matcher.feed(text)
 
     def check_is_special_string(self):
-        for ss in self.special_strings:
-            if ss in self.buffer_string:
-                return True
-        return False
+        return bool(self.special_string_matcher.matches)
+
 
-    
     def check_is_part_of_special_string(self):
-        for ss in self.special_strings:
-            min_len = min(len(self.buffer_string), len(ss))
-            for ln in range(min_len, 0, -1):
-                if self.buffer_string[-ln:] == ss[:ln]:
-                    return True
-        return False
+        return self.special_string_matcher.is_partial
+
+
+    def split_partial_special_string(self):
+        # the buffer before the partial special string it ends with, and that partial special string
+        split_index = len(self.buffer_string) - self.special_string_matcher.partial_length
+        return self.buffer_string[:split_index], self.buffer_string[split_index:]
@@ -2,8 +2,6 @@
 # Copyright (c) 2025-present NAVER Cloud Corp.
 # Apache-2.0
 
-import re
-
 from collections.abc import Sequence
 from typing import Optional, Union
 
@@ -13,40 +11,75 @@ from vllm.entrypoints.openai.protocol import ChatCompletionRequest, DeltaMessage
 from vllm.logger import init_logger
 from vllm.reasoning import ReasoningParser
 
-from .hcx_parser_mixin import HcxStreamingParserFunctionsMixin
+from . import hcx_parser_metrics
+from .hcx_parser_constants import get_tokenizer_constants
+from .hcx_reasoning_tracker import HcxEndTokenFinder
+from .hcx_streaming_state import HCX_STREAM_ID_KEY, HcxStreamingState, get_shared_streaming_state
 
 logger = init_logger(__name__)
 
 
-class HcxReasoningParser(ReasoningParser, HcxStreamingParserFunctionsMixin):
-    def __init__(self, tokenizer: PreTrainedTokenizerBase):
+class HcxReasoningParser(ReasoningParser):
+    think_start_token = HcxStreamingState.think_start_token
+    think_end_string_base = HcxStreamingState.think_end_string_base
+    end_token = HcxStreamingState.end_token
+    function_call_role = HcxStreamingState.function_call_role
+
+    # for is_reasoning_end check
+    exact_think_end_strings = (
+        think_end_string_base + "\n",
+        think_end_string_base + function_call_role
+    )
+
+    def __init__(self, tokenizer: PreTrainedTokenizerBase, *args, **kwargs):
         super().__init__(tokenizer)
-        self.think_start_token = "/think\n"
-        self.think_end_string_base = "<|im_end|>\n<|im_start|>assistant"
 
-        # for streaming
-        self.end_token_id = self.vocab.get("<|im_end|>")
-        self.non_reasoning_mode_start_token = tokenizer.encode("\n")[0]
-        self.function_call_role = ' -> tool/function_call\n'
-        self.no_reasoning_content = False
+        # tokenizer-derived constants are computed once per tokenizer and shared read-only
+        constants = get_tokenizer_constants(tokenizer, HcxReasoningParser, self.build_tokenizer_constants)
+        self.end_token_id = constants["end_token_id"]
+        self.non_reasoning_mode_start_token = constants["non_reasoning_mode_start_token"]
+        self.think_end_tokens = constants["think_end_tokens"]
+        # first end token per token id sequence, for extract_content_ids()
+        self.end_token_finder = HcxEndTokenFinder(self.end_token_id)
+
+        # for streaming; replaced by the state shared with HcxToolParser when the request links them
+        self.streaming_state = self.build_streaming_state()
+
+        # reasoning budget (chat_template_kwargs.reasoning_budget or vllm_xargs.reasoning_budget),
+        # enforced by HcxReasoningBudgetLogitsProcessor
+        self.reasoning_budget = None
+        self.reasoning_budget_exceeded = False
 
-        # for is_reasoning_end check
-        self.exact_think_end_strings = [
-            self.think_end_string_base + "\n",
-            self.think_end_string_base + self.function_call_role
-        ]
-        self.think_end_tokens = [tokenizer.encode(think_end_string) for think_end_string in self.exact_think_end_strings]
+        # recent vLLM versions pass the request's chat_template_kwargs when creating the per-request parser
+        if kwargs.get("chat_template_kwargs"):
+            self.set_chat_template_kwargs(kwargs["chat_template_kwargs"])
 
-        # attributes for streaming parser mixin
-        self.buffer_string = ''
-        self.special_strings = [self.think_start_token, self.think_end_string_base, self.function_call_role]
-        self.escaped_special_strings = [re.escape(ss) for ss in self.special_strings]
+        if hcx_parser_metrics.parser_metrics is not None:
+            hcx_parser_metrics.instrument_parser(self, hcx_parser_metrics.parser_metrics)
+
+
+    def build_streaming_state(self, parse_tool_calls: bool = False) -> HcxStreamingState:
+        return HcxStreamingState(self.end_token_id, self.non_reasoning_mode_start_token, self.think_end_tokens,
+                                 parse_tool_calls=parse_tool_calls)
+
+
+    @classmethod
+    def build_tokenizer_constants(cls, tokenizer: PreTrainedTokenizerBase) -> dict:
+        return {
+            "end_token_id": tokenizer.get_vocab().get(cls.end_token),
+            "non_reasoning_mode_start_token": tokenizer.encode("\n")[0],
+            "think_end_tokens": tuple(tuple(tokenizer.encode(think_end_string))
+                                      for think_end_string in cls.exact_think_end_strings),
+        }
 
 
     def extract_reasoning_content(
-            self, model_output: str, request: ChatCompletionRequest
+            self, model_output: str, request: ChatCompletionRequest,
+            output_token_ids: Optional[Sequence[int]] = None,
     ) -> tuple[Optional[str], Optional[str]]:
         chat_template_kwargs = request.chat_template_kwargs or {}
+        self.reasoning_budget = self.get_reasoning_budget(request)
+        self.reasoning_budget_exceeded = False
 
         is_reasoning = False
 
@@ -75,6 +108,14 @@ class HcxReasoningParser(ReasoningParser, HcxStreamingParserFunctionsMixin):
 
         reasoning_content, _, content = model_output.partition(self.think_end_string_base)
 
+        # vLLM passes only the text here; without the token ids the reasoning is re-tokenized to count its tokens
+        if self.reasoning_budget is not None:
+            if output_token_ids is not None and self.end_token_id in output_token_ids:
+                num_reasoning_tokens = list(output_token_ids).index(self.end_token_id)
+            else:
+                num_reasoning_tokens = len(self.model_tokenizer.encode(reasoning_content, add_special_tokens=False))
+            self.check_reasoning_budget(num_reasoning_tokens)
+
         final_content = content or None
 
         return reasoning_content, final_content
@@ -88,64 +129,91 @@ class HcxReasoningParser(ReasoningParser, HcxStreamingParserFunctionsMixin):
         previous_token_ids: Sequence[int],
         current_token_ids: Sequence[int],
         delta_token_ids: Sequence[int],
+        request: Optional[ChatCompletionRequest] = None,
     ) -> Union[DeltaMessage, None]:
-        if current_token_ids and current_token_ids[0] == self.non_reasoning_mode_start_token:
-            self.no_reasoning_content = True
-            
-        if len(current_text) == 0:
+        if request is not None and not previous_token_ids:
+            self.set_request(request)
+
+        state = self.streaming_state
+        reasoning_ended = state.reasoning_ended
+        delta = state.feed(current_text, delta_text, current_token_ids, delta_token_ids)
+
+        # the delta that ends the reasoning reports the budget in an extra field of the chunk
+        extra_fields = {}
+        if (not reasoning_ended and state.reasoning_ended and self.reasoning_budget is not None
+                and state.reasoning_end_tracker.reasoning_num_tokens is not None):
+            self.check_reasoning_budget(state.reasoning_end_tracker.reasoning_num_tokens)
+            extra_fields["reasoning_budget_exceeded"] = self.reasoning_budget_exceeded
+
+        # the tool-call region is content unless the tool parser of the request reads it from the shared state
+        content = delta.content if state.parse_tool_calls else delta.content + delta.tool_call_text
+        state.handover_content = content
+        if state.parse_tool_calls:
+            # the ids vLLM hands over with that content if the reasoning ends here: the ids after the end token,
+            # or the whole delta when only the prompt ends the reasoning
+            state.handover_token_ids = (self.extract_content_ids(delta_token_ids)
+                                        if self.is_reasoning_end(delta_token_ids) else list(delta_token_ids))
+
+        if not delta.reasoning_content and not content and not extra_fields:
             return None
+        return DeltaMessage(reasoning_content=delta.reasoning_content or None, content=content or None,
+                            **extra_fields)
 
-        if self.no_reasoning_content:
-            return DeltaMessage(content=delta_text)
-
-        self.buffer_string += delta_text
-        buffered_content = ''
-
-        if self.check_is_special_string():
-            if current_text.startswith(self.function_call_role):
-                self.no_reasoning_content = True
-                delta_text = self.buffer_string
-                self.buffer_string = ''
-                return DeltaMessage(content=delta_text)
-
-            buffered_content, delta_text = self.remove_special_string()
-            self.buffer_string = delta_text
-            
-            if buffered_content:
-                # if buffered_content is not empty, the special string must be '<|im_end|>\n<|im_start|>assistant'
-                # which serves as the separator between reasoning content and other content
-                if self.check_is_part_of_special_string():
-                    return DeltaMessage(reasoning_content=buffered_content)
-                else:
-                    self.buffer_string = ''
-                    return DeltaMessage(reasoning_content=buffered_content, content=delta_text)
-
-        if self.check_is_part_of_special_string():
-            return None
-        else:
-            delta_text = self.buffer_string
-            self.buffer_string = ''
 
-        if self.think_end_string_base in current_text:
-            return DeltaMessage(content=delta_text)
-        else:
-            return DeltaMessage(reasoning_content=delta_text)
+    def set_request(self, request: ChatCompletionRequest):
+        '''
+        Takes the reasoning mode and budget of the request before streaming starts.
+        '''
+        self.set_chat_template_kwargs(request.chat_template_kwargs or {})
+        self.reasoning_budget = self.get_reasoning_budget(request)
+
+
+    def set_chat_template_kwargs(self, chat_template_kwargs: dict):
+        stream_id = chat_template_kwargs.get(HCX_STREAM_ID_KEY)
+        if stream_id is not None:
+            # HcxToolParser.adjust_request linked the parsers of this request
+            self.streaming_state = get_shared_streaming_state(
+                stream_id, lambda: self.build_streaming_state(parse_tool_calls=True))
+        if self.streaming_state.num_deltas == 0:
+            self.streaming_state.set_reasoning_mode(chat_template_kwargs)
+        reasoning_budget = chat_template_kwargs.get('reasoning_budget')
+        if reasoning_budget is not None:
+            self.reasoning_budget = int(reasoning_budget)
+
+
+    @staticmethod
+    def get_reasoning_budget(request: ChatCompletionRequest) -> Optional[int]:
+        reasoning_budget = (request.chat_template_kwargs or {}).get('reasoning_budget')
+        if reasoning_budget is None:
+            reasoning_budget = (getattr(request, 'vllm_xargs', None) or {}).get('reasoning_budget')
+        return int(reasoning_budget) if reasoning_budget is not None else None
+
+
+    def check_reasoning_budget(self, num_reasoning_tokens: int):
+        if num_reasoning_tokens >= self.reasoning_budget:
+            self.reasoning_budget_exceeded = True
+            hcx_parser_metrics.inc_reasoning_budget_exceeded(self)
+            logger.info("Reasoning budget of %d tokens was reached (%d reasoning tokens).",
+                        self.reasoning_budget, num_reasoning_tokens)
 
 
     def is_reasoning_end(self, input_ids: list[int]) -> bool:
-        if len(input_ids) > 1:
-            for think_end_tokens in self.think_end_tokens:
-                think_end_len = len(think_end_tokens)
-                if len(input_ids) >= think_end_len and input_ids[-think_end_len:] == think_end_tokens:
-                    return True
+        state = self.streaming_state
+        # the state only describes the output of this request, so it answers for the delta it has just classified
+        # (where the boundary may span deltas); other ids, like the prompt ids, are checked on their own
+        if state.is_last_delta(input_ids) and (state.reasoning_mode == "skip" or state.no_reasoning_content
+                                               or state.reasoning_end_tracker.reasoning_ended):
+            return True
 
-            return False
+        if len(input_ids) > 1:
+            return state.reasoning_end_tracker.ends_with_think_end(input_ids)
 
-        return self.no_reasoning_content or self.end_token_id in input_ids
+        return self.end_token_id in input_ids
 
 
     def extract_content_ids(self, input_ids: list[int]) -> list[int]:
-        if self.end_token_id not in input_ids[:-1]:
+        # no per-request state: V1 structured output shares one reasoner across requests
+        end_token_index = self.end_token_finder.find(input_ids)
+        if end_token_index is None:
             return []
-        else:
-            return input_ids[input_ids.index(self.end_token_id) + 1:]
+        return input_ids[end_token_index + 1:]
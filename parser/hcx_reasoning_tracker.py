@@ -0,0 +1,94 @@
+# HyperCLOVAX vLLM Plugin
+# Copyright (c) 2025-present NAVER Cloud Corp.
+# Apache-2.0
+
+import weakref
+from collections.abc import Sequence
+from typing import Optional
+
+
+class HcxReasoningEndTracker:
+    '''
+    Per-request tracker of the reasoning boundary on token ids.
+    - observe(): consumes only the delta token ids of a stream and remembers where the think-end sequence completed
+    - is_think_end_prefix(): whether the observed ids may still complete a think-end sequence
+    '''
+    def __init__(self, end_token_id: int, think_end_tokens: Sequence[Sequence[int]]):
+        self.end_token_id = end_token_id
+        self.think_end_tokens = tuple(tuple(tokens) for tokens in think_end_tokens)
+        self.window = max((len(tokens) for tokens in self.think_end_tokens), default=0)
+        self.reset()
+
+    def reset(self):
+        # state fed by observe()
+        self.num_tokens = 0
+        self.tail = []
+        self.think_end_index = None
+        # number of tokens generated before the first end token (the reasoning length)
+        self.reasoning_num_tokens = None
+
+    @property
+    def reasoning_ended(self):
+        return self.think_end_index is not None
+
+    def observe(self, delta_token_ids: Sequence[int]):
+        for token_id in delta_token_ids:
+            if token_id == self.end_token_id and self.reasoning_num_tokens is None:
+                self.reasoning_num_tokens = self.num_tokens
+            self.num_tokens += 1
+            self.tail.append(token_id)
+            if len(self.tail) > self.window:
+                del self.tail[0]
+            if self.think_end_index is None and self.ends_with_think_end(self.tail):
+                self.think_end_index = self.num_tokens
+
+    def ends_with_think_end(self, token_ids: Sequence[int]) -> bool:
+        if not token_ids:
+            return False
+        for tokens in self.think_end_tokens:
+            if (token_ids[-1] == tokens[-1] and len(token_ids) >= len(tokens)
+                    and tuple(token_ids[-len(tokens):]) == tokens):
+                return True
+        return False
+
+    def is_think_end_prefix(self) -> bool:
+        # whether the observed ids end with a (non-empty) prefix of any think-end sequence
+        for tokens in self.think_end_tokens:
+            for ln in range(min(len(self.tail), len(tokens)), 0, -1):
+                if tuple(self.tail[-ln:]) == tokens[:ln]:
+                    return True
+        return False
+
+
+class HcxEndTokenFinder:
+    '''
+    Index of the first end token in growing token id sequences, safe to share across requests.
+    A sequence is keyed by its identity (vLLM V1 keeps one all_token_ids object per request, appended to in place),
+    so only the ids appended since the last call are scanned, and none once the end token was found.
+    Sequences that cannot be weakly referenced (lists, tuples) are scanned on every call.
+    '''
+    def __init__(self, end_token_id: int):
+        self.end_token_id = end_token_id
+        # id(sequence) -> [weak reference, number of scanned ids, end token index or None]
+        self.entries = {}
+
+    def find(self, token_ids: Sequence[int]) -> Optional[int]:
+        key = id(token_ids)
+        entry = self.entries.get(key)
+        # a shorter sequence than scanned was truncated, so its cached boundary no longer holds
+        if entry is None or entry[0]() is not token_ids or len(token_ids) < entry[1]:
+            try:
+                ref = weakref.ref(token_ids, lambda _, key=key, entries=self.entries: entries.pop(key, None))
+            except TypeError:
+                return self.scan(token_ids, 0)
+            entry = self.entries[key] = [ref, 0, None]
+        if entry[2] is None:
+            entry[2] = self.scan(token_ids, entry[1])
+            entry[1] = len(token_ids)
+        return entry[2]
+
+    def scan(self, token_ids: Sequence[int], start: int) -> Optional[int]:
+        try:
+            return token_ids.index(self.end_token_id, start)
+        except ValueError:
+            return None
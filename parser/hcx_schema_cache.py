@@ -0,0 +1,52 @@
+# HyperCLOVAX vLLM Plugin
+# Copyright (c) 2025-present NAVER Cloud Corp.
+# Apache-2.0
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+
+def schema_hash(schema) -> str:
+    return hashlib.sha256(json.dumps(schema, sort_keys=True).encode()).hexdigest()
+
+
+class CompiledSchemaCache:
+    '''
+    Bounded LRU of objects compiled from JSON schemas (validators, grammars) keyed by the hash of the schema.
+    Meant to be shared across requests, since the same tool sets repeat.
+    '''
+    def __init__(self, compile, maxsize: int = 1024):
+        self.compile = compile
+        self.maxsize = maxsize
+        self.compiled = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, schema):
+        key = schema_hash(schema)
+        with self.lock:
+            compiled = self.compiled.get(key)
+            if compiled is not None:
+                self.hits += 1
+                self.compiled.move_to_end(key)
+                return compiled
+            self.misses += 1
+
+        compiled = self.compile(schema)
+        with self.lock:
+            self.compiled[key] = compiled
+            if len(self.compiled) > self.maxsize:
+                self.compiled.popitem(last=False)
+        return compiled
+
+    def info(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.compiled), "maxsize": self.maxsize}
+
+    def clear(self):
+        with self.lock:
+            self.compiled.clear()
+            self.hits = 0
+            self.misses = 0
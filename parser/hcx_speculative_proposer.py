@@ -0,0 +1,328 @@
+# HyperCLOVAX vLLM Plugin
+# Copyright (c) 2025-present NAVER Cloud Corp.
+# Apache-2.0
+"""
+Model-free draft proposer for the predictable parts of HCX outputs.
+
+HcxStructuredProposer follows the generated token ids of one request and proposes draft tokens only where the
+HCX template or the request's tools leave (almost) no choice:
+- the rest of the think-end sequence once '<|im_end|>' starts it, up to where the answer and the tool-call branch
+  differ (through the final '\\n' when the request has no tools)
+- the rest of ' -> tool/function_call\\n' at the start of a non-reasoning output
+- in the tool-call region, the JSON skeleton of the calls as formatted by json.dumps: '[{"name": "', the tool name
+  once its prefix matches a single tool of the request, '", "arguments": {"', the argument keys of the tool's
+  parameters, and '<|im_end|>' once the array closes
+
+Drafts are verified by the target model as usual, so a wrong proposal only costs the rejected draft tokens.
+The proposer is a library piece: vLLM builds its speculative proposers (n-gram, EAGLE, ...) inside the model
+runner and has no plugin hook for another one, so nothing in vLLM or in this plugin calls it. A custom model
+runner has to call propose() itself; benchmark_speculative_proposer.py replays it offline.
+Each proposal is checked against the tokens generated next, and the proposed/accepted counts are kept per
+proposer and reported to the parser metrics sink (hcx_parser_metrics) when one is installed.
+"""
+import copy
+from collections.abc import Sequence
+
+from . import hcx_parser_metrics
+from .hcx_logits_processors import FUNCTION_CALL_ROLE, HcxOutputTextTracker, get_tool_functions
+from .hcx_parser_constants import get_tokenizer_constants
+from .hcx_reasoner import HcxReasoningParser
+
+# the tool-call members in the order HCX generates them
+TOOL_CALL_KEYS = ("name", "arguments")
+# longest text proposed in one step, in characters
+MAX_PROPOSAL_CHARS = 256
+
+
+def common_prefix(sequences):
+    if not sequences:
+        return sequences
+    prefix = sequences[0]
+    for sequence in sequences[1:]:
+        length = 0
+        for a, b in zip(prefix, sequence):
+            if a != b:
+                break
+            length += 1
+        prefix = prefix[:length]
+    return prefix
+
+
+class HcxToolCallSkeleton:
+    '''
+    JSON state of the tool-call region, fed with the generated text, and the text that must follow it.
+    Only the skeleton is followed: the nesting frames, the keys of the call objects and their arguments,
+    and the name of the current tool. Argument values are skipped.
+    '''
+    def __init__(self, tools: dict[str, dict]):
+        # tool name -> parameters schema
+        self.tools = tools
+        # frames of the open arrays/objects: {"array": bool, "expecting": str, "key": str, "used_keys": list}
+        self.stack = []
+        self.started = False
+        self.closed = False
+        self.invalid = False
+        self.tool_name = None
+
+        self.in_string = False
+        self.escaped = False
+        # role of the open string ('key', 'name' or None) and its text for the key and name strings
+        self.string_role = None
+        self.string_text = ''
+        self.last_char = ''
+
+    def feed(self, text: str):
+        for c in text:
+            if self.closed or self.invalid:
+                return
+            if self.in_string:
+                self.feed_string_char(c)
+            elif not c.isspace():
+                self.feed_char(c)
+            self.last_char = c
+
+    def feed_string_char(self, c: str):
+        if self.escaped:
+            self.escaped = False
+        elif c == '\\':
+            self.escaped = True
+        elif c == '"':
+            self.in_string = False
+            frame = self.stack[-1]
+            if self.string_role == 'key':
+                frame["key"] = self.string_text
+                frame["used_keys"].append(self.string_text)
+                frame["expecting"] = 'colon'
+                return
+            if self.string_role == 'name':
+                self.tool_name = self.string_text
+            frame["expecting"] = 'next'
+            return
+        if self.string_role is not None:
+            self.string_text += c
+
+    def feed_char(self, c: str):
+        if not self.stack:
+            if self.started or c != '[':
+                # not a JSON array of calls
+                self.invalid = True
+                return
+            self.started = True
+
+        frame = self.stack[-1] if self.stack else None
+        if c == '"':
+            self.in_string = True
+            self.string_text = ''
+            self.string_role = None
+            if not frame["array"] and frame["expecting"] == 'key':
+                self.string_role = 'key'
+            elif len(self.stack) == 2 and frame["expecting"] == 'value' and frame["key"] == "name":
+                self.string_role = 'name'
+        elif c in '[{':
+            if frame is not None:
+                frame["expecting"] = 'next'
+            if len(self.stack) == 1:
+                # a new call
+                self.tool_name = None
+            self.stack.append({"array": c == '[', "expecting": 'value' if c == '[' else 'key',
+                               "key": None, "used_keys": []})
+        elif c in ']}':
+            self.stack.pop()
+            if not self.stack:
+                self.closed = True
+        elif c == ':':
+            frame["expecting"] = 'value'
+        elif c == ',':
+            frame["expecting"] = 'value' if frame["array"] else 'key'
+        else:
+            # scalar value, which ends with the next ',' or closing bracket
+            frame["expecting"] = 'scalar'
+
+    def get_keys(self):
+        '''
+        Returns (keys still to come in order, required keys still to come) of the innermost object, or None when
+        the object is not part of the skeleton.
+        '''
+        frame = self.stack[-1]
+        if len(self.stack) == 2:
+            keys = [key for key in TOOL_CALL_KEYS if key not in frame["used_keys"]][:1]
+            return keys, keys
+        if len(self.stack) == 3 and self.stack[1]["key"] == "arguments" and self.tool_name in self.tools:
+            parameters = self.tools[self.tool_name] or {}
+            properties = parameters.get("properties") or {}
+            keys = [key for key in properties if key not in frame["used_keys"]]
+            return keys, [key for key in parameters.get("required") or [] if key in keys]
+        return None
+
+    def complete(self, candidates) -> str:
+        # only a unique completion: a common prefix of several names would rarely be tokenized like the name itself
+        matches = [candidate for candidate in candidates if candidate.startswith(self.string_text)]
+        return matches[0][len(self.string_text):] + '"' if len(matches) == 1 else ''
+
+    def next_text(self) -> str:
+        '''
+        The text that must follow the current state, possibly empty.
+        '''
+        if self.invalid or self.closed:
+            return ''
+        if not self.stack:
+            return '' if self.started else '['
+
+        frame = self.stack[-1]
+        space = ' ' if self.last_char == ',' else ''
+        if self.in_string:
+            if self.string_role == 'name':
+                return self.complete(self.tools)
+            if self.string_role == 'key':
+                keys = self.get_keys()
+                return self.complete(keys[0]) if keys is not None else ''
+            return ''
+
+        if frame["array"]:
+            # the elements of the outer array are call objects
+            return space + '{' if len(self.stack) == 1 and frame["expecting"] == 'value' else ''
+
+        keys = self.get_keys()
+        if keys is None:
+            return ''
+        keys, required_keys = keys
+        expecting = frame["expecting"]
+        if expecting == 'key':
+            if required_keys or (keys and self.last_char == ','):
+                return space + '"'
+            return '}' if not keys and self.last_char == '{' else ''
+        if expecting == 'colon':
+            return ': '
+        if expecting == 'value' and len(self.stack) == 2:
+            return '"' if frame["key"] == "name" else '{'
+        if expecting == 'next':
+            if required_keys:
+                return ', '
+            return '}' if not keys else ''
+        return ''
+
+    def predict(self, max_chars: int = MAX_PROPOSAL_CHARS) -> str:
+        '''
+        The longest text that must follow the current state, chaining next_text() on a copy of the state.
+        '''
+        text = self.next_text()
+        if not text:
+            return ''
+        state = copy.deepcopy(self)
+        predicted = ''
+        while len(predicted) < max_chars:
+            state.feed(text)
+            predicted += text
+            text = state.next_text()
+            if not text:
+                break
+        return predicted
+
+
+class HcxStructuredProposer:
+    '''
+    Per-request draft proposer. Call propose() with the generated token ids before each decode step;
+    it returns up to num_speculative_tokens draft token ids (possibly none).
+    '''
+    def __init__(self, tokenizer, tools=None, metrics_label: str = "HcxStructuredProposer"):
+        constants = get_tokenizer_constants(tokenizer, HcxReasoningParser, HcxReasoningParser.build_tokenizer_constants)
+        self.tokenizer = tokenizer
+        self.end_token_id = constants["end_token_id"]
+        self.tools = {name: parameters for name, parameters in get_tool_functions(tools)}
+
+        # without tools the answer always follows the reasoning
+        think_end_tokens = constants["think_end_tokens"]
+        self.think_end_tokens = think_end_tokens if self.tools else think_end_tokens[:1]
+        self.encoded = {}
+        self.function_call_role_tokens = self.encode(FUNCTION_CALL_ROLE) if self.tools else ()
+
+        self.text_tracker = HcxOutputTextTracker(tokenizer, FUNCTION_CALL_ROLE)
+        self.skeleton = HcxToolCallSkeleton(self.tools)
+        self.finished = False
+
+        # acceptance of the proposals
+        self.metrics_label = metrics_label
+        self.last_proposal = ()
+        self.last_proposal_kind = None
+        self.num_proposals = 0
+        self.num_proposed_tokens = 0
+        self.num_accepted_tokens = 0
+
+    @property
+    def acceptance_rate(self) -> float:
+        return self.num_accepted_tokens / self.num_proposed_tokens if self.num_proposed_tokens else 0.0
+
+    def encode(self, text: str) -> tuple[int, ...]:
+        token_ids = self.encoded.get(text)
+        if token_ids is None:
+            token_ids = self.encoded[text] = tuple(self.tokenizer.encode(text, add_special_tokens=False))
+        return token_ids
+
+    def record_acceptance(self, new_token_ids: Sequence[int]):
+        num_accepted = 0
+        for proposed, generated in zip(self.last_proposal, new_token_ids):
+            if proposed != generated:
+                break
+            num_accepted += 1
+        self.num_accepted_tokens += num_accepted
+        if hcx_parser_metrics.parser_metrics is not None:
+            hcx_parser_metrics.parser_metrics.observe_speculative_tokens(
+                self.metrics_label, self.last_proposal_kind, len(self.last_proposal), num_accepted)
+
+    def propose(self, output_token_ids: Sequence[int], num_speculative_tokens: int) -> list[int]:
+        new_token_ids = self.text_tracker.new_token_ids(output_token_ids)
+        if self.last_proposal:
+            self.record_acceptance(new_token_ids)
+        self.last_proposal = ()
+
+        for token_id in new_token_ids:
+            if self.finished:
+                break
+            if not self.text_tracker.marker_seen:
+                remaining_text = self.text_tracker.feed(token_id)
+                if remaining_text is not None and not self.tools:
+                    self.finished = True
+                elif remaining_text:
+                    self.skeleton.feed(remaining_text)
+            elif token_id == self.end_token_id:
+                self.finished = True
+            else:
+                self.skeleton.feed(self.text_tracker.decode(token_id))
+
+        if self.finished or num_speculative_tokens <= 0:
+            return []
+        if self.text_tracker.marker_seen:
+            kind = "tool_call"
+            if self.skeleton.closed:
+                proposal = (self.end_token_id, )
+            else:
+                text = self.skeleton.predict()
+                proposal = self.encode(text) if text else ()
+        else:
+            kind = "template"
+            proposal = self.propose_template(output_token_ids)
+
+        proposal = tuple(proposal[:num_speculative_tokens])
+        if proposal:
+            self.last_proposal = proposal
+            self.last_proposal_kind = kind
+            self.num_proposals += 1
+            self.num_proposed_tokens += len(proposal)
+        return list(proposal)
+
+    def propose_template(self, output_token_ids: Sequence[int]) -> tuple[int, ...]:
+        remainders = []
+        # a started think-end sequence; all of them begin with the end token, so a partial match is anchored
+        for tokens in self.think_end_tokens:
+            for length in range(min(len(output_token_ids), len(tokens) - 1), 0, -1):
+                if tuple(output_token_ids[-length:]) == tokens[:length]:
+                    remainders.append(tokens[length:])
+                    break
+        # the function-call role at the start of a non-reasoning output
+        num_tokens = len(output_token_ids)
+        if 0 < num_tokens < len(self.function_call_role_tokens) \
+                and tuple(output_token_ids) == self.function_call_role_tokens[:num_tokens]:
+            remainders.append(self.function_call_role_tokens[num_tokens:])
+        if not remainders:
+            return ()
+        return common_prefix(remainders)
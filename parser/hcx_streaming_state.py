@@ -0,0 +1,241 @@
+# HyperCLOVAX vLLM Plugin
+# Copyright (c) 2025-present NAVER Cloud Corp.
+# Apache-2.0
+
+import uuid
+import weakref
+from collections.abc import Sequence
+
+from .hcx_parser_mixin import HcxSpecialStringMatcher, HcxStreamingParserFunctionsMixin
+from .hcx_reasoning_tracker import HcxReasoningEndTracker
+from .hcx_tool_call_scanner import HcxToolCallScanner
+
+# chat_template_kwargs key linking the reasoning parser and the tool parser of one request
+HCX_STREAM_ID_KEY = "hcx_stream_id"
+
+# stream id -> HcxStreamingState; a state lives as long as one of the parsers of its request
+_streaming_states = weakref.WeakValueDictionary()
+
+
+def new_stream_id() -> str:
+    return uuid.uuid4().hex
+
+
+def get_shared_streaming_state(stream_id: str, build):
+    '''
+    Returns the state of the stream, created with build() by the first parser asking for it.
+    '''
+    state = _streaming_states.get(stream_id)
+    if state is None:
+        state = build()
+        _streaming_states[stream_id] = state
+    return state
+
+
+class HcxStreamingDelta:
+    '''
+    Classification of one delta: reasoning, content, and the text and scanner events of the tool-call region.
+    '''
+    def __init__(self):
+        self.reasoning_content = ''
+        self.content = ''
+        self.tool_call_text = ''
+        self.tool_call_events = []
+
+    def merge(self, other: "HcxStreamingDelta"):
+        self.reasoning_content += other.reasoning_content
+        self.content += other.content
+        self.tool_call_text += other.tool_call_text
+        self.tool_call_events += other.tool_call_events
+
+
+class HcxStreamingState(HcxStreamingParserFunctionsMixin):
+    '''
+    Single-pass streaming state machine of one HCX response.
+    Each delta is read once and split into reasoning, content and the tool-call region after ' -> tool/function_call\\n';
+    the tool-call region is scanned for tool calls only when parse_tool_calls is set.
+    HcxReasoningParser and HcxToolParser both delegate to it, and share one state per request when linked by HCX_STREAM_ID_KEY.
+    '''
+    think_start_token = "/think\n"
+    think_end_string_base = "<|im_end|>\n<|im_start|>assistant"
+    end_token = "<|im_end|>"
+    function_call_role = " -> tool/function_call\n"
+
+    # attributes for streaming parser mixin
+    special_strings = (think_start_token, think_end_string_base, function_call_role)
+    # special strings watched while reasoning is forced: only the boundary (and the optional leading /think)
+    forced_reasoning_special_strings = (think_start_token, think_end_string_base)
+
+    def __init__(self, end_token_id: int, non_reasoning_mode_start_token: int,
+                 think_end_tokens: Sequence[Sequence[int]], parse_tool_calls: bool = False):
+        self.end_token_id = end_token_id
+        self.non_reasoning_mode_start_token = non_reasoning_mode_start_token
+        self.reasoning_end_tracker = HcxReasoningEndTracker(end_token_id, think_end_tokens)
+
+        # reasoning mode of the request: None (decided from the output), "skip" or "force"
+        self.reasoning_mode = None
+        self.no_reasoning_content = False
+        self.reasoning_ended = False
+        self.in_tool_call = False
+
+        self.parse_tool_calls = parse_tool_calls
+        self.tool_call_scanner = HcxToolCallScanner(self.function_call_role) if parse_tool_calls else None
+
+        # for sharing: the last classified delta, its token ids, and the content and token ids handed to vLLM with it
+        # by the reasoning parser
+        self.num_deltas = 0
+        self.last_delta = None
+        self.last_delta_token_ids = ()
+        self.handover_content = ''
+        self.handover_token_ids = []
+
+        # attributes for streaming parser mixin
+        self.buffer_string = ''
+        self.special_string_matcher = HcxSpecialStringMatcher(self.special_strings)
+
+    def set_reasoning_mode(self, chat_template_kwargs: dict):
+        # if both are True, prioritize force_reasoning
+        if chat_template_kwargs.get('force_reasoning', False):
+            self.reasoning_mode = "force"
+            self.special_string_matcher = HcxSpecialStringMatcher(self.forced_reasoning_special_strings)
+        elif chat_template_kwargs.get('skip_reasoning', False):
+            self.reasoning_mode = "skip"
+            self.no_reasoning_content = True
+        else:
+            self.reasoning_mode = None
+            self.special_string_matcher = HcxSpecialStringMatcher(self.special_strings)
+        self.set_buffer_string(self.buffer_string)
+
+    def is_last_delta(self, token_ids: Sequence[int]) -> bool:
+        last = self.last_delta_token_ids
+        return bool(token_ids) and len(token_ids) == len(last) and list(token_ids) == list(last)
+
+    def feed(self, current_text: str, delta_text: str,
+             current_token_ids: Sequence[int], delta_token_ids: Sequence[int]) -> HcxStreamingDelta:
+        self.num_deltas += 1
+        delta = self.last_delta = HcxStreamingDelta()
+        self.last_delta_token_ids = delta_token_ids
+
+        if self.in_tool_call:
+            self.add_tool_call_text(delta, delta_text)
+            return delta
+
+        if self.reasoning_mode == "skip" and not self.parse_tool_calls:
+            # nothing to separate: pass the deltas through without buffering
+            delta.content = delta_text
+            return delta
+
+        if (self.reasoning_mode is None and self.num_deltas == 1 and current_token_ids
+                and current_token_ids[0] == self.non_reasoning_mode_start_token):
+            self.no_reasoning_content = True
+        if self.reasoning_mode != "skip":
+            self.reasoning_end_tracker.observe(delta_token_ids)
+
+        if len(current_text) == 0:
+            return delta
+
+        if self.no_reasoning_content:
+            self.add_content(delta, delta_text)
+            return delta
+
+        self.append_buffer_string(delta_text)
+
+        if self.check_is_special_string() and current_text.startswith(self.function_call_role):
+            self.no_reasoning_content = True
+            text = self.buffer_string
+            self.set_buffer_string()
+            self.add_content(delta, text)
+            return delta
+
+        while self.check_is_special_string():
+            text = self.buffer_string
+            position = 0
+            for start, end, idx in sorted(self.special_string_matcher.matches):
+                if start < position:
+                    continue
+                self.add_text(delta, text[position:start])
+                position = end
+
+                special_string = self.special_string_matcher.automaton.special_strings[idx]
+                if special_string == self.think_end_string_base:
+                    self.reasoning_ended = True
+                elif special_string == self.function_call_role and self.reasoning_ended:
+                    self.set_buffer_string()
+                    self.start_tool_call(delta, text[end:])
+                    return delta
+
+            if (self.reasoning_ended and self.reasoning_mode == "force"
+                    and self.special_string_matcher.automaton.special_strings != self.special_strings):
+                # the content after the boundary is parsed like in the other modes
+                self.special_string_matcher = HcxSpecialStringMatcher(self.special_strings)
+            self.set_buffer_string(text[position:])
+
+        if self.is_holding_special_string():
+            # only the partial special string is held back
+            text, held_back = self.split_partial_special_string()
+            self.set_buffer_string(held_back)
+            self.add_text(delta, text)
+            return delta
+
+        text = self.buffer_string
+        self.set_buffer_string()
+        self.add_text(delta, text)
+        return delta
+
+    def add_text(self, delta: HcxStreamingDelta, text: str):
+        if self.reasoning_ended:
+            delta.content += text
+        else:
+            delta.reasoning_content += text
+
+    def add_content(self, delta: HcxStreamingDelta, text: str):
+        # content of a response without reasoning, passed through as is unless tool calls are parsed
+        if not self.parse_tool_calls:
+            delta.content += text
+            return
+
+        self.append_buffer_string(text)
+        index = self.buffer_string.find(self.function_call_role)
+        if index >= 0:
+            delta.content += self.buffer_string[:index]
+            remaining = self.buffer_string[index + len(self.function_call_role):]
+            self.set_buffer_string()
+            self.start_tool_call(delta, remaining)
+            return
+
+        if (self.check_is_part_of_special_string()
+                and self.function_call_role in self.special_string_matcher.partial_special_strings):
+            text, held_back = self.split_partial_special_string()
+            self.set_buffer_string(held_back)
+            delta.content += text
+            return
+        delta.content += self.buffer_string
+        self.set_buffer_string()
+
+    def start_tool_call(self, delta: HcxStreamingDelta, text: str):
+        self.in_tool_call = True
+        if self.tool_call_scanner is not None:
+            self.tool_call_scanner.feed(self.function_call_role)
+        self.add_tool_call_text(delta, text)
+
+    def add_tool_call_text(self, delta: HcxStreamingDelta, text: str):
+        if not text:
+            return
+        delta.tool_call_text += text
+        if self.tool_call_scanner is not None:
+            delta.tool_call_events += self.tool_call_scanner.feed(text)
+
+    def is_holding_special_string(self) -> bool:
+        if not self.check_is_part_of_special_string():
+            return False
+
+        # a held-back part of think_end_string_base can only complete the boundary when the generated ids end with
+        # a prefix of a think-end sequence. For a delta without ids the text decides: <|im_end|> is a single token,
+        # so a strict prefix of its text can never complete it
+        if (self.end_token_id is not None
+                and self.special_string_matcher.partial_special_strings == [self.think_end_string_base]):
+            if self.last_delta_token_ids:
+                return self.reasoning_end_tracker.is_think_end_prefix()
+            return self.special_string_matcher.partial_length >= len(self.end_token)
+
+        return True
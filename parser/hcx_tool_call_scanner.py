@@ -0,0 +1,273 @@
+# HyperCLOVAX vLLM Plugin
+# Copyright (c) 2025-present NAVER Cloud Corp.
+# Apache-2.0
+
+import json
+import re
+
+# outside of JSON strings only these characters change the scanner state
+STRUCTURAL_CHAR_REGEX = re.compile(r'[{}\[\]",:]')
+# inside of JSON strings only the closing quote and escapes matter
+STRING_SPECIAL_CHAR_REGEX = re.compile(r'["\\]')
+
+
+# characters json.dumps(ensure_ascii=False) escapes in strings
+STRING_ESCAPED_CHAR_REGEX = re.compile(r'["\\\x00-\x1f]')
+
+
+def encode_string_segment(segment: str) -> str:
+    # the segment as json.dumps(ensure_ascii=False) writes it inside a string
+    if STRING_ESCAPED_CHAR_REGEX.search(segment) is None:
+        return segment
+    return json.dumps(segment, ensure_ascii=False)[1:-1]
+
+
+def is_surrogate(c: str, low: bool) -> bool:
+    return len(c) == 1 and (0xDC00 if low else 0xD800) <= ord(c) < (0xE000 if low else 0xDC00)
+
+
+class HcxToolCallScanner:
+    '''
+    Incremental scanner of the tool-call region of a streamed response.
+    The tool-call start token is detected on the new text only, and the region after it is scanned once,
+    keeping the string/escape state and the nesting depth across deltas.
+
+    feed() returns the events of the delta in order:
+    - ('name', name): the "name" value of the current tool call is closed
+    - ('arguments', fragment): next fragment of the "arguments" value, formatted like json.dumps(ensure_ascii=False):
+      escapes are decoded and re-encoded, and literals (numbers, true, false, null) are re-serialized once complete
+    - ('object', text): a top-level JSON object (one tool call) is closed
+    - ('end', ''): the top-level JSON value (the array of tool calls, or a single call) is closed
+    '''
+    def __init__(self, tool_call_start_token: str):
+        self.tool_call_start_token = tool_call_start_token
+        self.in_tool_call_region = False
+        # end of the text before the region, which may hold the beginning of the tool-call start token
+        self.carry = ''
+
+        self.depth = 0
+        # inside the top-level array of tool calls
+        self.in_array = False
+        self.in_string = False
+        # text of the escape sequence after the backslash while it is incomplete, otherwise None
+        self.escape = None
+        # a decoded high surrogate waiting for the low surrogate of its pair
+        self.high_surrogate = ''
+        # bare literal of the arguments, emitted when it ends
+        self.literal = ''
+        self.object_chunks = []
+
+        # state of the members of the current top-level object
+        self.expecting = None  # 'key', 'colon', 'value' or 'next'
+        self.key = None
+        self.capture = None
+        self.capture_target = None
+        self.in_arguments = False
+
+        self.events = []
+        self.argument_fragments = []
+
+    def feed(self, delta_text: str) -> list[tuple[str, str]]:
+        if not self.in_tool_call_region:
+            text = self.carry + delta_text
+            start_index = text.find(self.tool_call_start_token)
+            if start_index < 0:
+                self.carry = text[max(len(text) - len(self.tool_call_start_token) + 1, 0):]
+                return []
+
+            self.in_tool_call_region = True
+            self.carry = ''
+            delta_text = text[start_index + len(self.tool_call_start_token):]
+
+        return self.scan(delta_text)
+
+    def add_event(self, kind: str, value: str):
+        self.flush_arguments()
+        self.events.append((kind, value))
+
+    def emit_arguments(self, fragment: str):
+        if fragment:
+            self.argument_fragments.append(fragment)
+
+    def flush_arguments(self):
+        if self.argument_fragments:
+            self.events.append(('arguments', ''.join(self.argument_fragments)))
+            self.argument_fragments = []
+
+    def start_value(self):
+        self.expecting = 'next'
+        if self.key == 'arguments':
+            self.in_arguments = True
+
+    def close_capture(self):
+        raw = ''.join(self.capture)
+        try:
+            value = json.loads('"' + raw + '"')
+        except json.JSONDecodeError:
+            value = raw
+
+        if self.capture_target == 'key':
+            self.key = value
+            self.expecting = 'colon'
+        else:
+            self.add_event('name', value)
+        self.capture = None
+        self.capture_target = None
+
+    def scan(self, text: str) -> list[tuple[str, str]]:
+        object_start = 0
+        pos = 0
+        while pos < len(text):
+            if self.in_string:
+                if self.escape is not None:
+                    # escape sequences may be split across deltas
+                    self.escape += text[pos]
+                    pos += 1
+                    if len(self.escape) == (5 if self.escape[0] == 'u' else 1):
+                        self.close_escape()
+                    continue
+                match = STRING_SPECIAL_CHAR_REGEX.search(text, pos)
+                if match is None:
+                    self.append_string_segment(text[pos:])
+                    break
+                self.append_string_segment(text[pos:match.start()])
+                pos = match.end()
+                if match.group() == '\\':
+                    self.escape = ''
+                else:
+                    self.in_string = False
+                    if self.in_arguments:
+                        self.emit_arguments(self.flush_high_surrogate() + '"')
+                    if self.capture is not None:
+                        self.close_capture()
+                continue
+
+            match = STRUCTURAL_CHAR_REGEX.search(text, pos)
+            gap = text[pos:match.start() if match else len(text)]
+            if self.depth > 0 and gap and not gap.isspace():
+                # bare literal (number, true, false, null)
+                if self.depth == 1 and self.expecting == 'value':
+                    self.start_value()
+                if self.in_arguments:
+                    self.literal += ''.join(gap.split())
+            if match is None:
+                break
+            if self.literal:
+                self.close_literal()
+            pos = match.end()
+            c = match.group()
+
+            if c == '"':
+                self.in_string = True
+                if self.depth == 1 and self.expecting == 'key':
+                    self.capture = []
+                    self.capture_target = 'key'
+                elif self.depth == 1 and self.expecting == 'value':
+                    self.start_value()
+                    if self.key == 'name':
+                        self.capture = []
+                        self.capture_target = 'name'
+                if self.in_arguments:
+                    self.emit_arguments('"')
+            elif c in '{[':
+                if self.depth == 0:
+                    if c == '{':
+                        object_start = match.start()
+                        self.object_chunks = []
+                        self.depth = 1
+                        self.expecting = 'key'
+                        self.key = None
+                    else:
+                        self.in_array = True
+                    continue
+                if self.depth == 1 and self.expecting == 'value':
+                    self.start_value()
+                if self.in_arguments:
+                    self.emit_arguments(c)
+                self.depth += 1
+            elif c in '}]':
+                if self.depth == 0:
+                    if c == ']' and self.in_array:
+                        self.in_array = False
+                        self.add_event('end', '')
+                    continue
+                if self.depth == 1:
+                    if c == '}':
+                        self.in_arguments = False
+                        self.depth = 0
+                        self.object_chunks.append(text[object_start:pos])
+                        self.add_event('object', ''.join(self.object_chunks))
+                        self.object_chunks = []
+                        if not self.in_array:
+                            self.add_event('end', '')
+                    continue
+                self.depth -= 1
+                if self.in_arguments:
+                    self.emit_arguments(c)
+            elif c == ',':
+                if self.depth == 1:
+                    self.in_arguments = False
+                    self.expecting = 'key'
+                elif self.in_arguments:
+                    self.emit_arguments(', ')
+            elif c == ':':
+                if self.depth == 1 and self.expecting == 'colon':
+                    self.expecting = 'value'
+                elif self.in_arguments:
+                    self.emit_arguments(': ')
+
+        if self.depth > 0:
+            self.object_chunks.append(text[object_start:])
+
+        self.flush_arguments()
+        events = self.events
+        self.events = []
+        return events
+
+    def append_string_segment(self, segment: str):
+        if not segment:
+            return
+        if self.capture is not None:
+            self.capture.append(segment)
+        if self.in_arguments:
+            self.emit_arguments(self.flush_high_surrogate() + encode_string_segment(segment))
+
+    def close_escape(self):
+        escape = '\\' + self.escape
+        self.escape = None
+        if self.capture is not None:
+            self.capture.append(escape)
+        if not self.in_arguments:
+            return
+        try:
+            c = json.loads('"' + escape + '"')
+        except json.JSONDecodeError:
+            # invalid JSON, the arguments cannot be parsed anyway
+            self.emit_arguments(self.flush_high_surrogate() + escape)
+            return
+
+        if self.high_surrogate and is_surrogate(c, low=True):
+            # json.loads joins a surrogate pair into one character
+            c = (self.high_surrogate + c).encode('utf-16', 'surrogatepass').decode('utf-16')
+            self.high_surrogate = ''
+        prefix = self.flush_high_surrogate()
+        if is_surrogate(c, low=False):
+            self.high_surrogate = c
+            self.emit_arguments(prefix)
+        else:
+            self.emit_arguments(prefix + encode_string_segment(c))
+
+    def flush_high_surrogate(self) -> str:
+        # a high surrogate not followed by a low one stays a lone surrogate
+        c = self.high_surrogate
+        self.high_surrogate = ''
+        return encode_string_segment(c) if c else ''
+
+    def close_literal(self):
+        literal = self.literal
+        self.literal = ''
+        try:
+            literal = json.dumps(json.loads(literal), ensure_ascii=False)
+        except json.JSONDecodeError:
+            pass
+        self.emit_arguments(literal)
@@ -0,0 +1,91 @@
+# HyperCLOVAX vLLM Plugin
+# Copyright (c) 2025-present NAVER Cloud Corp.
+# Apache-2.0
+
+import json
+import os
+
+try:
+    import jsonschema
+except ImportError:
+    jsonschema = None
+
+from .hcx_schema_cache import CompiledSchemaCache
+
+# set HCX_TOOL_CALL_VALIDATION=1 to validate extracted tool calls against request.tools
+HCX_TOOL_CALL_VALIDATION = os.environ.get("HCX_TOOL_CALL_VALIDATION", "0").lower() in ("1", "true")
+# what extract_tool_calls does with invalid calls: "drop" them and keep the valid ones,
+# or "reject" the whole response, whose output is then returned as content
+HCX_TOOL_CALL_VALIDATION_POLICY = os.environ.get("HCX_TOOL_CALL_VALIDATION_POLICY", "drop").lower()
+if HCX_TOOL_CALL_VALIDATION_POLICY not in ("drop", "reject"):
+    raise ValueError(f"HCX_TOOL_CALL_VALIDATION_POLICY must be 'drop' or 'reject', "
+                     f"got {HCX_TOOL_CALL_VALIDATION_POLICY!r}")
+HCX_TOOL_CALL_VALIDATOR_CACHE_SIZE = int(os.environ.get("HCX_TOOL_CALL_VALIDATOR_CACHE_SIZE", "1024"))
+
+
+class RequiredPropertiesValidator:
+    '''
+    Fallback used when jsonschema is not installed: only the top-level type and required properties are checked.
+    '''
+    def __init__(self, schema):
+        self.schema = schema
+
+    def iter_errors(self, instance):
+        if self.schema.get("type", "object") == "object":
+            if not isinstance(instance, dict):
+                yield ValueError(f"{instance!r} is not of type 'object'")
+                return
+            for key in self.schema.get("required", []):
+                if key not in instance:
+                    yield ValueError(f"'{key}' is a required property")
+
+
+def compile_validator(schema):
+    if jsonschema is None:
+        return RequiredPropertiesValidator(schema)
+    validator_cls = jsonschema.validators.validator_for(schema)
+    validator_cls.check_schema(schema)
+    return validator_cls(schema)
+
+
+tool_call_validator_cache = CompiledSchemaCache(compile_validator, HCX_TOOL_CALL_VALIDATOR_CACHE_SIZE)
+
+
+def validate_tool_calls(tool_calls, tools) -> list[dict]:
+    '''
+    Checks each extracted tool call (name, JSON-encoded arguments) against the function definitions in request.tools.
+    Returns a list of errors: {"index", "name", "type", "message", "path"}.
+    '''
+    functions = {tool.function.name: tool.function for tool in tools or []}
+    errors = []
+    for index, tool_call in enumerate(tool_calls):
+        name = tool_call.function.name
+        if name not in functions:
+            errors.append({"index": index, "name": name, "type": "unknown_tool",
+                           "message": f"'{name}' is not one of the requested tools", "path": []})
+            continue
+
+        try:
+            arguments = json.loads(tool_call.function.arguments)
+        except json.JSONDecodeError as e:
+            errors.append({"index": index, "name": name, "type": "invalid_arguments",
+                           "message": str(e), "path": []})
+            continue
+
+        schema = functions[name].parameters
+        if not schema:
+            continue
+
+        try:
+            validator = tool_call_validator_cache.get(schema)
+        except Exception as e:
+            errors.append({"index": index, "name": name, "type": "invalid_schema",
+                           "message": str(e), "path": []})
+            continue
+
+        for error in validator.iter_errors(arguments):
+            errors.append({"index": index, "name": name, "type": "schema_violation",
+                           "message": getattr(error, "message", str(error)),
+                           "path": list(getattr(error, "absolute_path", []))})
+
+    return errors
@@ -17,30 +17,67 @@ from vllm.entrypoints.openai.tool_parsers.abstract_tool_parser import ToolParser
 from vllm.logger import init_logger
 from vllm.transformers_utils.tokenizer import AnyTokenizer
 
-from .hcx_parser_mixin import HcxStreamingParserFunctionsMixin
+from . import hcx_parser_metrics
+from .hcx_parser_constants import get_tokenizer_constants
+from .hcx_reasoner import HcxReasoningParser
+from .hcx_streaming_state import (HCX_STREAM_ID_KEY, HcxStreamingDelta, HcxStreamingState,
+                                  get_shared_streaming_state, new_stream_id)
+from .hcx_tool_call_validator import HCX_TOOL_CALL_VALIDATION, HCX_TOOL_CALL_VALIDATION_POLICY, validate_tool_calls
 
 logger = init_logger(__name__)
 
-class HcxToolParser(ToolParser, HcxStreamingParserFunctionsMixin):
+
+class HcxExtractedToolCallInformation(ExtractedToolCallInformation):
+    # errors of HCX_TOOL_CALL_VALIDATION for the calls of the output, including the dropped calls
+    validation_errors: list[dict] = []
+
+
+class HcxToolParser(ToolParser):
+    tool_call_start_token: str = " -> tool/function_call\n"
+    tool_call_end_token: str = "<|im_end|>"
+    # case 1. tool call is between other contents; case 2. tool call is at the end of the response
+    tool_call_regex = re.compile(r"-> tool/function_call\n(.*?)<\|im_end\|>|-> tool/function_call\n(.*)]", re.DOTALL)
+
     def __init__(self, tokenizer: AnyTokenizer):
         super().__init__(tokenizer)
 
-        self.tool_call_start_token: str = " -> tool/function_call\n"
-        self.tool_call_end_token: str = "<|im_end|>"
-        # case 1. tool call is between other contents; case 2. tool call is at the end of the response
-        self.tool_call_regex = re.compile(r"-> tool/function_call\n(.*?)<\|im_end\|>|-> tool/function_call\n(.*)]", re.DOTALL)
-            
-        # for streaming
-        self.tool_call_offset = 0
+
+        # tokenizer-derived constants of the streaming state, shared with HcxReasoningParser
+        self.reasoning_constants = get_tokenizer_constants(tokenizer, HcxReasoningParser,
+                                                           HcxReasoningParser.build_tokenizer_constants)
+
+        # for streaming; created from the first request, or shared with HcxReasoningParser when linked
+        self.streaming_state = None
         self.current_tool_id = -1
         self.prev_tool_call_arr = []
         self.streamed_args_for_tool: list[str] = []
-        self.is_reasoning_ended = False
+        self.current_tool_name_sent = False
+        self.pending_tool_call_arguments = ''
+
+        if hcx_parser_metrics.parser_metrics is not None:
+            hcx_parser_metrics.instrument_parser(self, hcx_parser_metrics.parser_metrics)
+
 
-        # attributes for streaming parser mixin
-        self.buffer_string = ''
-        self.special_strings = ['<|im_end|>\n', '<|im_start|>assistant', '-> tool/function_call\n']
-        self.escaped_special_strings = [re.escape(ss) for ss in self.special_strings]
+    def adjust_request(self, request: ChatCompletionRequest) -> ChatCompletionRequest:
+        request = super().adjust_request(request)
+
+        # forward the reasoning budget to HcxReasoningBudgetAdapter, which only sees the sampling params.
+        # vLLM calls adjust_request only with a tool parser and tool_choice != "none"; other requests must
+        # set vllm_xargs.reasoning_budget themselves
+        reasoning_budget = (request.chat_template_kwargs or {}).get('reasoning_budget')
+        if reasoning_budget is not None and hasattr(request, 'vllm_xargs'):
+            request.vllm_xargs = {**(request.vllm_xargs or {}), "reasoning_budget": int(reasoning_budget)}
+
+        # let HcxToolCallGrammarAdapter constrain the tool-call region to the request's tools and
+        # HcxToolCallStopAdapter end the sequence once the tool-call array closes; vllm_xargs only holds scalars
+        if request.tools and request.tool_choice != "none" and hasattr(request, 'vllm_xargs'):
+            tools = json.dumps([tool.model_dump(exclude_none=True) for tool in request.tools], ensure_ascii=False)
+            request.vllm_xargs = {**(request.vllm_xargs or {}), "hcx_tools": tools, "hcx_tool_call_stop": True}
+
+        # link HcxReasoningParser of the request (created with chat_template_kwargs) to the streaming state of this parser
+        if request.tools and request.tool_choice in ("auto", None):
+            request.chat_template_kwargs = {**(request.chat_template_kwargs or {}), HCX_STREAM_ID_KEY: new_stream_id()}
+        return request
 
 
     def extract_tool_calls(
@@ -66,23 +103,45 @@ class HcxToolParser(ToolParser, HcxStreamingParserFunctionsMixin):
                                                  ensure_ascii=False)))
                     for function_call in raw_function_calls
                 ]
-                
+
+                validation_errors = []
+                if HCX_TOOL_CALL_VALIDATION:
+                    validation_errors = validate_tool_calls(tool_calls, request.tools)
+                    if validation_errors:
+                        logger.warning("Invalid tool calls in response: %s", validation_errors)
+                        if HCX_TOOL_CALL_VALIDATION_POLICY == "drop":
+                            invalid_indices = {error["index"] for error in validation_errors}
+                            tool_calls = [tool_call for index, tool_call in enumerate(tool_calls)
+                                          if index not in invalid_indices]
+                        else:
+                            tool_calls = []
+
+                    if not tool_calls:
+                        return HcxExtractedToolCallInformation(tools_called=False,
+                                                               tool_calls=[],
+                                                               content=model_output,
+                                                               validation_errors=validation_errors)
+
                 # check if there is other content before tool calls
                 if '<|im_end|>\n<|im_start|>assistant -> tool/function_call\n' in model_output:
                     content = model_output.split('<|im_end|>\n<|im_start|>assistant -> tool/function_call\n')[0]
 
-                    return ExtractedToolCallInformation(
+                    return HcxExtractedToolCallInformation(
                         tools_called=True,
                         tool_calls=tool_calls,
-                        content=content if content else None)
+                        content=content if content else None,
+                        validation_errors=validation_errors)
                 else:
-                    return ExtractedToolCallInformation(
+                    return HcxExtractedToolCallInformation(
                         tools_called=True,
                         tool_calls=tool_calls,
-                        content=None)
+                        content=None,
+                        validation_errors=validation_errors)
 
-            except Exception:
+            except Exception as e:
                 logger.exception("Error in extracting tool call from response.")
+                if isinstance(e, json.JSONDecodeError):
+                    hcx_parser_metrics.inc_json_decode_failure(self)
 
                 return ExtractedToolCallInformation(tools_called=False,
                                                     tool_calls=[],
@@ -102,76 +161,116 @@ class HcxToolParser(ToolParser, HcxStreamingParserFunctionsMixin):
         delta_token_ids: Sequence[int],
         request: ChatCompletionRequest,
     ) -> Union[DeltaMessage, None]:
-        if self.tool_call_start_token in current_text:
-            function_call_text = current_text.split(self.tool_call_start_token)[-1]
-            function_call_text = function_call_text[self.tool_call_offset:]
-            opening_brace_index = None
-            for idx, c in enumerate(function_call_text):
-                if c == '{':
-                    opening_brace_index = idx
-                    break
-            
-            closing_brace_indices = [_idx for _idx, c in enumerate(function_call_text) if c == '}']
-            
-            if opening_brace_index is None:
-                return None
-            
-            if len(closing_brace_indices) == 0:
-                return None
-
-            for closing_brace_index in closing_brace_indices:
-                try:                        
-                    _function_call = json.loads(function_call_text[opening_brace_index: closing_brace_index + 1])
-                    self.current_tool_id += 1
-                    self.tool_call_offset = closing_brace_index
-                    self.prev_tool_call_arr.append(_function_call)
-                    self.streamed_args_for_tool.append(function_call_text[opening_brace_index:closing_brace_index + 1])
-
-                    return DeltaMessage(tool_calls=[
-                            DeltaToolCall(index=self.current_tool_id,
-                                            type="function",
-                                            id=f'hcx_tool_call_{self.current_tool_id}',
-                                            function=DeltaFunctionCall(
-                                                name=_function_call.get('name', ''), 
-                                                arguments=json.dumps(_function_call.get('arguments', ''))).model_dump(
-                                                    exclude_none=True))])
-
-                except json.JSONDecodeError:
-                    logger.debug('Decode error:', function_call_text[opening_brace_index: closing_brace_index + 1])
-                
-            return None
-        else:
-            # check if reasoning ended with three conditions
-            if len(current_token_ids) == 2 and len(current_text) == 0:
-                # there is no reasoning content
-                self.is_reasoning_ended = True
+        state = self.streaming_state
+        if state is None:
+            state = self.streaming_state = self.get_streaming_state(request)
+            if state.num_deltas:
+                # HcxReasoningParser classified the deltas up to the end of reasoning. vLLM drops the content it
+                # returned for the last one, which is sent from the state instead, and hands over its own copy of
+                # that content (or nothing, when it has already dropped it) and of its ids, followed by the new ones
+                delta = HcxStreamingDelta()
+                delta.merge(state.last_delta)
+                delta.reasoning_content = ''
+                new_text = delta_text
+                if state.handover_content and delta_text.startswith(state.handover_content):
+                    new_text = delta_text[len(state.handover_content):]
+                new_token_ids = delta_token_ids
+                num_handover_token_ids = len(state.handover_token_ids)
+                if list(delta_token_ids[:num_handover_token_ids]) == state.handover_token_ids:
+                    new_token_ids = delta_token_ids[num_handover_token_ids:]
+                delta.merge(state.feed(current_text, new_text, current_token_ids, new_token_ids))
+                return self.build_delta_message(delta)
 
-            if current_text.startswith(' -> tool/function_call\n'):
-                self.is_reasoning_ended = True
+        return self.build_delta_message(state.feed(current_text, delta_text, current_token_ids, delta_token_ids))
 
-            if '<|im_end|>\n<|im_start|>' in current_text:
-                self.is_reasoning_ended = True
 
-            # set up buffer for special string processing
-            self.buffer_string += delta_text
-            buffered_content = ''
+    def get_streaming_state(self, request: ChatCompletionRequest) -> HcxStreamingState:
+        chat_template_kwargs = request.chat_template_kwargs or {}
 
-            if self.check_is_special_string():
-                buffered_content, delta_text = self.remove_special_string()
-                self.buffer_string = delta_text
+        def build():
+            state = HcxStreamingState(self.reasoning_constants["end_token_id"],
+                                      self.reasoning_constants["non_reasoning_mode_start_token"],
+                                      self.reasoning_constants["think_end_tokens"],
+                                      parse_tool_calls=True)
+            state.set_reasoning_mode(chat_template_kwargs)
+            return state
 
-                if self.is_reasoning_ended:
-                    return DeltaMessage(content=buffered_content)
-                else:
-                    return DeltaMessage(reasoning_content=buffered_content)
+        stream_id = chat_template_kwargs.get(HCX_STREAM_ID_KEY)
+        if stream_id is None:
+            return build()
+        return get_shared_streaming_state(stream_id, build)
 
-            if self.check_is_part_of_special_string():
-                return None
-            else:
-                delta_text = self.buffer_string
-                self.buffer_string = ''
 
-            if self.is_reasoning_ended:
-                return DeltaMessage(content=delta_text)
+    def build_delta_message(self, delta: HcxStreamingDelta) -> Union[DeltaMessage, None]:
+        delta_tool_calls = []
+        for kind, value in delta.tool_call_events:
+            if kind == 'name':
+                delta_tool_calls += self.start_streaming_tool_call(value)
+            elif kind == 'arguments':
+                delta_tool_calls += self.stream_tool_call_arguments(value)
+            elif kind == 'object':
+                delta_tool_calls += self.finish_streaming_tool_call(value)
             else:
-                return DeltaMessage(reasoning_content=delta_text)
+                hcx_parser_metrics.observe_tool_calls(self, len(self.prev_tool_call_arr))
+
+        if not delta.reasoning_content and not delta.content and not delta_tool_calls:
+            return None
+        return DeltaMessage(reasoning_content=delta.reasoning_content or None,
+                            content=delta.content or None,
+                            tool_calls=delta_tool_calls)
+
+
+    def start_streaming_tool_call(self, name: str) -> list[DeltaToolCall]:
+        self.current_tool_id += 1
+        self.current_tool_name_sent = True
+        self.prev_tool_call_arr.append({"name": name})
+        self.streamed_args_for_tool.append('')
+
+        delta_tool_calls = [
+            DeltaToolCall(index=self.current_tool_id,
+                          type="function",
+                          id=f'hcx_tool_call_{self.current_tool_id}',
+                          function=DeltaFunctionCall(name=name).model_dump(exclude_none=True))
+        ]
+
+        # arguments generated before the name
+        pending_arguments = self.pending_tool_call_arguments
+        self.pending_tool_call_arguments = ''
+        return delta_tool_calls + self.stream_tool_call_arguments(pending_arguments)
+
+
+    def stream_tool_call_arguments(self, arguments: str) -> list[DeltaToolCall]:
+        if not arguments:
+            return []
+
+        if not self.current_tool_name_sent:
+            self.pending_tool_call_arguments += arguments
+            return []
+
+        self.streamed_args_for_tool[self.current_tool_id] += arguments
+        return [
+            DeltaToolCall(index=self.current_tool_id,
+                          function=DeltaFunctionCall(arguments=arguments).model_dump(exclude_none=True))
+        ]
+
+
+    def finish_streaming_tool_call(self, function_call_text: str) -> list[DeltaToolCall]:
+        delta_tool_calls = []
+        try:
+            _function_call = json.loads(function_call_text)
+        except json.JSONDecodeError:
+            logger.debug('Decode error: %s', function_call_text)
+            hcx_parser_metrics.inc_json_decode_failure(self)
+            _function_call = None
+
+        if _function_call is not None:
+            if not self.current_tool_name_sent:
+                delta_tool_calls += self.start_streaming_tool_call(_function_call.get('name', ''))
+            if not self.streamed_args_for_tool[self.current_tool_id]:
+                delta_tool_calls += self.stream_tool_call_arguments(
+                    json.dumps(_function_call.get('arguments', {}), ensure_ascii=False))
+            self.prev_tool_call_arr[self.current_tool_id] = _function_call
+
+        self.current_tool_name_sent = False
+        self.pending_tool_call_arguments = ''
+        return delta_tool_calls
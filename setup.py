@@ -13,6 +13,11 @@ setup(name='vllm_add_hyperclovax_model',
             "register_hyperclovax_model = model:register",
             "register_hcx_reasoning_parser = parser:register_reasoning_parser",
             "register_hcx_tool_parser = parser:register_tool_parser"
+        ],
+        'console_scripts': [
+            "hcx-postprocess = parser.hcx_batch_postprocess:main",
+            "hcx-convert-checkpoint = model.hcx_checkpoint:main",
+            "hcx-calibrate-kv-cache = model.hcx_kv_cache_calibration:main"
         ]
     }
 )